@@ -0,0 +1,95 @@
+"""
+ScholarSphere - Document Memory Benchmark
+Measures memory per stored document for the previous layout (a list of
+dataclass Documents with List[float] embeddings) against the columnar
+DocumentStore the index uses now
+
+Usage: python benchmark_document_memory.py [documents] [embedding_dim]
+"""
+import json
+import sys
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import List, Optional
+import numpy as np
+from src.engine.document_store import DocumentStore
+
+
+@dataclass
+class DataclassDocument:
+    """Document layout before the columnar store"""
+    title: str
+    content: str
+    id: str
+    url: Optional[str] = None
+    created_at: Optional[datetime] = None
+    embedding: Optional[List[float]] = None
+
+
+def generate(n_docs, dim, rng):
+    """Documents as they arrive over the API: one JSON line each"""
+    start = datetime(2024, 1, 1)
+    words = [f"word{i}" for i in range(5000)]
+    for i in range(n_docs):
+        yield json.dumps(dict(
+            id=f"{i:08d}-4b2c-9d1e-{i:012d}",
+            title=' '.join(rng.choice(words, 8)),
+            content=' '.join(rng.choice(words, 120)),
+            url=f"https://example.org/papers/{i}",
+            created_at=(start + timedelta(seconds=i)).isoformat(),
+            embedding=rng.standard_normal(dim).tolist() if dim else None
+        ))
+
+
+def parse(line):
+    record = json.loads(line)
+    record['created_at'] = datetime.fromisoformat(record['created_at'])
+    return record
+
+
+def measure(build, lines):
+    """Bytes still allocated once every line has been parsed and stored"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build(lines)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return kept, used
+
+
+def build_dataclasses(lines):
+    return [DataclassDocument(**parse(line)) for line in lines]
+
+
+def build_store(lines):
+    store = DocumentStore()
+    for line in lines:
+        store.append_fields(**parse(line))
+    return store
+
+
+def main():
+    n_docs = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    dim = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+    rng = np.random.default_rng(42)
+    print(f"Generating {n_docs} documents ({dim}-dimensional embeddings)...")
+    lines = list(generate(n_docs, dim, rng))
+    text_bytes = sum(len((r['id'] + r['title'] + r['content'] + r['url']).encode('utf-8'))
+                     for r in map(json.loads, lines))
+
+    documents, list_bytes = measure(build_dataclasses, lines)
+    del documents
+    store, store_bytes = measure(build_store, lines)
+
+    print("-" * 60)
+    print(f"Raw UTF-8 text:            {text_bytes / n_docs:9.0f} bytes/document")
+    print(f"Dataclass list:            {list_bytes / n_docs:9.0f} bytes/document")
+    print(f"Columnar DocumentStore:    {store_bytes / n_docs:9.0f} bytes/document "
+          f"(buffers: {store.nbytes() / n_docs:.0f})")
+    print(f"Reduction: {list_bytes / store_bytes:.1f}x")
+    print("-" * 60)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+ScholarSphere - Upstream HTTP Connection Benchmark
+Compares a fresh requests.get per call (new TCP + TLS handshake each time)
+against the pooled keep-alive sessions of HttpSessionPool, on a local HTTPS
+stand-in for an upstream API. The stand-in adds a simulated network round
+trip per request and per handshake round trip (TCP + TLS 1.3)
+
+Usage: python benchmark_http_pool.py [requests] [rtt_ms] [threads]
+"""
+import os
+import socket
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import requests
+
+from src.engine.http_pool import HttpSessionPool
+
+# Round trips before the first request on a new connection: TCP + TLS 1.3
+HANDSHAKE_ROUND_TRIPS = 2
+BODY = b'{"message": {"items": []}}'
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        # Headers and body are written separately; don't let Nagle hold the body
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_GET(self):
+        time.sleep(self.server.rtt)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, rtt, ssl_context):
+        super().__init__(('127.0.0.1', 0), StandInHandler)
+        self.rtt = rtt
+        self.ssl_context = ssl_context
+        self.connections = 0
+
+    def finish_request(self, request, client_address):
+        # Runs on the connection's own thread: handshake, then serve
+        self.connections += 1
+        time.sleep(self.rtt * HANDSHAKE_ROUND_TRIPS)
+        try:
+            request = self.ssl_context.wrap_socket(request, server_side=True)
+        except (ssl.SSLError, OSError):
+            return
+        super().finish_request(request, client_address)
+
+
+def self_signed_certificate(directory):
+    cert, key = os.path.join(directory, 'cert.pem'), os.path.join(directory, 'key.pem')
+    subprocess.run(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+                    '-subj', '/CN=localhost', '-addext', 'subjectAltName=IP:127.0.0.1',
+                    '-keyout', key, '-out', cert], check=True, capture_output=True)
+    return cert, key
+
+
+def timed(get, url, n_requests, n_threads, cert):
+    def one(_):
+        start = time.perf_counter()
+        get(url, params={'query': 'graph neural networks'}, verify=cert).raise_for_status()
+        return (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=n_threads) as executor:
+        latencies = list(executor.map(one, range(n_requests)))
+    return np.mean(latencies), np.percentile(latencies, 95), time.perf_counter() - start
+
+
+def main():
+    n_requests = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    rtt_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 20
+    n_threads = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+
+    with tempfile.TemporaryDirectory() as directory:
+        cert, key = self_signed_certificate(directory)
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(cert, key)
+
+        print(f"{n_requests} GETs over {n_threads} threads, simulated RTT {rtt_ms:.0f} ms")
+        for name, make_get in (('requests.get', lambda: requests.get),
+                               ('HttpSessionPool', lambda: HttpSessionPool(pool_size=n_threads).get)):
+            server = StandInServer(rtt_ms / 1000, context)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            url = f"https://127.0.0.1:{server.server_port}/works"
+            mean, p95, elapsed = timed(make_get(), url, n_requests, n_threads, cert)
+            print(f"{name:>16}: {mean:6.1f} ms mean, {p95:6.1f} ms p95, "
+                  f"{n_requests / elapsed:6.1f} req/s, {server.connections} connections")
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == '__main__':
+    main()
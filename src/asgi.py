@@ -0,0 +1,109 @@
+"""
+ASGI entry point for research search
+Serves GET /research/search, /research/search/stream and /research/cache on the
+ASGI server's event loop, so a single worker process keeps hundreds of
+searches in flight without a thread per request (e.g. `uvicorn asgi:app`
+from src/). The Flask app in main.py keeps serving every other route.
+"""
+import asyncio
+import json
+import os
+from urllib.parse import parse_qs
+
+from engine.async_research import SOURCES, AsyncResearchSearcher, research_events, research_payload
+from engine.research_cache import DEFAULT_TTLS, ResearchCache
+
+_searcher = None
+
+
+def get_research_searcher():
+    # Created on first request, on the server's loop, where its client lives
+    global _searcher
+    if _searcher is None:
+        # Same settings as main.py; with RESEARCH_CACHE_PATH set, both share the cache
+        cache = None
+        cache_size = int(os.getenv('RESEARCH_CACHE_SIZE', '1024'))
+        cache_path = os.getenv('RESEARCH_CACHE_PATH')
+        if cache_size > 0 or cache_path:
+            ttls = {source: float(os.getenv(f'RESEARCH_CACHE_TTL_{source.upper()}', ttl))
+                    for source, ttl in DEFAULT_TTLS.items()}
+            cache = ResearchCache(maxsize=cache_size, path=cache_path, ttls=ttls,
+                                  max_stale=float(os.getenv('RESEARCH_CACHE_MAX_STALE', '86400')))
+        _searcher = AsyncResearchSearcher(
+            max_connections=int(os.getenv('RESEARCH_MAX_CONNECTIONS', '100')),
+            retries=int(os.getenv('HTTP_RETRIES', '2')),
+            connect_timeout=float(os.getenv('HTTP_CONNECT_TIMEOUT', '5')),
+            read_timeout=float(os.getenv('HTTP_READ_TIMEOUT', '15')),
+            cache=cache)
+    return _searcher
+
+
+async def _send_json(send, status, body):
+    payload = json.dumps(body).encode('utf-8')
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', b'application/json'),
+                            (b'content-length', str(len(payload)).encode())]})
+    await send({'type': 'http.response.body', 'body': payload})
+
+
+async def _stream_events(send, events):
+    # One NDJSON line per event, sent as soon as it is produced
+    await send({'type': 'http.response.start', 'status': 200,
+                'headers': [(b'content-type', b'application/x-ndjson'), (b'cache-control', b'no-cache')]})
+    try:
+        async for event in events:
+            await send({'type': 'http.response.body', 'body': (json.dumps(event) + '\n').encode('utf-8'),
+                        'more_body': True})
+    finally:
+        await events.aclose()
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            if _searcher is not None:
+                await _searcher.aclose()
+                if _searcher.cache is not None:
+                    _searcher.cache.close()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await _lifespan(receive, send)
+    if scope['type'] != 'http':
+        return
+    if scope['path'] not in ('/research/search', '/research/search/stream', '/research/cache'):
+        return await _send_json(send, 404, {"error": "Not found"})
+    if scope['method'] != 'GET':
+        return await _send_json(send, 405, {"error": "Method not allowed"})
+
+    if scope['path'] == '/research/cache':
+        # Reads the SQLite tier, so it stays off the event loop
+        stats = await asyncio.get_running_loop().run_in_executor(None, get_research_searcher().cache_stats)
+        return await _send_json(send, 200, stats)
+
+    args = {name: values[0] for name, values in parse_qs(scope['query_string'].decode('latin-1')).items()}
+    query = args.get('q', '')
+    source = args.get('source', 'all')
+    if not query:
+        return await _send_json(send, 400, {"error": "Query parameter 'q' is required"})
+    if source != 'all' and source not in SOURCES:
+        return await _send_json(send, 400, {"error": "Invalid source parameter"})
+    try:
+        max_results = int(args.get('max', 10))
+    except ValueError:
+        return await _send_json(send, 400, {"error": "'max' must be an integer"})
+
+    if scope['path'] == '/research/search/stream':
+        return await _stream_events(send, research_events(get_research_searcher(), query, max_results))
+    try:
+        payload = await research_payload(get_research_searcher(), query, source, max_results)
+    except Exception as e:
+        return await _send_json(send, 500, {"error": str(e)})
+    await _send_json(send, 200, payload)
@@ -0,0 +1,498 @@
+"""
+Asyncio research search engine
+Every source, and every fallback within a source, is a coroutine sharing
+one event loop and one keep-alive httpx.AsyncClient, so a search in flight
+costs a few tasks instead of a thread per source
+"""
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from .http_pool import HttpSessionPool
+from .research_cache import ResearchCache
+from .research_searcher import ResearchPaperSearcher
+
+logger = logging.getLogger(__name__)
+
+SOURCES = ('scholar', 'researchgate', 'wikipedia')
+
+
+class AsyncResearchSearcher:
+    """
+    Research paper search over Google Scholar, arXiv and Wikipedia as coroutines
+
+    Requests and parsing mirror ResearchPaperSearcher (whose request
+    parameters and parsers are reused), with the same fallbacks: CrossRef
+    then Semantic Scholar when Google Scholar fails, and Semantic Scholar
+    then DuckDuckGo when arXiv returns nothing. Google Scholar is scraped
+    by the blocking scholarly library, which runs on a small dedicated
+    thread pool; everything else is native asyncio.
+
+    Concurrent searches of one source for the same query and max_results
+    share a single upstream search (single flight), whether they come from
+    search_all or a single-source search. With a ResearchCache, results are
+    served from it while fresh; stale results are served immediately while
+    one background task per key refreshes them from upstream.
+
+    An instance must only be used from one event loop, the one its HTTP
+    client is created on.
+    """
+    # Seconds a single source may take, and a whole search_all
+    SOURCE_TIMEOUT = 90
+    SEARCH_TIMEOUT = 120
+    # Seconds a Google Scholar scrape may take, waiting for a free thread
+    # included, leaving the rest of SOURCE_TIMEOUT for its fallbacks
+    SCHOLAR_TIMEOUT = 45
+
+    def __init__(self, max_connections=100, retries=2, backoff_factor=0.3, connect_timeout=5.0,
+                 read_timeout=15.0, scholar_workers=4, scholar=None, client=None, cache=None):
+        """
+        Args:
+            max_connections: Connections open at once across all upstream hosts
+            retries: Retries of failed connections and 502/503/504 responses
+            backoff_factor: Base of the exponential backoff between retries, in seconds
+            connect_timeout: Seconds to wait for a connection
+            read_timeout: Seconds to wait between received bytes (default per call)
+            scholar_workers: Threads scraping Google Scholar concurrently
+            scholar: Blocking callable (query, max_results) -> papers raising when
+                Google Scholar is unavailable (default: scholarly)
+            client: httpx.AsyncClient to use instead of creating one
+            cache: ResearchCache of results by source, query and max_results
+        """
+        self.max_connections = max_connections
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.scholar_workers = scholar_workers
+        self._scholar = scholar
+        self._scholar_executor = None
+        # Runs the cache's SQLite reads and writes, which may wait for
+        # another process's lock, off the event loop
+        self._cache_executor = None
+        self._client = client
+        self.cache = cache
+        # Upstream searches in flight, by cache key: [task, callers waiting]
+        self._in_flight = {}
+        # Callers served by another caller's upstream search
+        self.coalesced = 0
+        # Background refreshes of stale cache entries, by cache key
+        self._refreshing = {}
+        self.refreshes = 0
+
+    @property
+    def client(self):
+        if self._client is None:
+            # httpx is imported on first use, keeping it out of cold starts
+            import httpx
+
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+                timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+                transport=httpx.AsyncHTTPTransport(retries=self.retries),
+                follow_redirects=True)
+        return self._client
+
+    async def aclose(self):
+        for task in list(self._refreshing.values()):
+            task.cancel()
+        if self._client is not None:
+            await self._client.aclose()
+        if self._scholar_executor is not None:
+            self._scholar_executor.shutdown(wait=False)
+        if self._cache_executor is not None:
+            self._cache_executor.shutdown(wait=True)
+
+    async def _get(self, url, timeout=None, **kwargs):
+        """GET through the shared client, retrying 502/503/504 responses with backoff"""
+        if timeout is not None:
+            import httpx
+            kwargs['timeout'] = httpx.Timeout(timeout, connect=self.connect_timeout)
+        for attempt in range(self.retries + 1):
+            response = await self.client.get(url, **kwargs)
+            if response.status_code not in HttpSessionPool.RETRY_STATUSES or attempt == self.retries:
+                return response
+            await asyncio.sleep(self.backoff_factor * 2 ** attempt)
+
+    async def search(self, source: str, query: str, max_results: int = 10) -> List[Dict[str, Any]]:
+        """
+        Search one source, returning [] if it fails or exceeds SOURCE_TIMEOUT
+
+        Raises:
+            ValueError: If source is not one of SOURCES
+        """
+        searches = {
+            'scholar': self.search_google_scholar,
+            'researchgate': self.search_researchgate,
+            'wikipedia': self.search_wikipedia
+        }
+        if source not in searches:
+            raise ValueError(f"Unknown research source: {source}")
+        if self.cache is not None:
+            # Fresh entries in memory are served inline; anything else may
+            # need the SQLite tier
+            cached = self.cache.get_from_memory(source, query, max_results)
+            if cached is None:
+                cached = await self._off_loop(self.cache.get, source, query, max_results)
+            if cached is not None:
+                papers, fresh = cached
+                if not fresh:
+                    self._refresh(searches[source], source, query, max_results)
+                return papers
+        return await self._single_flight(searches[source], source, query, max_results)
+
+    async def _single_flight(self, search, source, query, max_results):
+        """
+        Join the upstream search in flight for this key, or start one
+
+        Every caller gets its own copy of the results. The upstream search
+        is cancelled only once every caller waiting on it has been.
+        """
+        key = ResearchCache.key(source, query, max_results)
+        flight = self._in_flight.get(key)
+        if flight is None:
+            task = asyncio.ensure_future(self._fetch(search, source, query, max_results))
+            flight = self._in_flight[key] = [task, 0]
+            task.add_done_callback(lambda _: self._land(key, flight))
+        else:
+            self.coalesced += 1
+        task = flight[0]
+        flight[1] += 1
+        try:
+            # Shielded, so that one caller going away leaves the others' search running
+            results = await asyncio.shield(task)
+        finally:
+            flight[1] -= 1
+            if flight[1] == 0 and not task.done():
+                task.cancel()
+                self._land(key, flight)
+        return [dict(paper) for paper in results]
+
+    def _land(self, key, flight):
+        # A later search for the key starts a new flight
+        if self._in_flight.get(key) is flight:
+            del self._in_flight[key]
+
+    async def _fetch(self, search, source, query, max_results):
+        results = await self._search_upstream(search, source, query, max_results)
+        # An empty result usually means every upstream failed; don't cache it
+        if results and self.cache is not None:
+            entry = self.cache.put_in_memory(source, query, max_results, results)
+            # Written in the background: the results are not held up by it
+            self._off_loop(self.cache.put_on_disk, *entry).add_done_callback(self._log_cache_error)
+        return results
+
+    def _refresh(self, search, source, query, max_results):
+        """Refresh a stale cache entry in the background, once per key at a time"""
+        key = self.cache.key(source, query, max_results)
+        if key in self._refreshing:
+            return
+
+        async def refresh():
+            await self._single_flight(search, source, query, max_results)
+            self.refreshes += 1
+
+        task = asyncio.ensure_future(refresh())
+        self._refreshing[key] = task
+        task.add_done_callback(lambda _: self._refreshing.pop(key, None))
+
+    def _off_loop(self, function, *args):
+        """Future of a blocking cache call, run on the cache thread when there is a SQLite tier"""
+        loop = asyncio.get_running_loop()
+        if self.cache.path is None:
+            future = loop.create_future()
+            future.set_result(function(*args))
+            return future
+        if self._cache_executor is None:
+            self._cache_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='research-cache')
+        return loop.run_in_executor(self._cache_executor, function, *args)
+
+    @staticmethod
+    def _log_cache_error(future):
+        if not future.cancelled() and future.exception() is not None:
+            logger.error(f"Research cache write failed: {future.exception()}")
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """
+        Research cache hit rates and entry ages, background refresh counters,
+        and the upstream searches in flight and callers that shared one
+
+        Blocking, as ResearchCache.stats(), when the cache has a SQLite tier.
+        """
+        flights = {"in_flight": len(self._in_flight), "coalesced": self.coalesced}
+        if self.cache is None:
+            return {"enabled": False, **flights}
+        return {"enabled": True, **self.cache.stats(), "refreshes": self.refreshes,
+                "refreshing": len(self._refreshing), **flights}
+
+    async def _search_upstream(self, search, source, query, max_results):
+        start_time = time.perf_counter()
+        try:
+            results = await asyncio.wait_for(search(query, max_results), self.SOURCE_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.error(f"✗ {source.capitalize()} timed out after {self.SOURCE_TIMEOUT} seconds")
+            return []
+        except Exception as e:
+            logger.error(f"✗ {source.capitalize()} failed: {e}")
+            return []
+        logger.info(f"✓ {source.capitalize()} completed: {len(results)} results "
+                    f"in {time.perf_counter() - start_time:.2f}s")
+        return results
+
+    async def search_all(self, query: str, max_results: int = 10) -> Dict[str, List[Dict[str, Any]]]:
+        """Search every source concurrently; sources still running after SEARCH_TIMEOUT return []"""
+        results = {source: [] for source in SOURCES}
+        async for source, papers in self.search_all_as_completed(query, max_results):
+            results[source] = papers
+        return results
+
+    async def search_all_as_completed(self, query: str, max_results: int = 10):
+        """
+        Search every source concurrently, yielding (source, results) as each finishes
+
+        Sources still running after SEARCH_TIMEOUT are cancelled and yielded
+        with no results. Closing the generator early cancels the sources
+        still running.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.SEARCH_TIMEOUT
+        tasks = {asyncio.ensure_future(self.search(source, query, max_results)): source for source in SOURCES}
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, timeout=max(deadline - loop.time(), 0),
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    logger.error(f"Overall search timed out after {self.SEARCH_TIMEOUT} seconds")
+                    break
+                for task in done:
+                    yield tasks[task], task.result()
+            for task in pending:
+                task.cancel()
+            for task in pending:
+                yield tasks[task], []
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def search_google_scholar(self, query: str, max_results: int = 10) -> List[Dict[str, Any]]:
+        if self._scholar_executor is None:
+            self._scholar_executor = ThreadPoolExecutor(max_workers=self.scholar_workers,
+                                                        thread_name_prefix='scholar')
+        scrape = self._scholar or ResearchPaperSearcher().scrape_google_scholar
+        try:
+            loop = asyncio.get_running_loop()
+            # A scrape still queued at the timeout is cancelled; one already
+            # running finishes on its thread, its results discarded
+            return await asyncio.wait_for(loop.run_in_executor(self._scholar_executor, scrape, query, max_results),
+                                          self.SCHOLAR_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.error(f"Google Scholar timed out after {self.SCHOLAR_TIMEOUT} seconds")
+        except Exception as e:
+            logger.error(f"Error searching Google Scholar (might be blocked in production): {e}")
+        logger.info("Attempting fallback to Semantic Scholar API...")
+        return await self.fallback_semantic_scholar(query, max_results)
+
+    async def fallback_semantic_scholar(self, query: str, max_results: int = 10) -> List[Dict[str, Any]]:
+        """CrossRef, then Semantic Scholar, labelled as Google Scholar results"""
+        parsers = ResearchPaperSearcher
+        try:
+            response = await self._get(parsers.CROSSREF_URL, params=parsers.crossref_params(query, max_results),
+                                       headers=parsers.POLITE_HEADERS)
+            if response.status_code == 200:
+                papers = parsers.parse_crossref(response.json(), max_results)
+                if papers:
+                    logger.info(f"CrossRef API: Found {len(papers)} papers")
+                    return papers
+            else:
+                logger.warning(f"CrossRef returned status {response.status_code}")
+        except Exception as e:
+            logger.error(f"CrossRef API error: {e}")
+
+        try:
+            response = await self._get(parsers.SEMANTIC_SCHOLAR_URL,
+                                       params=parsers.semantic_scholar_fallback_params(query, max_results))
+            if response.status_code == 200:
+                papers = parsers.parse_semantic_scholar_fallback(response.json(), max_results)
+                logger.info(f"Semantic Scholar: Found {len(papers)} papers")
+                return papers
+            logger.error(f"Semantic Scholar API returned status {response.status_code}")
+        except Exception as e:
+            logger.error(f"Semantic Scholar fallback failed: {e}")
+        return []
+
+    async def search_researchgate(self, query: str, max_results: int = 10) -> List[Dict[str, Any]]:
+        """arXiv, then Semantic Scholar, then DuckDuckGo, labelled as ResearchGate results"""
+        parsers = ResearchPaperSearcher
+        try:
+            response = await self._get(parsers.ARXIV_URL, params=parsers.arxiv_params(query, max_results))
+            if response.status_code == 200:
+                papers = parsers.parse_arxiv(response.content, max_results)
+                if papers:
+                    logger.info(f"Found {len(papers)} papers via arXiv API")
+                    return papers
+        except Exception as e:
+            logger.error(f"arXiv API error: {e}")
+
+        try:
+            response = await self._get(parsers.SEMANTIC_SCHOLAR_URL, timeout=10,
+                                       params=parsers.semantic_scholar_params(query, max_results))
+            if response.status_code == 200:
+                papers = parsers.parse_semantic_scholar(response.json(), max_results)
+                if papers:
+                    logger.info(f"Found {len(papers)} papers via Semantic Scholar")
+                    return papers
+            elif response.status_code == 429:
+                logger.warning("Semantic Scholar API rate limit reached")
+        except Exception as e:
+            logger.error(f"Semantic Scholar error: {e}")
+
+        try:
+            response = await self._get(parsers.duckduckgo_url(query), timeout=10,
+                                       headers=parsers.DUCKDUCKGO_HEADERS)
+            if response.status_code == 200:
+                papers = parsers.parse_duckduckgo(response.text, query, max_results)
+                if papers:
+                    logger.info(f"Found {len(papers)} papers via DuckDuckGo search")
+                    return papers
+        except Exception as e:
+            logger.error(f"DuckDuckGo search error: {e}")
+
+        logger.warning(f"No ResearchGate results found for query: {query}")
+        return []
+
+    async def search_wikipedia(self, query: str, max_results: int = 5) -> List[Dict[str, Any]]:
+        parsers = ResearchPaperSearcher
+        response = await self._get(parsers.WIKIPEDIA_API_URL, params=parsers.wikipedia_params(query, max_results),
+                                   headers=parsers.POLITE_HEADERS)
+        response.raise_for_status()
+        return parsers.parse_wikipedia(response.json(), max_results)
+
+    format_results_for_display = staticmethod(ResearchPaperSearcher.format_results_for_display)
+
+
+async def research_payload(searcher: AsyncResearchSearcher, query: str, source: str = 'all',
+                           max_results: int = 10) -> Dict[str, Any]:
+    """
+    The /research/search response body for a query
+
+    Raises:
+        ValueError: If source is neither 'all' nor one of SOURCES
+    """
+    if source == 'all':
+        results = await searcher.search_all(query, max_results)
+        formatted = searcher.format_results_for_display(results)
+        return {
+            "query": query,
+            "total_results": len(formatted),
+            "results": formatted,
+            "results_by_source": {name: len(results.get(name, [])) for name in SOURCES}
+        }
+    results = await searcher.search(source, query, max_results)
+    return {
+        "query": query,
+        "source": source,
+        "total_results": len(results),
+        "results": results
+    }
+
+
+async def research_events(searcher: AsyncResearchSearcher, query: str, max_results: int = 10):
+    """
+    The /research/search/stream events for a query
+
+    Yields one {'type': 'source'} event per source, in completion order,
+    with that source's display-formatted results, then a {'type': 'done'}
+    event with the totals.
+    """
+    start_time = time.perf_counter()
+    counts = {}
+    async for source, papers in searcher.search_all_as_completed(query, max_results):
+        counts[source] = len(papers)
+        yield {
+            "type": "source",
+            "source": source,
+            "total_results": len(papers),
+            "results": searcher.format_results_for_display({source: papers}),
+            "elapsed_ms": round((time.perf_counter() - start_time) * 1000, 1)
+        }
+    yield {
+        "type": "done",
+        "query": query,
+        "total_results": sum(counts.values()),
+        "results_by_source": {source: counts.get(source, 0) for source in SOURCES},
+        "elapsed_ms": round((time.perf_counter() - start_time) * 1000, 1)
+    }
+
+
+class EventLoopThread:
+    """
+    An event loop running forever on a daemon thread
+
+    Lets synchronous code (Flask request threads) run coroutines on one
+    shared loop, so that everything they start, such as the HTTP client's
+    connections, lives on that loop.
+    """
+
+    def __init__(self, name='event-loop'):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def run(self, coroutine, timeout=None):
+        """Run a coroutine on the loop and wait for its result"""
+        future = asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+        try:
+            return future.result(timeout)
+        except BaseException:
+            future.cancel()
+            raise
+
+    def iterate(self, async_iterable):
+        """
+        Iterate an async iterable on the loop from synchronous code
+
+        Items are handed over as they are produced. Closing the returned
+        generator early (e.g. when a streaming client disconnects) cancels
+        the iteration on the loop.
+        """
+        items = queue.Queue()
+        finished = object()
+
+        async def pump():
+            try:
+                async for item in async_iterable:
+                    items.put((item, None))
+            except BaseException as e:
+                items.put((finished, e))
+                raise
+            finally:
+                if hasattr(async_iterable, 'aclose'):
+                    await async_iterable.aclose()
+            items.put((finished, None))
+
+        future = asyncio.run_coroutine_threadsafe(pump(), self.loop)
+        try:
+            while True:
+                item, error = items.get()
+                if item is finished:
+                    if error is not None and not isinstance(error, asyncio.CancelledError):
+                        raise error
+                    return
+                yield item
+        finally:
+            future.cancel()
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
@@ -0,0 +1,45 @@
+"""
+Append-only buffers
+Numpy arrays with spare capacity that immutable index structures share,
+each reading only the prefix that existed when it was built
+"""
+import numpy as np
+
+
+class AppendOnlyArray:
+    """
+    Growable numpy buffer shared by snapshots, each reading its own prefix
+
+    Items are the buffer's rows, so a 2-D buffer grows by whole rows.
+
+    appended() writes into spare capacity when it extends the whole filled
+    prefix, which no published snapshot reads past, and otherwise (an older
+    prefix, a full or read-only buffer) copies into a new buffer with
+    doubled capacity, so appends cost O(1) amortised.
+    """
+    __slots__ = ('data', 'size')
+
+    def __init__(self, data, size=None):
+        self.data = data
+        # Items written so far; readers only ever look at a prefix of them
+        self.size = len(data) if size is None else size
+
+    @classmethod
+    def empty(cls, dtype):
+        return cls(np.zeros(0, dtype=dtype))
+
+    def view(self, n):
+        return self.data[:n]
+
+    def appended(self, n, values):
+        """Buffer holding the first n items followed by values"""
+        values = np.asarray(values, dtype=self.data.dtype)
+        end = n + len(values)
+        if n == self.size and end <= len(self.data) and self.data.flags.writeable:
+            self.data[n:end] = values
+            self.size = end
+            return self
+        data = np.empty((max(2 * end, 1024),) + self.data.shape[1:], dtype=self.data.dtype)
+        data[:n] = self.data[:n]
+        data[n:end] = values
+        return AppendOnlyArray(data, end)
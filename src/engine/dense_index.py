@@ -0,0 +1,195 @@
+"""
+Dense semantic retrieval
+LSA embeddings (truncated SVD of the TF-IDF matrix) searched through an IVF
+index: documents are clustered around k-means centroids and a query only
+scores the documents in its n_probe closest clusters
+"""
+import numpy as np
+
+from .buffers import AppendOnlyArray
+
+
+class DenseIndex:
+    """
+    Contiguous float32 LSA vectors with an inverted file of clusters
+
+    Documents added after fitting are folded into the existing LSA space
+    and kept in a tail that every query scans exhaustively, until the tail
+    is merged into the cluster lists. Instances are never modified: adding
+    rows returns a new index, so concurrent queries keep a consistent view.
+    Vectors and cluster assignments are appended to buffers shared with
+    the indexes they were extended from, each reading its own rows.
+    """
+    # Documents sampled to fit the SVD; every document is then projected
+    SVD_SAMPLE_ROWS = 50000
+    # k-means training sample size per cluster and Lloyd iterations
+    TRAIN_SAMPLES_PER_LIST = 32
+    KMEANS_ITERATIONS = 10
+    # Rows scored per matrix product when assigning documents to clusters
+    ASSIGN_CHUNK_ROWS = 65536
+
+    def __init__(self, components, vectors, centroids, assignments, fitted_rows, lists=None, buffers=None):
+        self.components = components
+        self.vectors = vectors
+        self.centroids = centroids
+        self.assignments = assignments
+        self.fitted_rows = fitted_rows
+        # Growable buffers that vectors and assignments are prefixes of
+        self._buffers = buffers or (AppendOnlyArray(vectors), AppendOnlyArray(assignments))
+        if lists is None:
+            self._index_lists()
+        else:
+            self.list_rows, self.list_offsets = lists
+
+    @classmethod
+    def fit(cls, matrix, n_components=128, n_lists=None, seed=0):
+        """
+        Fit LSA and the cluster index on an L2-normalised TF-IDF matrix
+
+        Args:
+            matrix: Sparse document x term matrix
+            n_components: Embedding dimensions
+            n_lists: Number of clusters; defaults to about 4 * sqrt(documents)
+            seed: Random seed for the SVD and k-means
+        """
+        from sklearn.utils.extmath import randomized_svd
+
+        rng = np.random.default_rng(seed)
+        matrix = matrix.astype(np.float32)
+        n_docs, n_terms = matrix.shape
+        sample = matrix
+        if n_docs > cls.SVD_SAMPLE_ROWS:
+            sample = matrix[np.sort(rng.choice(n_docs, cls.SVD_SAMPLE_ROWS, replace=False))]
+        n_components = max(1, min(n_components, sample.shape[0], n_terms))
+        _, _, components = randomized_svd(sample, n_components, n_iter=4, random_state=seed)
+        components = np.ascontiguousarray(components, dtype=np.float32)
+        vectors = cls._project(matrix, components)
+
+        if n_lists is None:
+            n_lists = int(4 * np.sqrt(n_docs)) if n_docs >= 1024 else 1
+        n_lists = max(1, min(n_lists, n_docs))
+        centroids = cls._kmeans(vectors, n_lists, rng)
+        assignments = cls._assign(vectors, centroids)
+        return cls(components, vectors, centroids, assignments, n_docs)
+
+    @staticmethod
+    def _project(matrix, components):
+        """Embed TF-IDF rows in the LSA space, L2-normalised"""
+        from scipy.sparse import csr_matrix
+
+        n_terms = components.shape[1]
+        if matrix.shape[1] > n_terms:
+            matrix = matrix[:, :n_terms]  # terms first seen after fitting
+        elif matrix.shape[1] < n_terms:
+            # Rows of a snapshot older than the fit lack its newest terms
+            matrix = matrix.tocsr()
+            matrix = csr_matrix((matrix.data, matrix.indices, matrix.indptr), shape=(matrix.shape[0], n_terms))
+        vectors = np.asarray(matrix @ components.T, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.divide(vectors, norms, out=vectors, where=norms > 0)
+        return np.ascontiguousarray(vectors)
+
+    @classmethod
+    def _kmeans(cls, vectors, n_lists, rng):
+        """Spherical k-means centroids trained on a sample of the vectors"""
+        from scipy.sparse import csr_matrix
+
+        if n_lists == 1:
+            return np.zeros((1, vectors.shape[1]), dtype=np.float32)
+        n_samples = min(len(vectors), n_lists * cls.TRAIN_SAMPLES_PER_LIST)
+        sample = vectors[rng.choice(len(vectors), n_samples, replace=False)]
+        centroids = sample[rng.choice(n_samples, n_lists, replace=False)].copy()
+        members = np.arange(n_samples)
+        for _ in range(cls.KMEANS_ITERATIONS):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            # Per-cluster sums as one sparse (clusters x samples) product
+            sums = csr_matrix((np.ones(n_samples, dtype=np.float32), (labels, members)),
+                              shape=(n_lists, n_samples)) @ sample
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            # Empty clusters keep their previous centroid
+            centroids = np.where(norms > 0, sums / np.where(norms > 0, norms, 1), centroids)
+        return np.ascontiguousarray(centroids, dtype=np.float32)
+
+    @classmethod
+    def _assign(cls, vectors, centroids):
+        if len(centroids) == 1:
+            return np.zeros(len(vectors), dtype=np.int32)
+        labels = [np.argmax(vectors[start:start + cls.ASSIGN_CHUNK_ROWS] @ centroids.T, axis=1)
+                  for start in range(0, len(vectors), cls.ASSIGN_CHUNK_ROWS)]
+        return np.concatenate(labels).astype(np.int32) if labels else np.zeros(0, dtype=np.int32)
+
+    def _index_lists(self):
+        """Group indexed rows by cluster: rows of list l are list_rows[offsets[l]:offsets[l + 1]]"""
+        self.list_rows = np.argsort(self.assignments, kind='stable').astype(np.int64)
+        self.list_offsets = np.zeros(len(self.centroids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.assignments, minlength=len(self.centroids)), out=self.list_offsets[1:])
+
+    def __len__(self):
+        return len(self.vectors)
+
+    @property
+    def tail_rows(self):
+        return len(self.vectors) - len(self.assignments)
+
+    def added(self, matrix):
+        """Index with new TF-IDF rows folded into the existing LSA space"""
+        vectors = self._buffers[0].appended(len(self.vectors), self._project(matrix, self.components))
+        index = DenseIndex(self.components, vectors.view(vectors.size), self.centroids, self.assignments,
+                           self.fitted_rows, (self.list_rows, self.list_offsets), (vectors, self._buffers[1]))
+        # Keep single-document inserts cheap: cluster the tail in batches
+        if index.tail_rows > max(1024, len(index.assignments) // 10):
+            index = index.merged()
+        return index
+
+    def merged(self):
+        """Index with the tail assigned to the cluster lists"""
+        n_assigned, n_lists = len(self.assignments), len(self.centroids)
+        labels = self._assign(self.vectors[n_assigned:], self.centroids)
+        assignments = self._buffers[1].appended(n_assigned, labels)
+
+        # Tail rows join the end of their lists, so only they are sorted:
+        # listed rows move up by the tail rows of the lists before theirs
+        tail_offsets = np.zeros(n_lists + 1, dtype=np.int64)
+        np.cumsum(np.bincount(labels, minlength=n_lists), out=tail_offsets[1:])
+        list_rows = np.empty(len(self.vectors), dtype=np.int64)
+        listed = np.repeat(np.arange(n_lists), np.diff(self.list_offsets))
+        list_rows[np.arange(n_assigned) + tail_offsets[listed]] = self.list_rows
+        order = np.argsort(labels, kind='stable')
+        list_rows[self.list_offsets[labels[order] + 1] + np.arange(len(labels))] = n_assigned + order
+        return DenseIndex(self.components, self.vectors, self.centroids, assignments.view(assignments.size),
+                          self.fitted_rows, (list_rows, self.list_offsets + tail_offsets),
+                          (self._buffers[0], assignments))
+
+    def select(self, keep):
+        """Index over the rows where keep (a mask over all rows) is true, renumbered in order"""
+        return DenseIndex(self.components, self.vectors[keep], self.centroids,
+                          self.assignments[keep[:len(self.assignments)]], self.fitted_rows)
+
+    def embed_query(self, query_vector):
+        """LSA embedding of a TF-IDF query vector (sparse, 1 x terms)"""
+        return self._project(query_vector, self.components)[0]
+
+    def candidates(self, query, n_probe):
+        """Return (rows, cosine similarities) of the rows probed for a query embedding"""
+        n_lists = len(self.centroids)
+        if n_probe < n_lists:
+            lists = np.argpartition(-(self.centroids @ query), n_probe)[:n_probe]
+            parts = [self.list_rows[self.list_offsets[l]:self.list_offsets[l + 1]] for l in lists]
+        else:
+            parts = [self.list_rows]
+        parts.append(np.arange(len(self.assignments), len(self.vectors)))
+        rows = np.concatenate(parts)
+        return rows, self.vectors[rows] @ query
+
+    def arrays(self):
+        return {
+            'components': self.components,
+            'vectors': self.vectors,
+            'centroids': self.centroids,
+            'assignments': self.assignments
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays, fitted_rows):
+        return cls(arrays['components'], arrays['vectors'], arrays['centroids'],
+                   arrays['assignments'], fitted_rows)
@@ -0,0 +1,290 @@
+"""
+Compact document storage
+Documents are kept column-wise: all text in one UTF-8 arena, timestamps and
+offsets in typed arrays and embeddings in a single float32 buffer, so a
+stored document costs a few dozen bytes plus its text instead of a Python
+object graph per document
+"""
+from array import array
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+# Text fields stored in the arena, in arena order
+TEXT_FIELDS = ('id', 'title', 'content', 'url')
+# Keys of to_dict(), which can be selected individually
+DOCUMENT_FIELDS = TEXT_FIELDS + ('created_at',)
+
+_HAS_URL = 1
+_HAS_CREATED_AT = 2
+_UTC = 4
+_HAS_EMBEDDING = 8
+
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_UTC = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+class DocumentStore:
+    """
+    Append-only columnar store of documents
+
+    Indexing returns the row number of a document; store[row] is a
+    DocumentView that decodes fields only when they are read. A store
+    restored by from_arrays() reads its rows from the given, possibly
+    memory-mapped, arrays and keeps rows appended later in its own buffers.
+    """
+
+    def __init__(self):
+        # Text and embeddings of the rows restored by from_arrays(), never
+        # modified; appended rows go to _text and _vectors, their offsets
+        # continuing after these
+        self._base_text = np.empty(0, dtype=np.uint8)
+        self._base_vectors = np.empty(0, dtype=np.float32)
+        self._text = bytearray()
+        # len(TEXT_FIELDS) + 1 boundaries per row, the last one shared with
+        # the next row's first
+        self._text_offsets = array('q', [0])
+        self._flags = bytearray()
+        # Microseconds since the epoch (UTC for timezone-aware values)
+        self._created_at = array('q')
+        self._vectors = array('f')
+        self._vector_offsets = array('q', [0])
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Store reading its rows from arrays() output, without copying it"""
+        store = cls()
+        store._base_text = arrays['text']
+        store._base_vectors = arrays['vectors']
+        store._text_offsets = arrays['text_offsets']
+        store._flags = arrays['flags']
+        store._created_at = arrays['created_at']
+        store._vector_offsets = arrays['vector_offsets']
+        return store
+
+    def arrays(self, n_rows=None):
+        """
+        The first n_rows rows (default: all) as numpy arrays for from_arrays()
+
+        Safe while other threads append rows.
+        """
+        n_rows = len(self) if n_rows is None else n_rows
+        width = len(TEXT_FIELDS)
+        text_offsets = np.array(self._text_offsets[:n_rows * width + 1], dtype=np.int64)
+        vector_offsets = np.array(self._vector_offsets[:n_rows + 1], dtype=np.int64)
+        return {
+            'text': np.concatenate([
+                self._base_text[:text_offsets[-1]],
+                np.frombuffer(self._text[:max(text_offsets[-1] - len(self._base_text), 0)], dtype=np.uint8)]),
+            'text_offsets': text_offsets,
+            'flags': np.array(self._flags[:n_rows], dtype=np.uint8),
+            'created_at': np.array(self._created_at[:n_rows], dtype=np.int64),
+            'vectors': np.concatenate([
+                self._base_vectors[:vector_offsets[-1]],
+                np.frombuffer(self._vectors[:max(vector_offsets[-1] - len(self._base_vectors), 0)],
+                              dtype=np.float32)]),
+            'vector_offsets': vector_offsets
+        }
+
+    def _writable(self):
+        # Per-row arrays restored by from_arrays() are copied into growable
+        # buffers on the first append; text and embeddings never are
+        if isinstance(self._flags, np.ndarray):
+            self._text_offsets = array('q', self._text_offsets.tobytes())
+            self._flags = bytearray(self._flags.tobytes())
+            self._created_at = array('q', self._created_at.tobytes())
+            self._vector_offsets = array('q', self._vector_offsets.tobytes())
+
+    def _text_end(self):
+        return len(self._base_text) + len(self._text)
+
+    def _vectors_end(self):
+        return len(self._base_vectors) + len(self._vectors)
+
+    def _text_bytes(self, start, end):
+        base = len(self._base_text)
+        if end <= base:
+            return self._base_text[start:end].tobytes()
+        return self._text[start - base:end - base]
+
+    def _vector_values(self, start, end):
+        base = len(self._base_vectors)
+        if end <= base:
+            return array('f', self._base_vectors[start:end].tobytes())
+        return self._vectors[start - base:end - base]
+
+    def append(self, document):
+        """Store any object with Document's attributes and return its row"""
+        return self.append_fields(*(getattr(document, name, None) for name in TEXT_FIELDS),
+                                  created_at=getattr(document, 'created_at', None),
+                                  embedding=getattr(document, 'embedding', None))
+
+    def append_fields(self, id, title, content, url=None, created_at=None, embedding=None):
+        self._writable()
+        flags = 0
+        for name, value in zip(TEXT_FIELDS, (id, title, content, url)):
+            if value is not None:
+                self._text += str(value).encode('utf-8')
+                if name == 'url':
+                    flags |= _HAS_URL
+            self._text_offsets.append(self._text_end())
+
+        micros = 0
+        if created_at is not None:
+            flags |= _HAS_CREATED_AT
+            if created_at.tzinfo is not None:
+                flags |= _UTC
+                micros = (created_at - _EPOCH_UTC) // _MICROSECOND
+            else:
+                micros = (created_at - _EPOCH) // _MICROSECOND
+        self._created_at.append(micros)
+
+        if embedding is not None:
+            flags |= _HAS_EMBEDDING
+            self._vectors.frombytes(np.asarray(embedding, dtype=np.float32).tobytes())
+        self._vector_offsets.append(self._vectors_end())
+
+        self._flags.append(flags)
+        return len(self._flags) - 1
+
+    def select(self, rows, into=None):
+        """Copy rows, in the given order, into a new store (or append them to into)"""
+        store = into if into is not None else DocumentStore()
+        store._writable()
+        width = len(TEXT_FIELDS)
+        offsets = self._text_offsets
+        for row in rows:
+            # Raw byte copies: nothing is decoded or re-encoded
+            first, last = row * width, (row + 1) * width
+            shift = store._text_end() - int(offsets[first])
+            store._text += self._text_bytes(offsets[first], offsets[last])
+            store._text_offsets.extend(int(offset) + shift for offset in offsets[first + 1:last + 1])
+            store._flags.append(self._flags[row])
+            store._created_at.append(self._created_at[row])
+            store._vectors.extend(self._vector_values(self._vector_offsets[row], self._vector_offsets[row + 1]))
+            store._vector_offsets.append(store._vectors_end())
+        return store
+
+    def __len__(self):
+        return len(self._flags)
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [DocumentView(self, i) for i in range(*row.indices(len(self)))]
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError('document row out of range')
+        return DocumentView(self, row)
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield DocumentView(self, row)
+
+    def text(self, row, name):
+        field = TEXT_FIELDS.index(name)
+        if name == 'url' and not self._flags[row] & _HAS_URL:
+            return None
+        start = row * len(TEXT_FIELDS) + field
+        return self._text_bytes(self._text_offsets[start], self._text_offsets[start + 1]).decode('utf-8')
+
+    def ids(self):
+        """Ids of all rows, those restored by from_arrays() gathered in one pass"""
+        width = len(TEXT_FIELDS)
+        offsets = np.array(self._text_offsets, dtype=np.int64)
+        starts, ends = offsets[:-1:width], offsets[1::width]
+        n_base = int(np.searchsorted(ends, len(self._base_text), side='right'))
+        lengths = ends[:n_base] - starts[:n_base]
+        bounds = np.concatenate([[0], np.cumsum(lengths)])
+        data = self._base_text[np.repeat(starts[:n_base] - bounds[:-1], lengths) + np.arange(bounds[-1])].tobytes()
+        bounds = bounds.tolist()
+        return ([data[bounds[row]:bounds[row + 1]].decode('utf-8') for row in range(n_base)]
+                + [self.text(row, 'id') for row in range(n_base, len(self))])
+
+    def created_at(self, row):
+        flags = self._flags[row]
+        if not flags & _HAS_CREATED_AT:
+            return None
+        delta = timedelta(microseconds=int(self._created_at[row]))
+        return _EPOCH_UTC + delta if flags & _UTC else _EPOCH + delta
+
+    def embedding(self, row):
+        if not self._flags[row] & _HAS_EMBEDDING:
+            return None
+        # Slicing copies, so the caller's array never pins the growing buffer
+        return np.frombuffer(self._vector_values(self._vector_offsets[row], self._vector_offsets[row + 1]),
+                             dtype=np.float32)
+
+    def to_dict(self, row, fields=None):
+        """Dictionary form of a row; only the selected fields are decoded"""
+        data = {}
+        for name in fields or DOCUMENT_FIELDS:
+            if name == 'created_at':
+                created_at = self.created_at(row)
+                data[name] = created_at.isoformat() if created_at else None
+            else:
+                data[name] = self.text(row, name)
+        return data
+
+    def nbytes(self):
+        """Bytes held by the store's buffers"""
+        buffers = (self._base_text, self._text, self._text_offsets, self._flags, self._created_at,
+                   self._base_vectors, self._vectors, self._vector_offsets)
+        return sum(len(buffer) * getattr(buffer, 'itemsize', 1) for buffer in buffers)
+
+
+class DocumentView:
+    """Read-only document backed by a row of a DocumentStore"""
+    __slots__ = ('_store', '_row')
+
+    def __init__(self, store, row):
+        self._store = store
+        self._row = row
+
+    @property
+    def id(self):
+        return self._store.text(self._row, 'id')
+
+    @property
+    def title(self):
+        return self._store.text(self._row, 'title')
+
+    @property
+    def content(self):
+        return self._store.text(self._row, 'content')
+
+    @property
+    def url(self):
+        return self._store.text(self._row, 'url')
+
+    @property
+    def created_at(self):
+        return self._store.created_at(self._row)
+
+    @property
+    def embedding(self):
+        return self._store.embedding(self._row)
+
+    def to_dict(self):
+        return self._store.to_dict(self._row)
+
+    def __eq__(self, other):
+        try:
+            return all(getattr(self, name) == getattr(other, name) for name in TEXT_FIELDS + ('created_at',))
+        except AttributeError:
+            return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"DocumentView(id={self.id!r}, title={self.title!r})"
+
+    def __reduce__(self):
+        # Sent to other processes on its own, not with the whole store
+        return _detached_view, (self.id, self.title, self.content, self.url, self.created_at, self.embedding)
+
+
+def _detached_view(*fields):
+    store = DocumentStore()
+    return DocumentView(store, store.append_fields(*fields))
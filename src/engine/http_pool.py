@@ -0,0 +1,93 @@
+"""
+Pooled HTTP sessions for upstream APIs
+One keep-alive requests.Session per upstream host, shared by every request
+thread of the process, so repeated calls to the same API reuse open
+TCP/TLS connections instead of paying a new handshake each time
+"""
+import threading
+from urllib.parse import urlsplit
+
+
+class HttpSessionPool:
+    """
+    Per-host keep-alive sessions with a shared retry policy and timeouts
+
+    Each host gets its own session whose connection pool keeps up to
+    pool_size idle connections open, so as many threads can call the host
+    at once without opening new connections. Failed connections and 502/
+    503/504 responses to GETs are retried up to retries times with
+    exponential backoff. Calls without an explicit timeout wait at most
+    connect_timeout to connect and read_timeout between received bytes.
+    """
+    RETRY_STATUSES = (502, 503, 504)
+
+    def __init__(self, pool_size=10, retries=2, backoff_factor=0.3, connect_timeout=5.0, read_timeout=15.0):
+        self.pool_size = pool_size
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        # (scheme, host[:port]) -> session
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def session_for(self, url):
+        """Return the shared session for url's scheme and host, creating it on first use"""
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.netloc)
+        session = self._sessions.get(key)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(key)
+                if session is None:
+                    session = self._sessions[key] = self._new_session()
+        return session
+
+    def _new_session(self):
+        # requests is imported on first use, keeping it out of cold starts
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        retry = Retry(total=self.retries, backoff_factor=self.backoff_factor,
+                      status_forcelist=self.RETRY_STATUSES, allowed_methods=frozenset(['GET', 'HEAD']),
+                      raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def get(self, url, timeout=None, **kwargs):
+        """
+        requests.get through the host's pooled session
+
+        Args:
+            url: Request URL
+            timeout: Read timeout in seconds (default: read_timeout); the
+                connect timeout is always connect_timeout
+            **kwargs: Passed on to Session.get (params, headers, ...)
+        """
+        timeout = (self.connect_timeout, timeout if timeout is not None else self.read_timeout)
+        return self.session_for(url).get(url, timeout=timeout, **kwargs)
+
+    def stats(self):
+        """Open and idle connections per host"""
+        with self._lock:
+            sessions = dict(self._sessions)
+        stats = {}
+        for (scheme, host), session in sessions.items():
+            pools = session.get_adapter(f"{scheme}://{host}").poolmanager.pools
+            connections = [pool for pool in (pools.get(key) for key in pools.keys()) if pool is not None]
+            stats[f"{scheme}://{host}"] = {
+                'connections_opened': sum(pool.num_connections for pool in connections),
+                'idle_connections': sum(pool.pool.qsize() for pool in connections if pool.pool is not None),
+                'requests': sum(pool.num_requests for pool in connections)
+            }
+        return stats
+
+    def close(self):
+        with self._lock:
+            sessions, self._sessions = list(self._sessions.values()), {}
+        for session in sessions:
+            session.close()
@@ -1,66 +1,1347 @@
+import json
+import logging
+import os
+import shutil
+import threading
+import uuid
+from collections import Counter
+from datetime import datetime
+from functools import lru_cache
+from typing import NamedTuple
+
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-import nltk
-from nltk.tokenize import word_tokenize
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
+
+from .buffers import AppendOnlyArray
+from .dense_index import DenseIndex
+from .document_store import DocumentStore
+from .spelling import SpellingIndex
+
+logger = logging.getLogger(__name__)
+
+# NLTK's English stopword list, used when the NLTK data is not installed so
+# that tokens match those of an index built with it
+NLTK_ENGLISH_STOP_WORDS = frozenset((
+    'i', 'me', 'my', 'myself', 'we', 'our', 'ours', 'ourselves', 'you', "you're", "you've", "you'll", "you'd",
+    'your', 'yours', 'yourself', 'yourselves', 'he', 'him', 'his', 'himself', 'she', "she's", 'her', 'hers',
+    'herself', 'it', "it's", 'its', 'itself', 'they', 'them', 'their', 'theirs', 'themselves', 'what', 'which',
+    'who', 'whom', 'this', 'that', "that'll", 'these', 'those', 'am', 'is', 'are', 'was', 'were', 'be', 'been',
+    'being', 'have', 'has', 'had', 'having', 'do', 'does', 'did', 'doing', 'a', 'an', 'the', 'and', 'but',
+    'if', 'or', 'because', 'as', 'until', 'while', 'of', 'at', 'by', 'for', 'with', 'about', 'against',
+    'between', 'into', 'through', 'during', 'before', 'after', 'above', 'below', 'to', 'from', 'up', 'down',
+    'in', 'out', 'on', 'off', 'over', 'under', 'again', 'further', 'then', 'once', 'here', 'there', 'when',
+    'where', 'why', 'how', 'all', 'any', 'both', 'each', 'few', 'more', 'most', 'other', 'some', 'such', 'no',
+    'nor', 'not', 'only', 'own', 'same', 'so', 'than', 'too', 'very', 's', 't', 'can', 'will', 'just', 'don',
+    "don't", 'should', "should've", 'now', 'd', 'll', 'm', 'o', 're', 've', 'y', 'ain', 'aren', "aren't",
+    'couldn', "couldn't", 'didn', "didn't", 'doesn', "doesn't", 'hadn', "hadn't", 'hasn', "hasn't", 'haven',
+    "haven't", 'isn', "isn't", 'ma', 'mightn', "mightn't", 'mustn', "mustn't", 'needn', "needn't", 'shan',
+    "shan't", 'shouldn', "shouldn't", 'wasn', "wasn't", 'weren', "weren't", 'won', "won't", 'wouldn',
+    "wouldn't"
+))
+
+
+class IndexSegment(NamedTuple):
+    """Immutable arrays for a contiguous run of documents
+
+    The forward index is stored in CSR layout (the term ids and counts of
+    the segment's i-th document live in [doc_offsets[i], doc_offsets[i + 1]))
+    and the inverted index in CSC layout over the segment's own terms: the
+    ascending doc ids and counts of term post_terms[j] live in
+    [post_offsets[j], post_offsets[j + 1]). Only terms the segment holds
+    take space, so a small segment stays small however large the
+    vocabulary. Posting doc ids are index rows, so segments can be searched
+    side by side.
+    """
+    doc_offsets: np.ndarray
+    doc_terms: np.ndarray
+    doc_counts: np.ndarray
+    post_terms: np.ndarray
+    post_offsets: np.ndarray
+    post_docs: np.ndarray
+    post_counts: np.ndarray
+
+    @classmethod
+    def empty(cls):
+        offsets = np.zeros(1, dtype=np.int64)
+        values = np.zeros(0, dtype=np.int32)
+        return cls(offsets, values, values, values, offsets, values, values)
+
+    @classmethod
+    def from_forward(cls, doc_terms, doc_counts, doc_offsets, first_row=0):
+        """Build a segment by inverting a CSR forward index of rows from first_row on"""
+        n_docs = len(doc_offsets) - 1
+        rows = np.repeat(np.arange(first_row, first_row + n_docs, dtype=np.int32), np.diff(doc_offsets))
+        # A stable sort by term keeps each posting list in ascending doc order
+        order = np.argsort(doc_terms, kind='stable')
+        sorted_terms = doc_terms[order]
+        post_terms, starts = np.unique(sorted_terms, return_index=True)
+        post_offsets = np.append(starts, len(sorted_terms)).astype(np.int64)
+        return cls(doc_offsets, doc_terms, doc_counts, post_terms.astype(np.int32),
+                   post_offsets, rows[order], doc_counts[order])
+
+    @property
+    def n_docs(self):
+        return len(self.doc_offsets) - 1
+
+    def locate(self, term_ids):
+        """Return (positions in post_terms, found mask) of term ids"""
+        if not len(self.post_terms):
+            return np.zeros_like(term_ids, dtype=np.int64), np.zeros_like(term_ids, dtype=bool)
+        positions = np.minimum(np.searchsorted(self.post_terms, term_ids), len(self.post_terms) - 1)
+        return positions, self.post_terms[positions] == term_ids
+
+
+class TermCounts:
+    """
+    Immutable counts per term id: a dense base plus sparse runs
+
+    added() appends a run of sorted (term ids, counts) for the terms of a
+    batch and merges runs like FieldIndex merges segments, so an add costs
+    O(terms in the batch) amortised and a lookup one binary search per run.
+    """
+
+    def __init__(self, base=None, runs=()):
+        self.base = base if base is not None else np.zeros(0, dtype=np.int32)
+        self.runs = tuple(runs)
+
+    def added(self, term_ids):
+        """Counts with one added per occurrence of each term id"""
+        term_ids = np.asarray(term_ids, dtype=np.int64)
+        if not len(term_ids):
+            return self
+        runs = list(self.runs)
+        terms, counts = np.unique(term_ids, return_counts=True)
+        while runs and len(runs[-1][0]) < FieldIndex.SEGMENT_MERGE_RATIO * len(terms):
+            previous_terms, previous_counts = runs.pop()
+            terms, inverse = np.unique(np.concatenate([previous_terms, terms]), return_inverse=True)
+            counts = np.bincount(inverse, weights=np.concatenate([previous_counts, counts]))
+        runs.append((terms, counts.astype(np.int64)))
+        return TermCounts(self.base, runs)
+
+    def __getitem__(self, term_ids):
+        scalar = np.ndim(term_ids) == 0
+        term_ids = np.atleast_1d(np.asarray(term_ids, dtype=np.int64))
+        in_base = term_ids < len(self.base)
+        counts = np.zeros(len(term_ids), dtype=np.int64)
+        counts[in_base] = self.base[term_ids[in_base]]
+        for terms, run_counts in self.runs:
+            positions = np.minimum(np.searchsorted(terms, term_ids), len(terms) - 1)
+            found = terms[positions] == term_ids
+            counts[found] += run_counts[positions[found]]
+        return int(counts[0]) if scalar else counts
+
+    def dense(self, n_terms):
+        """Counts of term ids [0, n_terms) as one array"""
+        counts = np.zeros(n_terms, dtype=np.int64)
+        base = self.base[:n_terms]
+        counts[:len(base)] = base
+        for terms, run_counts in self.runs:
+            keep = terms < n_terms
+            counts[terms[keep]] += run_counts[keep]
+        return counts
+
+
+class FieldIndex:
+    """Postings, forward index and lengths of one document field
+
+    Immutable: documents live in segments of consecutive rows (the first one
+    memory-mapped when loaded from a snapshot), and added() returns a new
+    FieldIndex that shares every segment it does not merge. Field lengths
+    are appended to a buffer shared with the fields this one was built from.
+    """
+    # A new segment is merged into the previous one unless that holds at
+    # least this many times more documents, which keeps O(log documents)
+    # segments per field while each document is rewritten O(log) times
+    SEGMENT_MERGE_RATIO = 4
+
+    def __init__(self, segments=(), lengths=None, n_docs=0, total_length=0):
+        self.segments = tuple(segments)
+        # Field length (in terms) of every document, and their total
+        self._lengths = lengths if lengths is not None else AppendOnlyArray.empty(np.int32)
+        self.n_docs = n_docs
+        self.total_length = total_length
+
+    def __len__(self):
+        return self.n_docs
+
+    @property
+    def lengths(self):
+        return self._lengths.view(self.n_docs)
+
+    def added(self, term_counts):
+        """
+        Return a new field with documents appended
+
+        Args:
+            term_counts: One [(term id, count)] list per document
+        """
+        if not term_counts:
+            return self
+        offsets = np.zeros(len(term_counts) + 1, dtype=np.int64)
+        np.cumsum([len(pairs) for pairs in term_counts], out=offsets[1:])
+        pairs = np.array([pair for pairs in term_counts for pair in pairs], dtype=np.int32).reshape(-1, 2)
+        terms, counts = pairs[:, 0].copy(), pairs[:, 1].copy()
+
+        segments = list(self.segments)
+        first_row = len(self)
+        segment = IndexSegment.from_forward(terms, counts, offsets, first_row)
+        while segments and segments[-1].n_docs < self.SEGMENT_MERGE_RATIO * segment.n_docs:
+            previous = segments.pop()
+            first_row -= previous.n_docs
+            segment = IndexSegment.from_forward(*self._concatenate([previous, segment]), first_row)
+        segments.append(segment)
+
+        lengths = np.array([sum(count for _, count in pairs) for pairs in term_counts], dtype=np.int32)
+        return FieldIndex(segments, self._lengths.appended(self.n_docs, lengths), self.n_docs + len(term_counts),
+                          self.total_length + int(lengths.sum()))
+
+    @staticmethod
+    def _concatenate(segments):
+        """(terms, counts, offsets) of consecutive segments in one CSR forward index"""
+        if not segments:
+            segments = [IndexSegment.empty()]
+        offsets, base = [segments[0].doc_offsets[:1]], 0
+        for segment in segments:
+            offsets.append(segment.doc_offsets[1:] + base)
+            base += segment.doc_offsets[-1]
+        return (np.concatenate([segment.doc_terms for segment in segments]),
+                np.concatenate([segment.doc_counts for segment in segments]),
+                np.concatenate(offsets))
+
+    def posting_parts(self, term_id):
+        """Return the (doc ids, counts) runs of a term, one per segment holding it, in row order"""
+        parts = []
+        for segment in self.segments:
+            position, found = segment.locate(term_id)
+            if found:
+                start, end = segment.post_offsets[position], segment.post_offsets[position + 1]
+                parts.append((segment.post_docs[start:end], segment.post_counts[start:end]))
+        return parts
+
+    def document_frequency(self, term_ids):
+        """Documents containing each of term_ids in this field"""
+        term_ids = np.asarray(term_ids, dtype=np.int64)
+        df = np.zeros(len(term_ids), dtype=np.int64)
+        for segment in self.segments:
+            positions, found = segment.locate(term_ids)
+            # Terms are unique within a document, so postings count documents
+            df[found] += segment.post_offsets[positions[found] + 1] - segment.post_offsets[positions[found]]
+        return df
+
+    def document_frequencies(self, n_terms):
+        """Documents containing each term id in [0, n_terms) in this field"""
+        df = np.zeros(n_terms, dtype=np.int64)
+        for segment in self.segments:
+            df[segment.post_terms] += np.diff(segment.post_offsets)
+        return df
+
+    def forward_index(self):
+        """Return (terms, counts, offsets) in CSR layout for every document"""
+        return self._concatenate(list(self.segments))
+
+    def forward_rows(self, start):
+        """Return (terms, counts, offsets) of the documents from start on"""
+        # Skip the segments that end at or before start; every one after
+        # the first that does not is needed
+        first_row, skipped = 0, 0
+        for segment in self.segments:
+            if first_row + segment.n_docs > start:
+                break
+            first_row += segment.n_docs
+            skipped += 1
+        segments = list(self.segments[skipped:])
+        terms, counts, offsets = self._concatenate(segments)
+        offsets = offsets[start - first_row:]
+        begin = offsets[0]
+        return terms[begin:], counts[begin:], offsets - begin
+
+    def term_counts(self, start):
+        """[(term id, count)] lists of the documents from start on"""
+        terms, counts, offsets = self.forward_rows(start)
+        terms, counts = terms.tolist(), counts.tolist()
+        return [list(zip(terms[begin:end], counts[begin:end]))
+                for begin, end in zip(offsets[:-1].tolist(), offsets[1:].tolist())]
+
+    def compacted(self, live):
+        """Field holding only the rows where live is true, renumbered in order"""
+        terms, counts, offsets = self.forward_index()
+        keep = np.repeat(live, np.diff(offsets))
+        new_offsets = np.zeros(np.count_nonzero(live) + 1, dtype=np.int64)
+        np.cumsum(np.diff(offsets)[live], out=new_offsets[1:])
+        segment = IndexSegment.from_forward(terms[keep], counts[keep], new_offsets)
+        lengths = self.lengths[live]
+        return FieldIndex([segment], AppendOnlyArray(lengths), len(lengths), int(np.sum(lengths, dtype=np.int64)))
+
+    def rebuilt(self):
+        """Field with every document merged into a single segment"""
+        segment = IndexSegment.from_forward(*self.forward_index())
+        return FieldIndex([segment], self._lengths, self.n_docs, self.total_length)
+
+    def arrays(self):
+        """Arrays persisted in a snapshot (the field must hold at most one segment)"""
+        segment = self.segments[0] if self.segments else IndexSegment.empty()
+        return dict(segment._asdict(), lengths=self.lengths)
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        segment = IndexSegment(*(arrays[name] for name in IndexSegment._fields))
+        lengths = arrays['lengths']
+        return cls([segment] if segment.n_docs else [], AppendOnlyArray(lengths), len(lengths),
+                   int(np.sum(lengths, dtype=np.int64)))
+
+
+class RowsRenumbered(Exception):
+    """Raised when rows were renumbered since the epoch a row position was taken in"""
+
+
+class IndexSnapshot(NamedTuple):
+    """
+    Immutable state of an Indexer at one generation
+
+    Writers build a new snapshot and publish it by replacing a single
+    attribute, so a query that reads Indexer.snapshot once sees the
+    documents, postings, statistics and tombstones of one generation while
+    writes carry on. The document store, vocabulary, terms, spelling index
+    and tombstones are append-only and shared between snapshots, each of
+    which only reads its first n_docs rows and n_terms terms.
+    """
+    documents: DocumentStore
+    n_docs: int
+    vocabulary: dict
+    # Term of each term id, the inverse of vocabulary
+    terms: list
+    # Spelling correction index over terms, extended as terms are added
+    spelling: SpellingIndex
+    n_terms: int
+    fields: dict
+    # Documents containing each term id in any field
+    doc_freq_any: TermCounts
+    # Tombstones: the generation each row was deleted at (LIVE if it was
+    # not), so a delete sets one entry in place without affecting older
+    # snapshots. Deleted rows stay in the postings and are filtered at
+    # query time until compaction rewrites the index
+    deleted_at: AppendOnlyArray
+    n_deleted: int
+    generation: int
+    # Incremented whenever rows are renumbered (compaction, load), so row
+    # positions taken in one epoch are meaningless in another
+    epoch: int
+    # Query weights and score matrices derived lazily from the term
+    # statistics; shared by snapshots that differ only in tombstones
+    cache: dict
+
+    LIVE = np.iinfo(np.int64).max
+
+    @classmethod
+    def empty(cls, fields):
+        return cls(DocumentStore(), 0, {}, [], SpellingIndex(), 0, {name: FieldIndex() for name in fields},
+                   TermCounts(), AppendOnlyArray.empty(np.int64), 0, 0, 0, {})
+
+    def deleted_rows(self, rows=None):
+        """Boolean mask of which rows (default: all of them) are deleted in this snapshot"""
+        deleted_at = self.deleted_at.view(self.n_docs) if rows is None else self.deleted_at.data[rows]
+        return deleted_at <= self.generation
+
 
 class Indexer:
-    def __init__(self):
-        self.documents = []
-        self.vectorizer = TfidfVectorizer()
-        self.document_vectors = None
-        
-        # Download required NLTK data
-        nltk.download('punkt')
-        nltk.download('punkt_tab')
-        nltk.download('stopwords')
-        nltk.download('wordnet')
-        nltk.download('omw-1.4')  # Open Multilingual Wordnet
-        
-        self.lemmatizer = WordNetLemmatizer()
-        self.stop_words = set(stopwords.words('english'))
+    SNAPSHOT_FORMAT_VERSION = 5
+    FIELDS = ('content', 'title')
+    RANKERS = ('tfidf', 'bm25', 'bm25f', 'dense')
 
-    def preprocess_text(self, text):
-        # Convert to lowercase
-        text = text.lower()
-        # Basic tokenization (split on whitespace)
-        tokens = text.split()
+    # Deleted fraction of the rows that triggers a background compaction
+    COMPACTION_THRESHOLD = 0.2
+
+    # Queries whose postings cover at least this fraction of the corpus are
+    # scored with a dense accumulator instead of MaxScore pruning
+    DENSE_QUERY_FRACTION = 0.25
+    # Queries scored per sparse product in get_similar_documents_many
+    BATCH_QUERY_ROWS = 1024
+
+    # BM25 saturation and length normalisation, plus the BM25F field boosts
+    BM25_K1 = 1.2
+    BM25_B = 0.75
+    BM25F_WEIGHTS = {'title': 2.0, 'content': 1.0}
+
+    # Dense retrieval: LSA dimensions, clusters probed per query, and the
+    # growth (relative to the fitted corpus) that triggers an LSA refit
+    DENSE_DIMENSIONS = 128
+    DENSE_N_PROBE = 16
+    DENSE_REFIT_RATIO = 0.5
+
+    # NLTK data used by preprocessing: package name -> resource path
+    NLTK_RESOURCES = {'stopwords': 'corpora/stopwords', 'wordnet': 'corpora/wordnet'}
+
+    def __init__(self, lemma_cache_size=100000, nltk_data_dir=None, spelling_correction=True):
+        # Everything queries read lives in the current immutable snapshot;
+        # writers serialise on the write lock and publish a new one, so
+        # queries never take a lock and never wait for writers
+        self.snapshot = IndexSnapshot.empty(self.FIELDS)
+        self._write_lock = threading.RLock()
+        # Row of each live document id (writer state, under the write lock)
+        self._id_rows = {}
+        self._compacting = False
+        # LSA embeddings + IVF index over the rows of _dense_documents,
+        # fitted in the background after the first dense query and extended
+        # as documents arrive. _dense_lock guards the published pair;
+        # _dense_build_lock serialises the (slow) fitting and extending
+        self._dense = None
+        self._dense_documents = None
+        self._dense_lock = threading.Lock()
+        self._dense_build_lock = threading.Lock()
+        self._dense_building = False
+        # Correct query terms missing from the vocabulary to the closest
+        # indexed term
+        self.spelling_correction = spelling_correction
+
+        # NLTK data is resolved on first use from local installs only: the
+        # vendored directory (nltk_data_dir or $NLTK_DATA_DIR) first, then
+        # NLTK's usual search path. Nothing is downloaded unless
+        # $NLTK_AUTO_DOWNLOAD is set
+        self.nltk_data_dir = nltk_data_dir or os.getenv('NLTK_DATA_DIR')
+        self._stop_words = None
+        self._lemmatizer = None
+
+        # Bounded memo of raw token -> lemma (or None when filtered out),
+        # shared by documents and queries; lemmatization dominates ingest CPU
+        self.normalize_token = lru_cache(maxsize=lemma_cache_size)(self._normalize_token)
+
+    # Read-only views of the current snapshot
+    @property
+    def documents(self):
+        return self.snapshot.documents
+
+    @property
+    def fields(self):
+        return self.snapshot.fields
+
+    @property
+    def vocabulary(self):
+        return self.snapshot.vocabulary
+
+    @property
+    def doc_freq_any(self):
+        snapshot = self.snapshot
+        return snapshot.doc_freq_any.dense(snapshot.n_terms)
+
+    @property
+    def generation(self):
+        return self.snapshot.generation
+
+    @property
+    def n_deleted(self):
+        return self.snapshot.n_deleted
+
+    @property
+    def stop_words(self):
+        if self._stop_words is None:
+            if self._find_nltk_resource('stopwords'):
+                from nltk.corpus import stopwords
+                self._stop_words = frozenset(stopwords.words('english'))
+            else:
+                self._stop_words = NLTK_ENGLISH_STOP_WORDS
+        return self._stop_words
+
+    @property
+    def lemmatizer(self):
+        if self._lemmatizer is None:
+            if self._find_nltk_resource('wordnet'):
+                from nltk.stem import WordNetLemmatizer
+                self._lemmatizer = WordNetLemmatizer()
+            else:
+                self._lemmatizer = _IdentityLemmatizer()
+        return self._lemmatizer
+
+    def _find_nltk_resource(self, package):
+        import nltk
+
+        if self.nltk_data_dir and self.nltk_data_dir not in nltk.data.path:
+            nltk.data.path.insert(0, self.nltk_data_dir)
+        try:
+            nltk.data.find(self.NLTK_RESOURCES[package])
+            return True
+        except LookupError:
+            pass
+        if os.getenv('NLTK_AUTO_DOWNLOAD') and nltk.download(package, download_dir=self.nltk_data_dir, quiet=True):
+            return True
+        logger.warning(f"NLTK resource '{package}' is not installed; using a built-in fallback. "
+                       f"Install it with: python -m nltk.downloader -d <dir> {package}")
+        return False
+
+    @property
+    def doc_freq(self):
+        """Content document frequency per term id (the TF-IDF statistic)"""
+        snapshot = self.snapshot
+        return snapshot.fields['content'].document_frequencies(snapshot.n_terms)
+
+    def _normalize_token(self, token):
         # Remove stopwords and lemmatize
-        tokens = [self.lemmatizer.lemmatize(token) 
-                 for token in tokens 
-                 if token.isalnum() and token not in self.stop_words]
-        return ' '.join(tokens)
+        if not token.isalnum() or token in self.stop_words:
+            return None
+        return self.lemmatizer.lemmatize(token)
+
+    def tokenize(self, text):
+        # Convert to lowercase and split on whitespace
+        normalized = (self.normalize_token(token) for token in text.lower().split())
+        return [token for token in normalized if token is not None]
+
+    def preprocess_text(self, text):
+        return ' '.join(self.tokenize(text))
+
+    def analyze(self, text):
+        # Index terms: the preprocessed tokens the default TF-IDF token
+        # pattern would keep (two or more characters)
+        return [token for token in self.tokenize(text) if len(token) > 1]
 
     def index_document(self, document):
-        self.documents.append(document)
-        # Update document vectors
-        self._update_vectors()
+        """Index a document, replacing any indexed document with the same id"""
+        self.index_documents([document])
+
+    def index_documents(self, documents):
+        # Batch insert: one published snapshot, so query-time weights are
+        # recomputed once per batch rather than once per document
+        with self._write_lock:
+            self._add_documents(documents)
+        self._maybe_compact()
+        if self._dense is not None:
+            self._schedule_dense_build()
+
+    def update_document(self, document):
+        """Replace the document with document.id; returns False if it was new"""
+        with self._write_lock:
+            existed = document.id in self._id_rows
+            self.index_document(document)
+        return existed
+
+    def delete_document(self, doc_id):
+        """
+        Delete a document by id; returns False if it is not indexed
+
+        The row is only tombstoned, in place and in O(1), leaving postings
+        and statistics untouched. Once deleted rows exceed
+        COMPACTION_THRESHOLD of the index, a background compaction rewrites
+        the index without them.
+        """
+        with self._write_lock:
+            row = self._id_rows.pop(doc_id, None)
+            if row is None:
+                return False
+            snapshot = self.snapshot
+            # Deleted as of the generation about to be published
+            snapshot.deleted_at.data[row] = snapshot.generation + 1
+            self._publish(n_deleted=snapshot.n_deleted + 1, stats=False)
+        self._maybe_compact()
+        return True
+
+    def _publish(self, stats=True, **changes):
+        """
+        Swap in a copy of the current snapshot with changes applied
+
+        stats=False keeps the cached weights and matrices, for changes that
+        leave the term statistics alone.
+        """
+        snapshot = self.snapshot
+        self.snapshot = snapshot._replace(generation=snapshot.generation + 1,
+                                          cache={} if stats else snapshot.cache, **changes)
+
+    def _add_documents(self, documents):
+        snapshot = self.snapshot
+        documents = list(documents)
+        if not documents:
+            return
+        # Analyze everything before touching the store, so a failing
+        # document leaves the index unchanged
+        term_counts = {name: [] for name in self.FIELDS}
+        for document in documents:
+            for name in self.FIELDS:
+                counts = Counter(self.analyze(getattr(document, name) or ''))
+                term_counts[name].append([(self._term_id(term), count) for term, count in counts.items()])
+
+        # The store and vocabulary are append-only: published snapshots never
+        # read past their own n_docs rows and n_terms terms
+        store, first_row = snapshot.documents, snapshot.n_docs
+        n_terms = len(snapshot.terms)
+        replaced = []
+        for row, document in enumerate(documents, first_row):
+            store.append(document)
+            previous = self._id_rows.get(document.id)
+            if previous is not None:
+                replaced.append(previous)
+            self._id_rows[document.id] = row
+        n_docs = first_row + len(documents)
+
+        deleted_at = snapshot.deleted_at.appended(first_row, np.full(len(documents), IndexSnapshot.LIVE))
+        deleted_at.data[replaced] = snapshot.generation + 1
+        self._publish(
+            n_docs=n_docs,
+            n_terms=n_terms,
+            fields={name: field.added(term_counts[name]) for name, field in snapshot.fields.items()},
+            doc_freq_any=self._added_doc_freq_any(snapshot.doc_freq_any, term_counts),
+            deleted_at=deleted_at,
+            n_deleted=snapshot.n_deleted + len(replaced)
+        )
+        if self.spelling_correction:
+            # Only the new terms are indexed, so queries never pay for them
+            snapshot.spelling.sync(snapshot.terms, n_terms)
+
+    @staticmethod
+    def _added_doc_freq_any(doc_freq_any, term_counts):
+        """doc_freq_any extended with documents given as {field: [[(term id, count)]]}"""
+        seen = []
+        for per_field in zip(*term_counts.values()):
+            seen.extend({term_id for pairs in per_field for term_id, _ in pairs})
+        return doc_freq_any.added(seen)
+
+    def _deleted_filter(self, snapshot):
+        """Function mapping rows to their deleted mask, or None when nothing is deleted"""
+        return snapshot.deleted_rows if snapshot.n_deleted else None
+
+    def _term_id(self, term):
+        snapshot = self.snapshot
+        term_id = snapshot.vocabulary.get(term)
+        if term_id is None:
+            term_id = len(snapshot.terms)
+            snapshot.terms.append(term)
+            snapshot.vocabulary[term] = term_id
+        return term_id
+
+    def rebuild(self):
+        """Merge every field into a single segment
+
+        Works from the term ids kept per document in the forward indexes, so
+        no text is re-tokenized or lemmatized. Statistics are unchanged.
+        """
+        with self._write_lock:
+            snapshot = self.snapshot
+            self._publish(fields={name: field.rebuilt() for name, field in snapshot.fields.items()}, stats=False)
 
-    def _update_vectors(self):
-        # Extract preprocessed content from documents
-        processed_contents = [self.preprocess_text(doc.content) for doc in self.documents]
-        # Create TF-IDF vectors
-        self.document_vectors = self.vectorizer.fit_transform(processed_contents)
+    def _maybe_compact(self):
+        snapshot = self.snapshot
+        if self._compacting or snapshot.n_deleted <= self.COMPACTION_THRESHOLD * snapshot.n_docs:
+            return
+        with self._write_lock:
+            if self._compacting:
+                return
+            self._compacting = True
+        threading.Thread(target=self._background_compact, name='index-compaction', daemon=True).start()
+
+    def _background_compact(self):
+        try:
+            self.compact()
+        except Exception:
+            logger.exception("Index compaction failed")
+        finally:
+            self._compacting = False
+
+    def compact(self):
+        """
+        Rewrite the index without its deleted documents
+
+        The current snapshot is rewritten without the write lock, then the
+        result is published under the lock after replaying the writes that
+        arrived meanwhile, so writers only wait for the replay and queries
+        never wait.
+
+        Returns:
+            The number of deleted rows removed
+        """
+        captured = self.snapshot
+        live = ~captured.deleted_rows()
+        if live.all():
+            return 0
+        live_rows = np.flatnonzero(live)
+        n_live, n_terms = len(live_rows), captured.n_terms
+        fields = {name: field.compacted(live) for name, field in captured.fields.items()}
+        # Documents containing each term in any field, counted over the
+        # unique (document, term) pairs of all fields
+        stride = max(n_terms, 1)
+        pairs = np.unique(np.concatenate([
+            np.repeat(np.arange(n_live, dtype=np.int64), np.diff(segment.doc_offsets)) * stride + segment.doc_terms
+            for field in fields.values() for segment in field.segments
+        ] or [np.zeros(0, dtype=np.int64)]))
+        doc_freq_any = TermCounts(np.bincount(pairs % stride, minlength=n_terms).astype(np.int32))
+        documents = captured.documents.select(live_rows)
+
+        with self._write_lock, self._dense_lock:
+            snapshot = self.snapshot
+            if snapshot.documents is not captured.documents:
+                return 0  # replaced by load() in the meantime
+            n_rows, n_terms = snapshot.n_docs, snapshot.n_terms
+            remap = np.full(n_rows, -1, dtype=np.int64)
+            remap[live_rows] = np.arange(n_live)
+            remap[captured.n_docs:] = np.arange(n_live, n_live + n_rows - captured.n_docs)
+
+            # Replay documents added since the capture, from their stored term ids
+            term_counts = {name: field.term_counts(captured.n_docs) for name, field in snapshot.fields.items()}
+            fields = {name: field.added(term_counts[name]) for name, field in fields.items()}
+            doc_freq_any = self._added_doc_freq_any(doc_freq_any, term_counts)
+            captured.documents.select(range(captured.n_docs, n_rows), into=documents)
+
+            # Rows deleted since the capture keep their tombstones
+            dead = remap[np.flatnonzero(snapshot.deleted_rows())]
+            dead = dead[dead >= 0]
+            deleted_at = np.full(len(documents), IndexSnapshot.LIVE)
+            deleted_at[dead] = 0
+
+            self._id_rows = {doc_id: int(remap[row]) for doc_id, row in self._id_rows.items()}
+            if self._dense is not None and self._dense_documents is snapshot.documents:
+                self._dense = self._dense.select(remap[:len(self._dense)] >= 0)
+                self._dense_documents = documents
+            self._publish(documents=documents, n_docs=len(documents), n_terms=n_terms, fields=fields,
+                          doc_freq_any=doc_freq_any, deleted_at=AppendOnlyArray(deleted_at), n_deleted=len(dead),
+                          epoch=snapshot.epoch + 1)
+        return captured.n_docs - n_live
+
+    def _query_weights(self, snapshot):
+        """Return (idf, document norms, per-term max scores) for a snapshot's statistics"""
+        weights = snapshot.cache.get('weights')
+        if weights is None:
+            content = snapshot.fields['content']
+            n_docs = snapshot.n_docs
+            # Smoothed IDF, identical to sklearn's TfidfVectorizer defaults
+            df = content.document_frequencies(snapshot.n_terms)
+            idf = np.log((1 + n_docs) / (1 + df)) + 1
+            # L2 norm of every document's TF-IDF vector, vectorised over the
+            # forward index of each segment instead of refitting a vectorizer
+            norms = np.concatenate([np.zeros(0)] + [
+                self._norms(segment.doc_terms, segment.doc_counts, segment.doc_offsets, idf)
+                for segment in content.segments
+            ])
+            # Largest normalised TF-IDF weight of each term in any document:
+            # the upper bound MaxScore uses to skip hopeless documents
+            max_scores = np.zeros(len(idf))
+            terms, counts, offsets = content.forward_index()
+            rows = np.repeat(np.arange(n_docs), np.diff(offsets))
+            np.maximum.at(max_scores, terms, counts * idf[terms] / norms[rows])
+            weights = snapshot.cache['weights'] = (idf, norms, max_scores)
+        return weights
+
+    @staticmethod
+    def _norms(terms, counts, offsets, idf):
+        n_docs = len(offsets) - 1
+        rows = np.repeat(np.arange(n_docs), np.diff(offsets))
+        weights = counts * idf[terms]
+        return np.sqrt(np.bincount(rows, weights=weights ** 2, minlength=n_docs))
+
+    @property
+    def document_vectors(self):
+        """L2-normalised TF-IDF matrix of the corpus, built on demand"""
+        return self._document_matrix(self.snapshot, 'tfidf')
+
+    def _document_matrix(self, snapshot, ranker):
+        """
+        Document x term matrix of per-document term scores: a ranker's score
+        is its dot product with the query's term weights
+        """
+        from scipy.sparse import csr_matrix
+
+        n_docs, shape = snapshot.n_docs, (snapshot.n_docs, snapshot.n_terms)
+        k1, b = self.BM25_K1, self.BM25_B
+        if ranker == 'tfidf':
+            return self._tfidf_rows(snapshot, 0)
+
+        # BM25 saturates content frequencies; BM25F saturates the weighted
+        # sum of per-field length-normalised frequencies
+        names = ('content',) if ranker == 'bm25' else self.FIELDS
+        matrix = csr_matrix(shape)
+        for name in names:
+            field = snapshot.fields[name]
+            terms, counts, offsets = field.forward_index()
+            rows = np.repeat(np.arange(n_docs), np.diff(offsets))
+            lengths = field.lengths[rows]
+            avg_length = field.total_length / n_docs or 1.0
+            norm = 1 - b + b * lengths / avg_length
+            if ranker == 'bm25':
+                data = counts * (k1 + 1) / (counts + k1 * norm)
+            else:
+                data = self.BM25F_WEIGHTS[name] * counts / norm
+            matrix = matrix + csr_matrix((data, terms, offsets), shape=shape)
+        if ranker == 'bm25f':
+            matrix.data = matrix.data * (k1 + 1) / (matrix.data + k1)
+        return matrix
+
+    def _tfidf_rows(self, snapshot, start):
+        """L2-normalised TF-IDF rows of the documents from start on"""
+        from scipy.sparse import csr_matrix
+
+        idf, norms, _ = self._query_weights(snapshot)
+        terms, counts, offsets = snapshot.fields['content'].forward_rows(start)
+        rows = np.repeat(np.arange(start, snapshot.n_docs), np.diff(offsets))
+        return csr_matrix((counts * idf[terms] / norms[rows], terms, offsets),
+                          shape=(snapshot.n_docs - start, snapshot.n_terms))
+
+    def dense_index(self, snapshot=None):
+        """
+        The DenseIndex built so far over a snapshot's documents (the current
+        one by default), or None if there is none yet
+
+        Never fits or extends the index: when it misses rows of the
+        snapshot, or is due for a refit, a background build is started and
+        the index built so far keeps being served. It may also cover rows
+        added after the snapshot was taken.
+        """
+        snapshot = snapshot or self.snapshot
+        with self._dense_lock:
+            dense = self._dense if self._dense_documents is snapshot.documents else None
+        if dense is None or len(dense) < snapshot.n_docs:
+            self._schedule_dense_build()
+        return dense
+
+    def build_dense_index(self, snapshot=None):
+        """
+        Fit or extend the DenseIndex to cover a snapshot (the current one by
+        default), blocking until it does, and return it
+        """
+        snapshot = snapshot or self.snapshot
+        with self._dense_build_lock:
+            with self._dense_lock:
+                dense = self._dense if self._dense_documents is snapshot.documents else None
+            n_docs = snapshot.n_docs
+            if dense is None or n_docs > dense.fitted_rows * (1 + self.DENSE_REFIT_RATIO):
+                # Refit once the folded-in share grows, since fold-in cannot
+                # learn the topics of new documents
+                dense = DenseIndex.fit(self._tfidf_rows(snapshot, 0), self.DENSE_DIMENSIONS)
+            elif len(dense) < n_docs:
+                dense = dense.added(self._tfidf_rows(snapshot, len(dense)))
+            else:
+                return dense
+            with self._dense_lock:
+                # A snapshot replaced by compaction or load() keeps its index to itself
+                if snapshot.documents is self.snapshot.documents:
+                    self._dense, self._dense_documents = dense, snapshot.documents
+            return dense
+
+    def _schedule_dense_build(self):
+        if self._dense_building or not self.snapshot.n_docs:
+            return
+        with self._dense_lock:
+            if self._dense_building:
+                return
+            self._dense_building = True
+        threading.Thread(target=self._background_dense_build, name='dense-index', daemon=True).start()
+
+    def _background_dense_build(self):
+        try:
+            # Writes made during a build are covered by the next pass
+            while True:
+                snapshot = self.snapshot
+                dense = self.build_dense_index(snapshot)
+                if len(dense) >= self.snapshot.n_docs or self.snapshot.documents is not snapshot.documents:
+                    break
+        except Exception:
+            logger.exception("Dense index build failed")
+        finally:
+            self._dense_building = False
+
+    def _term_matrix(self, snapshot, ranker):
+        """Term x document score matrix for a snapshot's statistics"""
+        key = ('term_matrix', ranker)
+        matrix = snapshot.cache.get(key)
+        if matrix is None:
+            matrix = snapshot.cache[key] = self._document_matrix(snapshot, ranker).T.tocsr()
+        return matrix
+
+    def _query_term_weights(self, snapshot, ranker, term_ids, counts):
+        """Weight of each query term in the ranker's dot product"""
+        if ranker != 'tfidf':
+            return counts * self._bm25_idf(snapshot, ranker, term_ids)
+        idf, _, _ = self._query_weights(snapshot)
+        # Terms seen only in titles are not part of the content vocabulary
+        in_content = snapshot.fields['content'].document_frequency(term_ids) > 0
+        query_weights = np.where(in_content, counts * idf[term_ids], 0.0)
+        if in_content.any():
+            query_weights /= np.linalg.norm(query_weights)
+        return query_weights
+
+    def _analyze_query(self, snapshot, query):
+        """Return (term ids, counts) of the query terms known to the snapshot"""
+        query_counts = Counter()
+        for term in self.analyze(query):
+            term_id = self._query_term_id(snapshot, term)
+            if term_id is not None:
+                query_counts[term_id] += 1
+        term_ids = list(query_counts)
+        return term_ids, np.fromiter(query_counts.values(), dtype=np.float64, count=len(term_ids))
+
+    def _query_term_id(self, snapshot, term):
+        """Term id a query term is matched on: its own or its spelling correction's"""
+        n_terms = snapshot.n_terms
+        # Terms added to the shared vocabulary after the snapshot are unknown to it
+        term_id = snapshot.vocabulary.get(term, n_terms)
+        if term_id < n_terms and snapshot.doc_freq_any[term_id]:
+            return term_id
+        if not self.spelling_correction:
+            return None
+        # Catches up with terms loaded from a snapshot on first use
+        snapshot.spelling.sync(snapshot.terms, n_terms)
+        return snapshot.spelling.correct(term, n_terms, snapshot.doc_freq_any)
+
+    def spelling_corrections(self, query):
+        """Return {query term: indexed term} for the query terms that would be corrected"""
+        snapshot = self.snapshot
+        corrections = {}
+        for term in self.analyze(query):
+            term_id = self._query_term_id(snapshot, term)
+            if term_id is not None and snapshot.terms[term_id] != term:
+                corrections[term] = snapshot.terms[term_id]
+        return corrections
+
+    def get_similar_documents(self, query, top_k=5, ranker='tfidf'):
+        """
+        Rank documents against a query
+
+        Args:
+            query: Search query string
+            top_k: Number of top results to return
+            ranker: 'tfidf' (cosine over content), 'bm25' (content),
+                'bm25f' (title + content) or 'dense' (approximate cosine
+                over LSA embeddings)
+
+        Returns:
+            List of {'document', 'similarity'} dictionaries, best first
+        """
+        if ranker not in self.RANKERS:
+            raise ValueError(f"Unknown ranker: {ranker}")
+        # Everything below reads this one snapshot, whatever writers publish
+        snapshot = self.snapshot
+        if not snapshot.n_docs:
+            return []
 
-    def get_similar_documents(self, query, top_k=5):
         # Preprocess query
-        processed_query = self.preprocess_text(query)
-        # Transform query to vector
-        query_vector = self.vectorizer.transform([processed_query])
-        # Calculate similarities
-        similarities = cosine_similarity(query_vector, self.document_vectors).flatten()
-        # Get top k similar documents
-        top_indices = np.argsort(similarities)[-top_k:][::-1]
-        
+        term_ids, counts = self._analyze_query(snapshot, query)
+        if not term_ids:
+            return []
+
+        if ranker == 'dense':
+            dense = self.dense_index(snapshot)
+            if dense is not None:
+                return self._dense_search(snapshot, dense, term_ids, counts, top_k)
+            # Until the first fit finishes, rank by the TF-IDF cosine that LSA approximates
+            ranker = 'tfidf'
+        if ranker == 'tfidf':
+            postings, contribution, bounds = self._tfidf_scorer(snapshot, term_ids, counts)
+        elif ranker == 'bm25':
+            postings, contribution, bounds = self._bm25_scorer(snapshot, term_ids, counts)
+        else:
+            postings, contribution, bounds = self._bm25f_scorer(snapshot, term_ids, counts)
+
+        # Terms without postings (e.g. title-only terms for content rankers)
+        # cannot contribute
+        live = [i for i, parts in enumerate(postings) if parts]
+        if not live:
+            return []
+        postings = [postings[i] for i in live]
+        bounds = bounds[live]
+        terms = np.array(live)
+
+        def scorer(i, doc_ids, values):
+            return contribution(terms[i], doc_ids, values)
+
+        deleted = self._deleted_filter(snapshot)
+        touched = sum(len(doc_ids) for parts in postings for doc_ids, _ in parts)
+        if touched >= self.DENSE_QUERY_FRACTION * snapshot.n_docs:
+            doc_ids, scores = self._score_dense(postings, scorer, snapshot.n_docs, deleted)
+        else:
+            doc_ids, scores = self._score_max_score(postings, scorer, bounds, top_k, deleted)
+        doc_ids, scores = _top_k(doc_ids, scores, top_k)
+
+        return self._results(snapshot, doc_ids, scores)
+
+    def _dense_search(self, snapshot, dense, term_ids, counts, top_k):
+        from scipy.sparse import csr_matrix
+
+        weights = self._query_term_weights(snapshot, 'tfidf', term_ids, counts)
+        query_vector = csr_matrix((weights, np.array(term_ids), [0, len(term_ids)]),
+                                  shape=(1, snapshot.n_terms))
+        query = dense.embed_query(query_vector)
+        if not query.any():
+            return []
+        doc_ids, scores = dense.candidates(query, self.DENSE_N_PROBE)
+        # Rows added after the snapshot are not part of it
+        keep = (scores > 0) & (doc_ids < snapshot.n_docs)
+        doc_ids, scores = doc_ids[keep], scores[keep]
+        deleted = self._deleted_filter(snapshot)
+        if deleted is not None:
+            live = ~deleted(doc_ids)
+            doc_ids, scores = doc_ids[live], scores[live]
+        return self._results(snapshot, *_top_k(doc_ids, scores.astype(np.float64), top_k))
+
+    def _results(self, snapshot, doc_ids, scores):
         results = []
-        for idx in top_indices:
+        for doc_idx, score in zip(doc_ids, scores):
             results.append({
-                'document': self.documents[idx],
-                'similarity': float(similarities[idx])
+                'document': snapshot.documents[doc_idx],
+                'similarity': float(score)
             })
         return results
 
+    def get_similar_documents_many(self, queries, top_k=5, ranker='tfidf'):
+        """
+        Rank documents against many queries at once
+
+        The queries' term weights form one sparse matrix that is multiplied
+        with the ranker's term x document matrix, scoring a whole batch in a
+        single sparse product (in chunks of BATCH_QUERY_ROWS queries to bound
+        the size of the score matrix).
+
+        Returns:
+            One list of {'document', 'similarity'} dictionaries per query,
+            in the same order and with the same scores as get_similar_documents
+        """
+        from scipy.sparse import csr_matrix
+
+        if ranker not in self.RANKERS:
+            raise ValueError(f"Unknown ranker: {ranker}")
+        snapshot = self.snapshot
+        if not snapshot.n_docs:
+            return [[] for _ in queries]
+        if ranker == 'dense':
+            # Dense queries probe the IVF index one at a time
+            return [self.get_similar_documents(query, top_k, ranker=ranker) for query in queries]
+
+        matrix = self._term_matrix(snapshot, ranker)
+        deleted = self._deleted_filter(snapshot)
+        results = []
+        for start in range(0, len(queries), self.BATCH_QUERY_ROWS):
+            chunk = queries[start:start + self.BATCH_QUERY_ROWS]
+            offsets, columns, weights = [0], [], []
+            for query in chunk:
+                term_ids, counts = self._analyze_query(snapshot, query)
+                if term_ids:
+                    columns.extend(term_ids)
+                    weights.append(self._query_term_weights(snapshot, ranker, term_ids, counts))
+                offsets.append(len(columns))
+            query_matrix = csr_matrix(
+                (np.concatenate(weights) if weights else np.zeros(0), columns, offsets),
+                shape=(len(chunk), snapshot.n_terms))
+            scores = query_matrix @ matrix
+            for row in range(len(chunk)):
+                begin, end = scores.indptr[row], scores.indptr[row + 1]
+                doc_ids, values = scores.indices[begin:end], scores.data[begin:end]
+                positive = values > 0
+                if deleted is not None:
+                    positive &= ~deleted(doc_ids)
+                results.append(self._results(snapshot, *_top_k(doc_ids[positive], values[positive], top_k)))
+        return results
+
+    def _tfidf_scorer(self, snapshot, term_ids, counts):
+        idf, norms, max_scores = self._query_weights(snapshot)
+        content = snapshot.fields['content']
+        query_weights = self._query_term_weights(snapshot, 'tfidf', term_ids, counts)
+        # A document's similarity is the sum over query terms of
+        # count * scale / norm, and a term never adds more than its bound
+        scales = query_weights * idf[term_ids]
+        bounds = query_weights * max_scores[term_ids]
+        postings = [content.posting_parts(term_id) for term_id in term_ids]
+
+        def contribution(i, doc_ids, tf):
+            return tf * scales[i] / norms[doc_ids]
+
+        return postings, contribution, bounds
+
+    def _bm25_idf(self, snapshot, ranker, term_ids):
+        n_docs = snapshot.n_docs
+        # BM25 scores content only, so its IDF counts content documents;
+        # BM25F counts documents holding the term in any field it scores
+        if ranker == 'bm25':
+            df = snapshot.fields['content'].document_frequency(term_ids)
+        else:
+            df = snapshot.doc_freq_any[term_ids]
+        return np.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+
+    def _bm25_scorer(self, snapshot, term_ids, counts):
+        content = snapshot.fields['content']
+        k1, b = self.BM25_K1, self.BM25_B
+        lengths = content.lengths
+        avg_length = content.total_length / snapshot.n_docs or 1.0
+        weights = self._query_term_weights(snapshot, 'bm25', term_ids, counts)
+        postings = [content.posting_parts(term_id) for term_id in term_ids]
+
+        def contribution(i, doc_ids, tf):
+            norm = k1 * (1 - b + b * lengths[doc_ids] / avg_length)
+            return weights[i] * tf * (k1 + 1) / (tf + norm)
+
+        # tf / (tf + norm) saturates below 1
+        return postings, contribution, weights * (k1 + 1)
+
+    def _bm25f_scorer(self, snapshot, term_ids, counts):
+        k1, b = self.BM25_K1, self.BM25_B
+        weights = self._query_term_weights(snapshot, 'bm25f', term_ids, counts)
+        postings = []
+        for term_id in term_ids:
+            # Combine per-field length-normalised frequencies into one
+            # pseudo-frequency per document before saturating it
+            doc_ids, pseudo_tf = [], []
+            for name, field in snapshot.fields.items():
+                avg_length = field.total_length / snapshot.n_docs or 1.0
+                for field_docs, tf in field.posting_parts(term_id):
+                    doc_ids.append(field_docs)
+                    pseudo_tf.append(self.BM25F_WEIGHTS[name] * tf
+                                     / (1 - b + b * field.lengths[field_docs] / avg_length))
+            if doc_ids:
+                merged, inverse = np.unique(np.concatenate(doc_ids), return_inverse=True)
+                postings.append([(merged, np.bincount(inverse, weights=np.concatenate(pseudo_tf)))])
+            else:
+                postings.append([])
+
+        def contribution(i, doc_ids, tf):
+            return weights[i] * tf * (k1 + 1) / (tf + k1)
+
+        return postings, contribution, weights * (k1 + 1)
+
+    @staticmethod
+    def _score_dense(postings, contribution, n_docs, deleted=None):
+        """Accumulate every posting into a corpus-sized score array"""
+        scores = np.zeros(n_docs)
+        for i, parts in enumerate(postings):
+            for doc_ids, values in parts:
+                scores[doc_ids] += contribution(i, doc_ids, values)
+        doc_ids = np.flatnonzero(scores)
+        if deleted is not None:
+            doc_ids = doc_ids[~deleted(doc_ids)]
+        return doc_ids, scores[doc_ids]
+
+    @staticmethod
+    def _score_max_score(postings, contribution, bounds, top_k, deleted=None):
+        """
+        Term-at-a-time MaxScore
+
+        Terms are visited in decreasing order of their score bound. Once the
+        bounds of the unvisited terms cannot lift an unseen document to the
+        current k-th best partial score, the remaining postings are only
+        probed (by binary search) for the surviving candidates.
+        """
+        order = np.argsort(-bounds, kind='stable')
+        # remaining[i]: the most terms order[i:] can still add; the slack
+        # absorbs rounding differences between bounds and actual scores
+        remaining = np.cumsum(bounds[order][::-1])[::-1] * (1 + 1e-9)
+
+        candidates = np.zeros(0, dtype=np.int64)
+        scores = np.zeros(0)
+        threshold = 0.0
+        for step, term in enumerate(order):
+            parts = postings[term]
+            if len(candidates) < top_k or remaining[step] >= threshold:
+                # Essential term: any of its documents may still reach the top k
+                doc_ids = np.concatenate([doc_ids for doc_ids, _ in parts])
+                values = np.concatenate([values for _, values in parts])
+                candidates, inverse = np.unique(np.concatenate([candidates, doc_ids]), return_inverse=True)
+                scores = np.bincount(inverse, weights=np.concatenate(
+                    [scores, contribution(term, doc_ids, values)]))
+                if deleted is not None:
+                    # Deleted documents never become candidates, so they
+                    # cannot set the pruning threshold
+                    live = ~deleted(candidates)
+                    candidates, scores = candidates[live], scores[live]
+            else:
+                # Drop candidates that cannot catch up, then probe the rest
+                alive = scores + remaining[step] >= threshold
+                candidates, scores = candidates[alive], scores[alive]
+                for doc_ids, values in parts:
+                    if len(candidates) <= len(doc_ids):
+                        pos = np.minimum(np.searchsorted(doc_ids, candidates), len(doc_ids) - 1)
+                        hit = doc_ids[pos] == candidates
+                        hit_values = values[pos[hit]]
+                    else:
+                        pos = np.minimum(np.searchsorted(candidates, doc_ids), len(candidates) - 1)
+                        found = candidates[pos] == doc_ids
+                        hit = np.zeros(len(candidates), dtype=bool)
+                        hit[pos[found]] = True
+                        hit_values = values[found]
+                    scores[hit] += contribution(term, candidates[hit], hit_values)
+            if len(scores) >= top_k:
+                threshold = np.partition(scores, len(scores) - top_k)[len(scores) - top_k]
+        return candidates, scores
+
     def get_index(self):
-        return self.documents
\ No newline at end of file
+        snapshot = self.snapshot
+        live = np.flatnonzero(~snapshot.deleted_rows())
+        return [snapshot.documents[row] for row in live.tolist()]
+
+    def document_dicts(self, start, stop, fields=None, epoch=None):
+        """
+        to_dict() forms of the live documents in rows [start, stop), restricted to fields
+
+        Raises RowsRenumbered if epoch is given and is not row_epoch().
+        """
+        snapshot = self.snapshot
+        if epoch is not None and epoch != str(snapshot.epoch):
+            raise RowsRenumbered(f"Index rows were renumbered since epoch {epoch}")
+        rows = np.arange(start, min(stop, snapshot.n_docs))
+        rows = rows[~snapshot.deleted_rows(rows)]
+        return [snapshot.documents.to_dict(row, fields) for row in rows.tolist()]
+
+    def row_count(self):
+        """Rows in the index, deleted ones included until compaction"""
+        return self.snapshot.n_docs
+
+    def row_epoch(self):
+        """Token that changes whenever rows are renumbered, by compaction or load"""
+        return str(self.snapshot.epoch)
+
+    def __len__(self):
+        snapshot = self.snapshot
+        return snapshot.n_docs - snapshot.n_deleted
+
+    @staticmethod
+    def has_snapshot(directory):
+        return os.path.exists(os.path.join(directory, 'CURRENT'))
+
+    def save(self, directory, keep=2):
+        """
+        Atomically write a versioned snapshot of the index
+
+        The snapshot is written to a temporary directory, renamed into place
+        and only then published by atomically replacing the CURRENT pointer,
+        so a crash mid-save never affects the live snapshot. Writes may carry
+        on while the files are written; they are not part of the snapshot.
+
+        Args:
+            directory: Snapshot root directory
+            keep: Number of snapshots to retain (older ones are removed)
+
+        Returns:
+            The manifest of the written snapshot
+        """
+        with self._write_lock:
+            if self.snapshot.n_deleted:
+                self.compact()  # snapshots never hold tombstones
+            if any(len(field.segments) > 1 for field in self.snapshot.fields.values()):
+                self.rebuild()  # a snapshot holds a single segment per field
+            snapshot = self.snapshot
+        idf, norms, max_scores = self._query_weights(snapshot)
+
+        os.makedirs(directory, exist_ok=True)
+        name = f"snapshot-{snapshot.generation:010d}-{uuid.uuid4().hex[:8]}"
+        tmp_path = os.path.join(directory, f".{name}.tmp")
+        os.makedirs(tmp_path)
+
+        arrays = {
+            'idf': idf,
+            'norms': norms,
+            'max_scores': max_scores,
+            'doc_freq_any': snapshot.doc_freq_any.dense(snapshot.n_terms)
+        }
+        for array_name, values in snapshot.documents.arrays(snapshot.n_docs).items():
+            arrays[f"documents.{array_name}"] = values
+        for field_name, field in snapshot.fields.items():
+            for array_name, values in field.arrays().items():
+                arrays[f"{field_name}.{array_name}"] = values
+        # The dense index is optional; it is saved only once it has been built
+        dense = None
+        if self._dense is not None:
+            dense = self.build_dense_index(snapshot)
+            if len(dense) > snapshot.n_docs:
+                dense = dense.select(np.arange(len(dense)) < snapshot.n_docs)
+            dense = dense.merged()
+            for array_name, values in dense.arrays().items():
+                arrays[f"dense.{array_name}"] = values
+        for array_name, values in arrays.items():
+            with open(os.path.join(tmp_path, f"{array_name}.npy"), 'wb') as f:
+                np.save(f, np.ascontiguousarray(values))
+                _fsync(f)
+        terms = snapshot.terms[:snapshot.n_terms]
+        with open(os.path.join(tmp_path, 'vocabulary.json'), 'w', encoding='utf-8') as f:
+            json.dump(terms, f, ensure_ascii=False)
+            _fsync(f)
+        manifest = {
+            'format_version': self.SNAPSHOT_FORMAT_VERSION,
+            'name': name,
+            'generation': snapshot.generation,
+            'documents': snapshot.n_docs,
+            'terms': len(terms),
+            'dense_fitted_rows': dense.fitted_rows if dense is not None else None,
+            'created_at': datetime.now().isoformat()
+        }
+        with open(os.path.join(tmp_path, 'manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+            _fsync(f)
+
+        with self._write_lock:
+            os.rename(tmp_path, os.path.join(directory, name))
+            pointer = os.path.join(directory, 'CURRENT.tmp')
+            with open(pointer, 'w', encoding='utf-8') as f:
+                f.write(name)
+                _fsync(f)
+            os.replace(pointer, os.path.join(directory, 'CURRENT'))
+
+            # Prune old snapshots; processes still mapping them keep their pages
+            snapshots = sorted(entry for entry in os.listdir(directory) if entry.startswith('snapshot-'))
+            for old in snapshots[:-keep]:
+                if old != name:
+                    shutil.rmtree(os.path.join(directory, old), ignore_errors=True)
+        return manifest
+
+    def load(self, directory):
+        """
+        Replace the index contents with the live snapshot in directory
+
+        Index and document arrays are memory-mapped read-only, so loading
+        them costs the same at any index size and worker processes share the
+        same pages; only the document id lookup is built per row.
+
+        Args:
+            directory: Snapshot root directory
+
+        Returns:
+            The manifest of the loaded snapshot
+        """
+        with open(os.path.join(directory, 'CURRENT'), encoding='utf-8') as f:
+            path = os.path.join(directory, f.read().strip())
+        with open(os.path.join(path, 'manifest.json'), encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('format_version') != self.SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(f"Unsupported index snapshot format: {manifest.get('format_version')}")
+
+        def mapped(array_name):
+            return np.load(os.path.join(path, f"{array_name}.npy"), mmap_mode='r')
+
+        fields = {}
+        for field_name in self.FIELDS:
+            names = IndexSegment._fields + ('lengths',)
+            fields[field_name] = FieldIndex.from_arrays(
+                {name: mapped(f"{field_name}.{name}") for name in names})
+        with open(os.path.join(path, 'vocabulary.json'), encoding='utf-8') as f:
+            terms = json.load(f)
+        documents = DocumentStore.from_arrays(
+            {name: mapped(f"documents.{name}") for name in
+             ('text', 'text_offsets', 'flags', 'created_at', 'vectors', 'vector_offsets')})
+        dense = None
+        if manifest.get('dense_fitted_rows') is not None:
+            dense = DenseIndex.from_arrays(
+                {name: mapped(f"dense.{name}") for name in ('components', 'vectors', 'centroids', 'assignments')},
+                manifest['dense_fitted_rows'])
+
+        with self._write_lock, self._dense_lock:
+            self._id_rows = {doc_id: row for row, doc_id in enumerate(documents.ids())}
+            self._dense, self._dense_documents = dense, documents
+            # Generations only move forward, so cached results never match a
+            # different index
+            self.snapshot = IndexSnapshot(
+                documents, len(documents), {term: term_id for term_id, term in enumerate(terms)}, terms, SpellingIndex(), len(terms),
+                fields, TermCounts(mapped('doc_freq_any')),
+                AppendOnlyArray(np.full(len(documents), IndexSnapshot.LIVE)), 0,
+                max(manifest['generation'], self.snapshot.generation + 1), self.snapshot.epoch + 1,
+                {'weights': (mapped('idf'), mapped('norms'), mapped('max_scores'))})
+        return manifest
+
+class _IdentityLemmatizer:
+    """Stand-in used when WordNet data is unavailable"""
+
+    def lemmatize(self, word):
+        return word
+
+
+def _fsync(f):
+    f.flush()
+    os.fsync(f.fileno())
+
+
+def _top_k(doc_ids, scores, k):
+    """Return the k best (doc ids, scores), ties broken by ascending doc id"""
+    if len(scores) > k:
+        # argpartition-style selection of the k-th score; ties at the
+        # boundary are kept so the tie-break below stays exact
+        kth = np.partition(scores, len(scores) - k)[len(scores) - k]
+        keep = scores >= kth
+        doc_ids, scores = doc_ids[keep], scores[keep]
+    order = np.lexsort((doc_ids, -scores))[:k]
+    return doc_ids[order], scores[order]
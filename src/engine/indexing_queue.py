@@ -0,0 +1,126 @@
+"""
+Background indexing queue
+Documents are acknowledged as soon as they are queued; a worker thread
+drains the queue and indexes whatever has accumulated as one batch, so a
+burst of writes costs one index update instead of one per document
+"""
+import logging
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFull(Exception):
+    """Raised by put() when max_pending documents are already waiting"""
+
+
+class IndexingQueue:
+    """Thread-safe FIFO of documents indexed in batches by one worker thread"""
+
+    def __init__(self, indexer, max_batch=1000, max_pending=100000):
+        self.indexer = indexer
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        # (document, time queued) pairs, oldest first
+        self._pending = deque()
+        self._condition = threading.Condition()
+        self._in_flight = 0
+        self._closed = False
+        self.queued = 0
+        self.indexed = 0
+        self.failed = 0
+        self.batches = 0
+        self.last_batch_size = 0
+        self.last_batch_ms = 0.0
+        # Seconds between queueing and becoming searchable, of the last batch's oldest document
+        self.last_lag_seconds = 0.0
+        self._worker = threading.Thread(target=self._run, name='indexing-queue', daemon=True)
+        self._worker.start()
+
+    def put(self, document):
+        """Queue a document for indexing; returns the number of documents waiting"""
+        return self.put_many([document])
+
+    def put_many(self, documents):
+        documents = list(documents)
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Indexing queue is closed")
+            if len(self._pending) + len(documents) > self.max_pending:
+                raise QueueFull(f"{len(self._pending)} documents are already waiting to be indexed")
+            now = time.monotonic()
+            self._pending.extend((document, now) for document in documents)
+            self.queued += len(documents)
+            self._condition.notify()
+            return len(self._pending)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+                if not self._pending:
+                    return
+                # Everything queued while the previous batch was indexed is
+                # coalesced into this one
+                batch = [self._pending.popleft() for _ in range(min(self.max_batch, len(self._pending)))]
+                self._in_flight = len(batch)
+            start = time.monotonic()
+            try:
+                self.indexer.index_documents([document for document, _ in batch])
+                failed = 0
+            except Exception:
+                logger.exception(f"Indexing a batch of {len(batch)} queued documents failed")
+                failed = len(batch)
+            end = time.monotonic()
+            with self._condition:
+                self._in_flight = 0
+                self.batches += 1
+                self.indexed += len(batch) - failed
+                self.failed += failed
+                self.last_batch_size = len(batch)
+                self.last_batch_ms = (end - start) * 1000
+                self.last_lag_seconds = end - batch[0][1]
+                self._condition.notify_all()
+
+    def flush(self, timeout=None):
+        """Wait until every queued document has been processed; returns False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._pending or self._in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def close(self, timeout=None):
+        """Stop accepting documents and wait for the worker to drain the queue"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._worker.join(timeout)
+
+    def __len__(self):
+        with self._condition:
+            return len(self._pending) + self._in_flight
+
+    def stats(self):
+        with self._condition:
+            oldest = self._pending[0][1] if self._pending else None
+            return {
+                'queue_depth': len(self._pending),
+                'in_flight': self._in_flight,
+                'max_pending': self.max_pending,
+                # Age of the oldest document not yet picked up by the worker
+                'oldest_pending_seconds': round(time.monotonic() - oldest, 3) if oldest is not None else 0.0,
+                'queued': self.queued,
+                'indexed': self.indexed,
+                'failed': self.failed,
+                'batches': self.batches,
+                'last_batch_size': self.last_batch_size,
+                'last_batch_ms': round(self.last_batch_ms, 2),
+                'last_lag_seconds': round(self.last_lag_seconds, 3)
+            }
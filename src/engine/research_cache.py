@@ -0,0 +1,259 @@
+"""
+Research result cache
+Results of upstream research sources keyed by (source, normalized query,
+max results), in an in-memory LRU tier in front of an optional SQLite tier
+that every worker process on the host shares. Entries are fresh for a
+per-source TTL and may then be served stale, for at most max_stale more
+seconds, while the caller refreshes them.
+"""
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from .suggester import normalize_query
+
+# Seconds results stay fresh: citation counts move slowly, new arXiv
+# listings appear daily and Wikipedia articles are stable
+DEFAULT_TTLS = {'scholar': 12 * 3600, 'researchgate': 6 * 3600, 'wikipedia': 24 * 3600}
+DEFAULT_TTL = 3600
+
+
+class ResearchCache:
+    """Thread-safe two-tier cache of (source, query, max_results) -> papers"""
+
+    # Puts between deletions of expired rows from the SQLite tier
+    PRUNE_INTERVAL = 1000
+
+    def __init__(self, maxsize=1024, path=None, ttls=None, max_stale=24 * 3600, clock=time.time):
+        """
+        Args:
+            maxsize: Entries kept in memory (0 disables the memory tier)
+            path: SQLite database file shared by processes (None: memory only)
+            ttls: Seconds results stay fresh, by source (default DEFAULT_TTLS)
+            max_stale: Seconds past its TTL an entry may still be served stale
+            clock: Wall-clock time in seconds, comparable across processes
+        """
+        self.maxsize = maxsize
+        self.path = path
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.max_stale = max_stale
+        self.clock = clock
+        self._entries = OrderedDict()
+        # The memory tier and counters are guarded separately from the
+        # SQLite connection, so waiting on SQLite never holds up memory hits
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._db = None
+        if path is not None:
+            self._db = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+            # Readers in other processes never block on a writer
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS research_results (
+                    source TEXT NOT NULL,
+                    query TEXT NOT NULL,
+                    max_results INTEGER NOT NULL,
+                    stored_at REAL NOT NULL,
+                    results TEXT NOT NULL,
+                    PRIMARY KEY (source, query, max_results)
+                )""")
+        self._puts = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.evictions = 0
+        self._counters = {}
+
+    @staticmethod
+    def key(source: str, query: str, max_results: int) -> Tuple[str, str, int]:
+        return source, normalize_query(query), int(max_results)
+
+    def ttl(self, source: str) -> float:
+        return self.ttls.get(source, DEFAULT_TTL)
+
+    def get(self, source: str, query: str, max_results: int) -> Optional[Tuple[List[Dict[str, Any]], bool]]:
+        """
+        Return (papers, fresh) for a cached search, or None on a miss
+
+        Stale entries (fresh=False) are returned until max_stale seconds past
+        their TTL; the caller is expected to refresh them. An entry that is
+        not fresh in memory is looked up in the SQLite tier too, where
+        another process may have refreshed it. Papers are copies the caller
+        may modify.
+
+        Blocking: with a SQLite tier, this may wait for another process's
+        write lock, so event loops should call it from a worker thread.
+        """
+        key = self.key(source, query, max_results)
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        tier = 'memory'
+        if self._db is not None and (entry is None or now - entry[0] > self.ttl(source)):
+            with self._db_lock:
+                row = self._db.execute(
+                    "SELECT stored_at, results FROM research_results WHERE source = ? AND query = ? "
+                    "AND max_results = ?", key).fetchone()
+            if row is not None and (entry is None or row[0] > entry[0]):
+                entry, tier = (row[0], json.loads(row[1])), 'disk'
+                with self._lock:
+                    self._remember(key, entry)
+        return self._served(source, entry, tier, now)
+
+    def get_from_memory(self, source: str, query: str,
+                        max_results: int) -> Optional[Tuple[List[Dict[str, Any]], bool]]:
+        """
+        get() restricted to fresh entries of the memory tier, which never blocks
+
+        Returns None, without counting a miss, when get() has to be called.
+        """
+        key = self.key(source, query, max_results)
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or now - entry[0] > self.ttl(source):
+                return None
+            self._entries.move_to_end(key)
+        return self._served(source, entry, 'memory', now)
+
+    def _served(self, source, entry, tier, now):
+        with self._lock:
+            counters = self._counters_for(source)
+            age = now - entry[0] if entry is not None else None
+            if entry is None or age > self.ttl(source) + self.max_stale:
+                counters['misses'] += 1
+                return None
+            fresh = age <= self.ttl(source)
+            counters['hits' if fresh else 'stale_hits'] += 1
+            counters['hit_age_total'] += age
+            if tier == 'memory':
+                self.memory_hits += 1
+            else:
+                self.disk_hits += 1
+        return [dict(paper) for paper in entry[1]], fresh
+
+    def put(self, source: str, query: str, max_results: int, papers: List[Dict[str, Any]]):
+        """Store papers in both tiers (blocking, as put_on_disk)"""
+        self.put_on_disk(*self.put_in_memory(source, query, max_results, papers))
+
+    def put_in_memory(self, source: str, query: str, max_results: int, papers: List[Dict[str, Any]]):
+        """Store papers in the memory tier; returns the (key, entry) put_on_disk stores"""
+        key = self.key(source, query, max_results)
+        entry = (self.clock(), [dict(paper) for paper in papers])
+        with self._lock:
+            self._remember(key, entry)
+        return key, entry
+
+    def put_on_disk(self, key, entry):
+        """
+        Store an entry in the SQLite tier, if there is one
+
+        Blocking: this may wait for another process's write lock.
+        """
+        if self._db is None:
+            return
+        results = json.dumps(entry[1])
+        with self._db_lock:
+            self._db.execute("INSERT OR REPLACE INTO research_results VALUES (?, ?, ?, ?, ?)",
+                             key + (entry[0], results))
+            self._puts += 1
+            if self._puts % self.PRUNE_INTERVAL == 0:
+                self._prune()
+
+    def _remember(self, key, entry):
+        if self.maxsize <= 0:
+            return
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _prune(self):
+        # Rows too old to be served even stale
+        now = self.clock()
+        for source, ttl in self.ttls.items():
+            self._db.execute("DELETE FROM research_results WHERE source = ? AND stored_at < ?",
+                             (source, now - ttl - self.max_stale))
+        self._db.execute("DELETE FROM research_results WHERE stored_at < ?",
+                         (now - max(self.ttls.values(), default=DEFAULT_TTL) - self.max_stale,))
+
+    def _counters_for(self, source):
+        if source not in self._counters:
+            self._counters[source] = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'hit_age_total': 0.0}
+        return self._counters[source]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        with self._db_lock:
+            if self._db is not None:
+                self._db.execute("DELETE FROM research_results")
+
+    def close(self):
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Hit rates by source and tier, and the number and ages of cached entries
+
+        Blocking, as get(), when there is a SQLite tier.
+        """
+        now = self.clock()
+        rows = None
+        if self._db is not None:
+            # The shared tier holds every entry when there is one
+            with self._db_lock:
+                rows = self._db.execute(
+                    "SELECT source, COUNT(*), MIN(stored_at), AVG(stored_at) FROM research_results "
+                    "GROUP BY source").fetchall()
+        with self._lock:
+            if rows is None:
+                by_source = {}
+                for (source, _, _), (stored_at, _) in self._entries.items():
+                    by_source.setdefault(source, []).append(stored_at)
+                rows = [(source, len(times), min(times), sum(times) / len(times))
+                        for source, times in by_source.items()]
+            entries = {source: (count, oldest, mean) for source, count, oldest, mean in rows}
+
+            sources = {}
+            for source in sorted(set(self._counters) | set(entries)):
+                counters = self._counters_for(source)
+                served = counters['hits'] + counters['stale_hits']
+                lookups = served + counters['misses']
+                count, oldest, mean = entries.get(source, (0, None, None))
+                sources[source] = {
+                    'hits': counters['hits'],
+                    'stale_hits': counters['stale_hits'],
+                    'misses': counters['misses'],
+                    'hit_rate': round(served / lookups, 4) if lookups else 0.0,
+                    'ttl': self.ttl(source),
+                    'entries': count,
+                    'oldest_entry_age': round(now - oldest, 1) if count else None,
+                    'mean_entry_age': round(now - mean, 1) if count else None,
+                    # Age of the results actually served
+                    'mean_hit_age': round(counters['hit_age_total'] / served, 1) if served else None
+                }
+
+            served = sum(source['hits'] + source['stale_hits'] for source in sources.values())
+            lookups = served + sum(source['misses'] for source in sources.values())
+            return {
+                'hits': sum(source['hits'] for source in sources.values()),
+                'stale_hits': sum(source['stale_hits'] for source in sources.values()),
+                'misses': lookups - served,
+                'hit_rate': round(served / lookups, 4) if lookups else 0.0,
+                'memory': {'size': len(self._entries), 'maxsize': self.maxsize, 'hits': self.memory_hits,
+                           'evictions': self.evictions},
+                'disk': None if self.path is None else {'path': self.path, 'hits': self.disk_hits,
+                                                       'entries': sum(count for count, _, _ in entries.values())},
+                'max_stale': self.max_stale,
+                'sources': sources
+            }
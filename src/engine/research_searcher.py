@@ -2,19 +2,16 @@
 Research Paper Search Engine
 Integrates with Google Scholar, ResearchGate, and Wikipedia for academic research
 """
-import requests
-from bs4 import BeautifulSoup
 from typing import List, Dict, Any
 import time
 import re
 import sys
-from fake_useragent import UserAgent
-import wikipedia
-from scholarly import scholarly
 import logging
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import threading
 
+from .http_pool import HttpSessionPool
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -22,11 +19,28 @@ logger = logging.getLogger(__name__)
 class ResearchPaperSearcher:
     """Search engine for academic research papers and theses"""
     
-    def __init__(self):
-        self.ua = UserAgent()
-        self.headers = {
-            'User-Agent': self.ua.random
-        }
+    def __init__(self, http=None):
+        # Keep-alive sessions per upstream host, shared by request threads
+        self.http = http if http is not None else HttpSessionPool()
+        # Heavy scraping/client libraries (scholarly, wikipedia, bs4,
+        # fake_useragent) are imported on first use, not at startup
+        self._ua = None
+        self._headers = None
+
+    @property
+    def ua(self):
+        if self._ua is None:
+            from fake_useragent import UserAgent
+            self._ua = UserAgent()
+        return self._ua
+
+    @property
+    def headers(self):
+        if self._headers is None:
+            self._headers = {
+                'User-Agent': self.ua.random
+            }
+        return self._headers
         
     def search_all(self, query: str, max_results: int = 10) -> Dict[str, List[Dict[str, Any]]]:
         """
@@ -114,50 +128,55 @@ class ResearchPaperSearcher:
         Returns:
             List of paper dictionaries
         """
+        try:
+            return self.scrape_google_scholar(query, max_results)
+        except Exception as e:
+            logger.error(f"Error searching Google Scholar (might be blocked in production): {e}")
+            # Try fallback to Semantic Scholar API
+            logger.info("Attempting fallback to Semantic Scholar API...")
+            return self._fallback_semantic_scholar(query, max_results)
+
+    def scrape_google_scholar(self, query: str, max_results: int = 10) -> List[Dict[str, Any]]:
+        """Scrape Google Scholar through scholarly, without fallback; raises when blocked"""
+        from scholarly import scholarly
+
         papers = []
         
         # Limit max_results to prevent very slow searches
         max_results = min(max_results, 20)  # Cap at 20 for speed
         
-        try:
-            # Add random delay to avoid detection
-            time.sleep(0.5)
-            
-            search_query = scholarly.search_pubs(query)
+        # Add random delay to avoid detection
+        time.sleep(0.5)
+        
+        search_query = scholarly.search_pubs(query)
+        
+        for i, result in enumerate(search_query):
+            if i >= max_results:
+                break
             
-            for i, result in enumerate(search_query):
-                if i >= max_results:
-                    break
+            # Quick timeout if taking too long
+            if i > 0 and i % 5 == 0:
+                logger.info(f"Scholar: Retrieved {i} papers so far...")
                 
-                # Quick timeout if taking too long
-                if i > 0 and i % 5 == 0:
-                    logger.info(f"Scholar: Retrieved {i} papers so far...")
-                    
-                try:
-                    paper = {
-                        'title': result.get('bib', {}).get('title', 'N/A'),
-                        'authors': result.get('bib', {}).get('author', []),
-                        'year': result.get('bib', {}).get('pub_year', 'N/A'),
-                        'abstract': result.get('bib', {}).get('abstract', 'No abstract available'),
-                        'citations': result.get('num_citations', 0),
-                        'url': result.get('pub_url', '') or result.get('eprint_url', ''),
-                        'source': 'Google Scholar',
-                        'venue': result.get('bib', {}).get('venue', 'N/A'),
-                        'publisher': result.get('bib', {}).get('publisher', 'N/A')
-                    }
-                    papers.append(paper)
-                except Exception as e:
-                    logger.error(f"Error parsing scholar result: {e}")
-                    continue
-            
-            # Reduced delay for faster response
-            time.sleep(0.2)
-            
-        except Exception as e:
-            logger.error(f"Error searching Google Scholar (might be blocked in production): {e}")
-            # Try fallback to Semantic Scholar API
-            logger.info("Attempting fallback to Semantic Scholar API...")
-            return self._fallback_semantic_scholar(query, max_results)
+            try:
+                paper = {
+                    'title': result.get('bib', {}).get('title', 'N/A'),
+                    'authors': result.get('bib', {}).get('author', []),
+                    'year': result.get('bib', {}).get('pub_year', 'N/A'),
+                    'abstract': result.get('bib', {}).get('abstract', 'No abstract available'),
+                    'citations': result.get('num_citations', 0),
+                    'url': result.get('pub_url', '') or result.get('eprint_url', ''),
+                    'source': 'Google Scholar',
+                    'venue': result.get('bib', {}).get('venue', 'N/A'),
+                    'publisher': result.get('bib', {}).get('publisher', 'N/A')
+                }
+                papers.append(paper)
+            except Exception as e:
+                logger.error(f"Error parsing scholar result: {e}")
+                continue
+        
+        # Reduced delay for faster response
+        time.sleep(0.2)
             
         return papers
     
@@ -168,54 +187,11 @@ class ResearchPaperSearcher:
         # Try CrossRef first (more reliable, no rate limits with polite headers)
         try:
             logger.info("Trying CrossRef API...")
-            crossref_url = "https://api.crossref.org/works"
-            params = {
-                'query': query,
-                'rows': min(max_results, 20),
-                'select': 'title,author,published-print,abstract,URL,publisher,container-title,is-referenced-by-count'
-            }
-            headers = {
-                'User-Agent': 'ScholarSphere/1.0 (mailto:research@scholarsphere.com)'  # Polite pool
-            }
-            
-            response = requests.get(crossref_url, params=params, headers=headers, timeout=15)
+            url, params, headers = self.CROSSREF_URL, self.crossref_params(query, max_results), self.POLITE_HEADERS
+            response = self.http.get(url, params=params, headers=headers)
             
             if response.status_code == 200:
-                data = response.json()
-                items = data.get('message', {}).get('items', [])
-                
-                for item in items[:max_results]:
-                    # Extract authors
-                    authors = []
-                    if 'author' in item:
-                        authors = [f"{a.get('given', '')} {a.get('family', '')}".strip() 
-                                 for a in item['author'][:5]]
-                    
-                    # Extract year
-                    year = 'N/A'
-                    if 'published-print' in item:
-                        date_parts = item['published-print'].get('date-parts', [[]])[0]
-                        if date_parts:
-                            year = str(date_parts[0])
-                    
-                    # Extract title (can be array)
-                    title = 'N/A'
-                    if 'title' in item and item['title']:
-                        title = item['title'][0] if isinstance(item['title'], list) else item['title']
-                    
-                    paper = {
-                        'title': title,
-                        'authors': authors if authors else ['Unknown'],
-                        'year': year,
-                        'abstract': item.get('abstract', 'No abstract available')[:500],
-                        'citations': item.get('is-referenced-by-count', 0),
-                        'url': item.get('URL', ''),
-                        'source': 'Google Scholar',  # Keep as Scholar for UI
-                        'venue': item.get('container-title', ['N/A'])[0] if isinstance(item.get('container-title'), list) else item.get('container-title', 'N/A'),
-                        'publisher': item.get('publisher', 'CrossRef')
-                    }
-                    papers.append(paper)
-                
+                papers = self.parse_crossref(response.json(), max_results)
                 if papers:
                     logger.info(f"CrossRef API: Found {len(papers)} papers")
                     return papers
@@ -228,33 +204,11 @@ class ResearchPaperSearcher:
         # Fallback to Semantic Scholar if CrossRef fails
         try:
             logger.info("Trying Semantic Scholar API...")
-            semantic_url = "https://api.semanticscholar.org/graph/v1/paper/search"
-            params = {
-                'query': query,
-                'limit': min(max_results, 20),
-                'fields': 'title,authors,year,abstract,citationCount,url,venue,publicationTypes'
-            }
-            
-            response = requests.get(semantic_url, params=params, timeout=15)
+            params = self.semantic_scholar_fallback_params(query, max_results)
+            response = self.http.get(self.SEMANTIC_SCHOLAR_URL, params=params)
             
             if response.status_code == 200:
-                data = response.json()
-                for item in data.get('data', [])[:max_results]:
-                    authors = [author.get('name', 'Unknown') for author in item.get('authors', [])]
-                    
-                    paper = {
-                        'title': item.get('title', 'N/A'),
-                        'authors': authors if authors else ['Unknown'],
-                        'year': str(item.get('year', 'N/A')),
-                        'abstract': item.get('abstract', 'No abstract available'),
-                        'citations': item.get('citationCount', 0),
-                        'url': item.get('url', ''),
-                        'source': 'Google Scholar',  # Keep as Scholar for UI
-                        'venue': item.get('venue', 'N/A'),
-                        'publisher': 'Semantic Scholar API'
-                    }
-                    papers.append(paper)
-                
+                papers = self.parse_semantic_scholar_fallback(response.json(), max_results)
                 logger.info(f"Semantic Scholar: Found {len(papers)} papers")
             else:
                 logger.error(f"Semantic Scholar API returned status {response.status_code}")
@@ -263,6 +217,228 @@ class ResearchPaperSearcher:
             logger.error(f"Semantic Scholar fallback failed: {e}")
             
         return papers
+
+    # Upstream request parameters and response parsers, shared with the
+    # asyncio engine (engine.async_research)
+    CROSSREF_URL = "https://api.crossref.org/works"
+    # Identifies the app to CrossRef's polite pool and to Wikimedia
+    POLITE_HEADERS = {
+        'User-Agent': 'ScholarSphere/1.0 (mailto:research@scholarsphere.com)'
+    }
+    SEMANTIC_SCHOLAR_URL = "https://api.semanticscholar.org/graph/v1/paper/search"
+    ARXIV_URL = "http://export.arxiv.org/api/query"
+    WIKIPEDIA_API_URL = "https://en.wikipedia.org/w/api.php"
+    DUCKDUCKGO_HEADERS = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36'
+    }
+
+    @staticmethod
+    def crossref_params(query: str, max_results: int) -> Dict[str, Any]:
+        return {
+            'query': query,
+            'rows': min(max_results, 20),
+            'select': 'title,author,published-print,abstract,URL,publisher,container-title,is-referenced-by-count'
+        }
+
+    @staticmethod
+    def parse_crossref(data: Dict[str, Any], max_results: int) -> List[Dict[str, Any]]:
+        papers = []
+        items = data.get('message', {}).get('items', [])
+        
+        for item in items[:max_results]:
+            # Extract authors
+            authors = []
+            if 'author' in item:
+                authors = [f"{a.get('given', '')} {a.get('family', '')}".strip() 
+                         for a in item['author'][:5]]
+            
+            # Extract year
+            year = 'N/A'
+            if 'published-print' in item:
+                date_parts = item['published-print'].get('date-parts', [[]])[0]
+                if date_parts:
+                    year = str(date_parts[0])
+            
+            # Extract title (can be array)
+            title = 'N/A'
+            if 'title' in item and item['title']:
+                title = item['title'][0] if isinstance(item['title'], list) else item['title']
+            
+            paper = {
+                'title': title,
+                'authors': authors if authors else ['Unknown'],
+                'year': year,
+                'abstract': item.get('abstract', 'No abstract available')[:500],
+                'citations': item.get('is-referenced-by-count', 0),
+                'url': item.get('URL', ''),
+                'source': 'Google Scholar',  # Keep as Scholar for UI
+                'venue': item.get('container-title', ['N/A'])[0] if isinstance(item.get('container-title'), list) else item.get('container-title', 'N/A'),
+                'publisher': item.get('publisher', 'CrossRef')
+            }
+            papers.append(paper)
+        return papers
+
+    @staticmethod
+    def semantic_scholar_fallback_params(query: str, max_results: int) -> Dict[str, Any]:
+        return {
+            'query': query,
+            'limit': min(max_results, 20),
+            'fields': 'title,authors,year,abstract,citationCount,url,venue,publicationTypes'
+        }
+
+    @staticmethod
+    def parse_semantic_scholar_fallback(data: Dict[str, Any], max_results: int) -> List[Dict[str, Any]]:
+        papers = []
+        for item in data.get('data', [])[:max_results]:
+            authors = [author.get('name', 'Unknown') for author in item.get('authors', [])]
+            
+            paper = {
+                'title': item.get('title', 'N/A'),
+                'authors': authors if authors else ['Unknown'],
+                'year': str(item.get('year', 'N/A')),
+                'abstract': item.get('abstract', 'No abstract available'),
+                'citations': item.get('citationCount', 0),
+                'url': item.get('url', ''),
+                'source': 'Google Scholar',  # Keep as Scholar for UI
+                'venue': item.get('venue', 'N/A'),
+                'publisher': 'Semantic Scholar API'
+            }
+            papers.append(paper)
+        return papers
+
+    @staticmethod
+    def arxiv_params(query: str, max_results: int) -> Dict[str, Any]:
+        return {
+            'search_query': f'all:{query}',
+            'start': 0,
+            'max_results': min(max_results, 100)
+        }
+
+    @staticmethod
+    def parse_arxiv(content: bytes, max_results: int) -> List[Dict[str, Any]]:
+        import feedparser
+
+        papers = []
+        # Parse the Atom feed
+        feed = feedparser.parse(content)
+        
+        for entry in feed.entries[:max_results]:
+            try:
+                # Extract paper information
+                title = entry.get('title', 'Untitled').replace('\n', ' ').strip()
+                
+                # Get authors
+                authors = []
+                if 'authors' in entry:
+                    authors = [author.name for author in entry.authors[:5]]
+                
+                # Get year from published date
+                year = 'N/A'
+                if 'published' in entry:
+                    year = entry.published[:4]  # Extract year from date
+                
+                # Get abstract
+                abstract = entry.get('summary', 'No abstract available').replace('\n', ' ').strip()
+                
+                # Get URL
+                url = entry.get('id', entry.get('link', ''))
+                
+                # Get category/venue
+                venue = 'arXiv'
+                if 'arxiv_primary_category' in entry:
+                    venue = f"arXiv - {entry.arxiv_primary_category.get('term', '')}"
+                
+                paper = {
+                    'title': title,
+                    'authors': authors if authors else ['Unknown'],
+                    'year': year,
+                    'abstract': abstract[:500],
+                    'url': url,
+                    'source': 'ResearchGate',  # Display as ResearchGate for UI consistency
+                    'citations': 'N/A',
+                    'venue': venue,
+                    'publisher': 'Academic Database (arXiv)'
+                }
+                
+                papers.append(paper)
+                
+            except Exception as e:
+                logger.error(f"Error parsing arXiv result: {e}")
+                continue
+        return papers
+
+    @staticmethod
+    def semantic_scholar_params(query: str, max_results: int) -> Dict[str, Any]:
+        return {
+            'query': query,
+            'limit': min(max_results, 100),
+            'fields': 'title,authors,year,abstract,citationCount,url,venue'
+        }
+
+    @staticmethod
+    def parse_semantic_scholar(data: Dict[str, Any], max_results: int) -> List[Dict[str, Any]]:
+        papers = []
+        for paper_data in data.get('data', [])[:max_results]:
+            try:
+                title = paper_data.get('title', 'Untitled')
+                authors = [a.get('name', 'Unknown') for a in paper_data.get('authors', [])[:5]]
+                year = str(paper_data.get('year', 'N/A'))
+                abstract = paper_data.get('abstract', 'No abstract available')
+                url = paper_data.get('url', '')
+                
+                paper = {
+                    'title': title,
+                    'authors': authors if authors else ['Unknown'],
+                    'year': year,
+                    'abstract': abstract[:500] if abstract else 'No abstract available',
+                    'url': url,
+                    'source': 'ResearchGate',
+                    'citations': paper_data.get('citationCount', 'N/A'),
+                    'venue': paper_data.get('venue', 'N/A'),
+                    'publisher': 'Academic Database'
+                }
+                papers.append(paper)
+            except Exception as e:
+                continue
+        return papers
+
+    @staticmethod
+    def duckduckgo_url(query: str) -> str:
+        return f"https://html.duckduckgo.com/html/?q=site:researchgate.net+{query.replace(' ', '+')}"
+
+    @staticmethod
+    def parse_duckduckgo(html: str, query: str, max_results: int) -> List[Dict[str, Any]]:
+        from bs4 import BeautifulSoup
+
+        papers = []
+        soup = BeautifulSoup(html, 'html.parser')
+        
+        # DuckDuckGo result links
+        search_results = soup.find_all('a', class_='result__a')
+        
+        for idx, link in enumerate(search_results[:max_results]):
+            try:
+                title = link.get_text(strip=True)
+                url = link.get('href', '')
+                
+                if title and url and len(title) > 10:
+                    paper = {
+                        'title': title,
+                        'authors': ['Research Author'],
+                        'year': 'N/A',
+                        'abstract': f'Academic publication related to {query}. Click to view full details.',
+                        'url': url,
+                        'source': 'ResearchGate',
+                        'citations': 'N/A',
+                        'venue': 'ResearchGate',
+                        'publisher': 'Academic Database'
+                    }
+                    
+                    papers.append(paper)
+                    
+            except Exception as e:
+                continue
+        return papers
     
     def search_researchgate(self, query: str, max_results: int = 10) -> List[Dict[str, Any]]:
         """
@@ -280,66 +456,10 @@ class ResearchPaperSearcher:
         
         # Strategy 1: Use arXiv API (free, reliable, no rate limits)
         try:
-            import feedparser
-            
-            # arXiv API endpoint
-            arxiv_url = f"http://export.arxiv.org/api/query"
-            params = {
-                'search_query': f'all:{query}',
-                'start': 0,
-                'max_results': min(max_results, 100)
-            }
-            
-            response = requests.get(arxiv_url, params=params, timeout=15)
+            response = self.http.get(self.ARXIV_URL, params=self.arxiv_params(query, max_results))
             
             if response.status_code == 200:
-                # Parse the Atom feed
-                feed = feedparser.parse(response.content)
-                
-                for entry in feed.entries[:max_results]:
-                    try:
-                        # Extract paper information
-                        title = entry.get('title', 'Untitled').replace('\n', ' ').strip()
-                        
-                        # Get authors
-                        authors = []
-                        if 'authors' in entry:
-                            authors = [author.name for author in entry.authors[:5]]
-                        
-                        # Get year from published date
-                        year = 'N/A'
-                        if 'published' in entry:
-                            year = entry.published[:4]  # Extract year from date
-                        
-                        # Get abstract
-                        abstract = entry.get('summary', 'No abstract available').replace('\n', ' ').strip()
-                        
-                        # Get URL
-                        url = entry.get('id', entry.get('link', ''))
-                        
-                        # Get category/venue
-                        venue = 'arXiv'
-                        if 'arxiv_primary_category' in entry:
-                            venue = f"arXiv - {entry.arxiv_primary_category.get('term', '')}"
-                        
-                        paper = {
-                            'title': title,
-                            'authors': authors if authors else ['Unknown'],
-                            'year': year,
-                            'abstract': abstract[:500],
-                            'url': url,
-                            'source': 'ResearchGate',  # Display as ResearchGate for UI consistency
-                            'citations': 'N/A',
-                            'venue': venue,
-                            'publisher': 'Academic Database (arXiv)'
-                        }
-                        
-                        papers.append(paper)
-                        
-                    except Exception as e:
-                        logger.error(f"Error parsing arXiv result: {e}")
-                        continue
-                
+                papers = self.parse_arxiv(response.content, max_results)
                 if len(papers) > 0:
                     logger.info(f"Found {len(papers)} papers via arXiv API")
                     return papers
@@ -359,42 +479,12 @@ class ResearchPaperSearcher:
         
         # Strategy 2: Semantic Scholar (with error handling for rate limits)
         try:
-            semantic_scholar_url = f"https://api.semanticscholar.org/graph/v1/paper/search"
-            params = {
-                'query': query,
-                'limit': min(max_results, 100),
-                'fields': 'title,authors,year,abstract,citationCount,url,venue'
-            }
-            
-            response = requests.get(semantic_scholar_url, params=params, timeout=10)
+            params = self.semantic_scholar_params(query, max_results)
+            response = self.http.get(self.SEMANTIC_SCHOLAR_URL, params=params, timeout=10)
             
             if response.status_code == 200:
-                data = response.json()
-                
-                if 'data' in data and len(data['data']) > 0:
-                    for paper_data in data['data'][:max_results]:
-                        try:
-                            title = paper_data.get('title', 'Untitled')
-                            authors = [a.get('name', 'Unknown') for a in paper_data.get('authors', [])[:5]]
-                            year = str(paper_data.get('year', 'N/A'))
-                            abstract = paper_data.get('abstract', 'No abstract available')
-                            url = paper_data.get('url', '')
-                            
-                            paper = {
-                                'title': title,
-                                'authors': authors if authors else ['Unknown'],
-                                'year': year,
-                                'abstract': abstract[:500] if abstract else 'No abstract available',
-                                'url': url,
-                                'source': 'ResearchGate',
-                                'citations': paper_data.get('citationCount', 'N/A'),
-                                'venue': paper_data.get('venue', 'N/A'),
-                                'publisher': 'Academic Database'
-                            }
-                            papers.append(paper)
-                        except Exception as e:
-                            continue
-                    
+                papers = self.parse_semantic_scholar(response.json(), max_results)
+                if papers:
                     logger.info(f"Found {len(papers)} papers via Semantic Scholar")
                     return papers
             elif response.status_code == 429:
@@ -405,43 +495,10 @@ class ResearchPaperSearcher:
         
         # Strategy 2: Try DuckDuckGo search as fallback (no rate limiting)
         try:
-            ddg_url = f"https://html.duckduckgo.com/html/?q=site:researchgate.net+{query.replace(' ', '+')}"
-            
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36'
-            }
-            
-            response = requests.get(ddg_url, headers=headers, timeout=10)
+            response = self.http.get(self.duckduckgo_url(query), headers=self.DUCKDUCKGO_HEADERS, timeout=10)
             
             if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
-                
-                # DuckDuckGo result links
-                search_results = soup.find_all('a', class_='result__a')
-                
-                for idx, link in enumerate(search_results[:max_results]):
-                    try:
-                        title = link.get_text(strip=True)
-                        url = link.get('href', '')
-                        
-                        if title and url and len(title) > 10:
-                            paper = {
-                                'title': title,
-                                'authors': ['Research Author'],
-                                'year': 'N/A',
-                                'abstract': f'Academic publication related to {query}. Click to view full details.',
-                                'url': url,
-                                'source': 'ResearchGate',
-                                'citations': 'N/A',
-                                'venue': 'ResearchGate',
-                                'publisher': 'Academic Database'
-                            }
-                            
-                            papers.append(paper)
-                            
-                    except Exception as e:
-                        continue
-                
+                papers = self.parse_duckduckgo(response.text, query, max_results)
                 if len(papers) > 0:
                     logger.info(f"Found {len(papers)} papers via DuckDuckGo search")
                     return papers
@@ -469,6 +526,8 @@ class ResearchPaperSearcher:
         """
         articles = []
         try:
+            import wikipedia
+
             # Search Wikipedia
             search_results = wikipedia.search(query, results=max_results)
             
@@ -522,7 +581,48 @@ class ResearchPaperSearcher:
             
         return articles
     
-    def format_results_for_display(self, all_results: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    @staticmethod
+    def wikipedia_params(query: str, max_results: int) -> Dict[str, Any]:
+        # One MediaWiki API call returns the matching pages with their intros,
+        # instead of a search plus one page fetch per result
+        return {
+            'action': 'query',
+            'format': 'json',
+            'formatversion': 2,
+            'generator': 'search',
+            'gsrsearch': query,
+            'gsrlimit': min(max_results, 20),
+            'prop': 'extracts|info|pageprops',
+            'exintro': 1,
+            'explaintext': 1,
+            'exlimit': min(max_results, 20),
+            'inprop': 'url',
+            'ppprop': 'disambiguation'
+        }
+
+    @staticmethod
+    def parse_wikipedia(data: Dict[str, Any], max_results: int) -> List[Dict[str, Any]]:
+        pages = sorted(data.get('query', {}).get('pages', []), key=lambda page: page.get('index', 0))
+        articles = []
+        for page in pages:
+            # Disambiguation pages list other articles rather than describe one
+            if 'disambiguation' in page.get('pageprops', {}):
+                continue
+            articles.append({
+                'title': page.get('title', 'N/A'),
+                'authors': ['Wikipedia Contributors'],
+                'year': 'N/A',
+                'abstract': page.get('extract', '')[:500],  # First 500 chars
+                'url': page.get('fullurl', ''),
+                'source': 'Wikipedia',
+                'citations': 'N/A',
+                'venue': 'Wikipedia',
+                'publisher': 'Wikimedia Foundation'
+            })
+        return articles[:max_results]
+    
+    @staticmethod
+    def format_results_for_display(all_results: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
         """
         Format and combine all results for unified display
         
@@ -1,31 +1,161 @@
+import heapq
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from typing import List, Dict, Any
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from .indexer import Indexer
+from .result_cache import ResultCache
 
 class Searcher:
-    def __init__(self, indexer: Optional[Indexer] = None):
+    # 'hybrid' fuses a lexical and a dense ranking with reciprocal rank fusion
+    RANKERS = Indexer.RANKERS + ('hybrid',)
+    HYBRID_LEXICAL_RANKER = 'bm25'
+    # Candidates each retriever contributes to fusion, and the RRF constant
+    HYBRID_CANDIDATES = 50
+    RRF_K = 60
+    # Documents decoded per step when listing the index
+    DOCUMENTS_CHUNK = 1000
+
+    def __init__(self, indexer: Optional[Indexer] = None, cache_size: int = 4096):
         from typing import Optional
         self.indexer = indexer if indexer is not None else Indexer()
+        self._executor = None
+        # (formatted results, spelling corrections) keyed by (normalized
+        # query, top_k, ranker) and tagged with the index generation;
+        # cache_size=0 disables caching
+        self.cache = ResultCache(cache_size)
 
-    def search(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+    def search(self, query: str, top_k: int = 5, ranker: str = 'tfidf') -> List[Dict[str, Any]]:
         """
         Search for documents matching the query
         
         Args:
             query: Search query string
             top_k: Number of top results to return
+            ranker: Ranking function ('tfidf', 'bm25', 'bm25f', 'dense' or 'hybrid')
             
         Returns:
             List of dictionaries containing matched documents and their similarity scores
         """
+        key = self._cache_key(query, top_k, ranker)
+        generation = self.indexer.generation
+        results = (self.cache.get(key, generation) or (None, None))[0]
+        if results is None:
+            results = self._search(query, top_k, ranker)
+            self.cache.put(key, generation, (results, None))
+        return list(results)
+
+    def search_with_corrections(self, query: str, top_k: int = 5,
+                                ranker: str = 'tfidf') -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
+        """
+        Search for documents matching the query, along with the spelling
+        corrections applied to its terms ({query term: indexed term})
+
+        Both are cached together, so a cache hit costs no call to the
+        indexer (or broadcast to its shards) at all. Entries cached by
+        search() or search_many() get their corrections on first use.
+        """
+        key = self._cache_key(query, top_k, ranker)
+        generation = self.indexer.generation
+        results, corrections = self.cache.get(key, generation) or (None, None)
+        if corrections is None:
+            if results is None:
+                results = self._search(query, top_k, ranker)
+            corrections = self.indexer.spelling_corrections(query)
+            self.cache.put(key, generation, (results, corrections))
+        return list(results), dict(corrections)
+
+    def _search(self, query: str, top_k: int, ranker: str) -> List[Dict[str, Any]]:
+        if ranker == 'hybrid':
+            # Both retrievers run concurrently and return only their top
+            # candidates; fusion never looks beyond them
+            depth = max(top_k, self.HYBRID_CANDIDATES)
+            lexical = self._pool().submit(self._retrieve, query, depth, self.HYBRID_LEXICAL_RANKER)
+            dense = self._retrieve(query, depth, 'dense')
+            return self._format(self.fuse([lexical.result(), dense], top_k))
+
+        return self._format(self._retrieve(query, top_k, ranker))
+
+    def _cache_key(self, query: str, top_k: int, ranker: str):
+        # Rankers score bags of terms, so queries with the same normalized
+        # tokens in any order share an entry
+        return ' '.join(sorted(self.indexer.preprocess_text(query).split())), top_k, ranker
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Hit, miss, eviction and invalidation counters of the result cache"""
+        return self.cache.stats()
+
+    def _retrieve(self, query: str, top_k: int, ranker: str) -> List[Dict[str, Any]]:
         # Get similar documents from indexer
+        if hasattr(self.indexer, 'search_shards'):
+            return self.merge_top_k(self.indexer.search_shards(query, top_k, ranker=ranker), top_k)
         if not self.indexer.documents:
             return []
-            
-        results = self.indexer.get_similar_documents(query, top_k)
-        
-        # Format results
+        return self.indexer.get_similar_documents(query, top_k, ranker=ranker)
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='searcher')
+        return self._executor
+
+    def search_many(self, queries: List[str], top_k: int = 5, ranker: str = 'tfidf') -> List[List[Dict[str, Any]]]:
+        """
+        Search for many queries at once, scored with one sparse matrix product
+
+        Args:
+            queries: Search query strings
+            top_k: Number of top results to return per query
+            ranker: Ranking function ('tfidf', 'bm25', 'bm25f', 'dense' or 'hybrid')
+
+        Returns:
+            One list of results per query, formatted as in search()
+        """
+        generation = self.indexer.generation
+        keys = [self._cache_key(query, top_k, ranker) for query in queries]
+        batches = [(self.cache.get(key, generation) or (None, None))[0] for key in keys]
+        misses = [i for i, batch in enumerate(batches) if batch is None]
+        if misses:
+            computed = self._search_many([queries[i] for i in misses], top_k, ranker)
+            for i, results in zip(misses, computed):
+                # Spelling corrections are left for search_with_corrections()
+                self.cache.put(keys[i], generation, (results, None))
+                batches[i] = results
+        return [list(results) for results in batches]
+
+    def _search_many(self, queries: List[str], top_k: int, ranker: str) -> List[List[Dict[str, Any]]]:
+        if ranker == 'hybrid':
+            depth = max(top_k, self.HYBRID_CANDIDATES)
+            lexical = self._pool().submit(self._retrieve_many, queries, depth, self.HYBRID_LEXICAL_RANKER)
+            dense = self._retrieve_many(queries, depth, 'dense')
+            batches = [self.fuse(ranked, top_k) for ranked in zip(lexical.result(), dense)]
+        else:
+            batches = self._retrieve_many(queries, top_k, ranker)
+        return [self._format(results) for results in batches]
+
+    def _retrieve_many(self, queries: List[str], top_k: int, ranker: str) -> List[List[Dict[str, Any]]]:
+        if hasattr(self.indexer, 'search_shards_many'):
+            per_shard = self.indexer.search_shards_many(queries, top_k, ranker=ranker)
+            return [self.merge_top_k(partials, top_k) for partials in zip(*per_shard)]
+        return self.indexer.get_similar_documents_many(queries, top_k, ranker=ranker)
+
+    @classmethod
+    def fuse(cls, rankings: List[List[Dict[str, Any]]], top_k: int) -> List[Dict[str, Any]]:
+        """
+        Reciprocal rank fusion: a document scores sum(1 / (RRF_K + rank))
+        over the rankings it appears in. Ties keep the order of the first
+        ranking they appear in
+        """
+        fused = {}
+        for results in rankings:
+            for rank, result in enumerate(results, 1):
+                entry = fused.setdefault(result['document'].id, [0.0, result['document']])
+                entry[0] += 1.0 / (cls.RRF_K + rank)
+        best = heapq.nlargest(top_k, fused.values(), key=lambda entry: entry[0])
+        return [{'document': document, 'similarity': score} for score, document in best]
+
+    @staticmethod
+    def _format(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         formatted_results = []
         for result in results:
             doc = result['document']
@@ -37,9 +167,39 @@ class Searcher:
                 'similarity_score': result['similarity'],
                 'created_at': doc.created_at.isoformat() if doc.created_at else None
             })
-            
         return formatted_results
 
+    @staticmethod
+    def merge_top_k(partials: List[List[Dict[str, Any]]], top_k: int) -> List[Dict[str, Any]]:
+        """Merge best-first partial result lists (one per shard) into the global top-k"""
+        # The heap holds one head per shard, so only top_k entries are popped
+        merged = heapq.merge(*partials, key=lambda result: -result['similarity'])
+        return list(islice(merged, top_k))
+
     def get_results(self):
         """Get all documents in the index"""
-        return [doc.to_dict() for doc in self.indexer.get_index()]
\ No newline at end of file
+        return list(self.iter_documents())
+
+    def iter_documents(self, start: int = 0, limit: Optional[int] = None,
+                       fields: Optional[List[str]] = None, epoch: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Yield live documents in index order, decoding DOCUMENTS_CHUNK rows at a time
+
+        Positions are index rows: deleted documents keep their row until
+        the index is compacted, so a page may hold fewer than limit documents.
+        Compaction renumbers rows: when epoch is given, RowsRenumbered is
+        raised once it is no longer the indexer's row_epoch(), instead of
+        yielding documents from other positions.
+
+        Args:
+            start: Row of the first document
+            limit: Maximum number of rows (None for all remaining)
+            fields: to_dict() keys to include (None for all)
+            epoch: row_epoch() that start belongs to (None: not checked)
+        """
+        stop = self.indexer.row_count()
+        if limit is not None:
+            stop = min(stop, start + limit)
+        for chunk_start in range(start, stop, self.DOCUMENTS_CHUNK):
+            chunk_stop = min(stop, chunk_start + self.DOCUMENTS_CHUNK)
+            yield from self.indexer.document_dicts(chunk_start, chunk_stop, fields, epoch=epoch)
\ No newline at end of file
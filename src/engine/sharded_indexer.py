@@ -0,0 +1,231 @@
+"""
+Sharded local index
+Partitions documents across Indexer shards, each hosted in its own worker
+process, so ingest and query work run on all cores instead of under one GIL
+"""
+import atexit
+import multiprocessing
+import os
+import threading
+import zlib
+from typing import Any, Dict, List
+
+from .indexer import Indexer, RowsRenumbered
+
+
+def _shard_worker(connection, indexer_kwargs):
+    """Serve Indexer method calls for one shard until told to stop"""
+    indexer = Indexer(**indexer_kwargs)
+    while True:
+        message = connection.recv()
+        if message is None:
+            break
+        method, args, kwargs = message
+        try:
+            connection.send((True, getattr(indexer, method)(*args, **kwargs)))
+        except Exception as e:
+            connection.send((False, e))
+    connection.close()
+
+
+class _Shard:
+    """Client side of one shard process"""
+
+    def __init__(self, context, indexer_kwargs):
+        self.connection, child = context.Pipe()
+        self.process = context.Process(target=_shard_worker, args=(child, indexer_kwargs), daemon=True)
+        self.process.start()
+        child.close()
+        # One request in flight per shard; held from send until receive
+        self.lock = threading.Lock()
+
+    def send(self, method, *args, **kwargs):
+        self.lock.acquire()
+        try:
+            self.connection.send((method, args, kwargs))
+        except Exception:
+            self.lock.release()
+            raise
+
+    def receive(self):
+        try:
+            ok, result = self.connection.recv()
+        finally:
+            self.lock.release()
+        if not ok:
+            raise result
+        return result
+
+    def close(self):
+        with self.lock:
+            try:
+                self.connection.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        self.process.join(timeout=5)
+
+
+class ShardedIndexer:
+    """
+    Hash-partitioned set of Indexer shards with scatter-gather execution
+
+    Documents are routed by a stable hash of their id. Each shard ranks its
+    own partition with its own term statistics and returns a partial top-k;
+    the Searcher merges the partial lists.
+    """
+    RANKERS = Indexer.RANKERS
+
+    def __init__(self, n_shards=None, **indexer_kwargs):
+        self.n_shards = n_shards or os.cpu_count() or 1
+        # Shards are started lazily from a (multithreaded) web worker; forking
+        # there can copy locks held by other threads into the child, so they
+        # are spawned as fresh interpreters instead
+        context = multiprocessing.get_context('spawn')
+        self.shards = [_Shard(context, indexer_kwargs) for _ in range(self.n_shards)]
+        atexit.register(self.close)
+        # Bumped on every change to any shard, like Indexer.generation
+        self.generation = 0
+        # Local, empty Indexer used only for query text processing
+        self._analyzer = Indexer(**indexer_kwargs)
+
+    def shard_for(self, doc_id):
+        return zlib.crc32(str(doc_id).encode('utf-8')) % self.n_shards
+
+    def _scatter(self, calls):
+        """Send {shard index: (method, args, kwargs)} and gather the results"""
+        # Locks are always taken in shard order, so concurrent scatters
+        # cannot deadlock
+        sent = []
+        try:
+            for index in sorted(calls):
+                method, args, kwargs = calls[index]
+                self.shards[index].send(method, *args, **kwargs)
+                sent.append(index)
+        finally:
+            results = {}
+            errors = []
+            for index in sent:
+                try:
+                    results[index] = self.shards[index].receive()
+                except Exception as e:
+                    errors.append(e)
+        if errors:
+            raise errors[0]
+        return [results[index] for index in sorted(results)]
+
+    def _broadcast(self, method, *args, **kwargs):
+        return self._scatter({index: (method, args, kwargs) for index in range(self.n_shards)})
+
+    def index_document(self, document):
+        self.index_documents([document])
+
+    def index_documents(self, documents):
+        # Each shard tokenizes and indexes its part of the batch in parallel
+        batches = {}
+        for document in documents:
+            batches.setdefault(self.shard_for(document.id), []).append(document)
+        try:
+            self._scatter({index: ('index_documents', (batch,), {}) for index, batch in batches.items()})
+        finally:
+            self.generation += 1
+
+    def update_document(self, document):
+        try:
+            return self._scatter({self.shard_for(document.id): ('update_document', (document,), {})})[0]
+        finally:
+            self.generation += 1
+
+    def delete_document(self, doc_id):
+        try:
+            return self._scatter({self.shard_for(doc_id): ('delete_document', (doc_id,), {})})[0]
+        finally:
+            self.generation += 1
+
+    def preprocess_text(self, text):
+        return self._analyzer.preprocess_text(text)
+
+    def search_shards(self, query: str, top_k: int = 5, ranker: str = 'tfidf') -> List[List[Dict[str, Any]]]:
+        """Return every shard's best-first top-k for the query"""
+        if ranker not in self.RANKERS:
+            raise ValueError(f"Unknown ranker: {ranker}")
+        return self._broadcast('get_similar_documents', query, top_k, ranker=ranker)
+
+    def search_shards_many(self, queries: List[str], top_k: int = 5,
+                           ranker: str = 'tfidf') -> List[List[List[Dict[str, Any]]]]:
+        """Return every shard's per-query top-k lists for a batch of queries"""
+        if ranker not in self.RANKERS:
+            raise ValueError(f"Unknown ranker: {ranker}")
+        return self._broadcast('get_similar_documents_many', list(queries), top_k, ranker=ranker)
+
+    def spelling_corrections(self, query):
+        # Shards correct against their own vocabularies; report the first
+        # correction found for each term
+        corrections = {}
+        for shard_corrections in self._broadcast('spelling_corrections', query):
+            for term, correction in shard_corrections.items():
+                corrections.setdefault(term, correction)
+        return corrections
+
+    def get_index(self):
+        return [document for documents in self._broadcast('get_index') for document in documents]
+
+    def __len__(self):
+        return sum(self._broadcast('__len__'))
+
+    def row_count(self):
+        return sum(self._broadcast('row_count'))
+
+    def document_dicts(self, start, stop, fields=None, epoch=None):
+        """Live documents among rows [start, stop) of the shards' concatenation, shard 0 first"""
+        # Renumbering any shard moves the rows of the shards after it
+        if epoch is not None and epoch != self.row_epoch():
+            raise RowsRenumbered(f"Index rows were renumbered since epoch {epoch}")
+        epochs = epoch.split('-') if epoch is not None else [None] * self.n_shards
+        calls = {}
+        offset = 0
+        for index, length in enumerate(self._broadcast('row_count')):
+            if start < offset + length and stop > offset:
+                calls[index] = ('document_dicts', (max(start - offset, 0), min(stop - offset, length), fields),
+                                {'epoch': epochs[index]})
+            offset += length
+        return [document for page in self._scatter(calls) for document in page]
+
+    def row_epoch(self):
+        return '-'.join(self._broadcast('row_epoch'))
+
+    @staticmethod
+    def _shard_directory(directory, index):
+        return os.path.join(directory, f"shard-{index:03d}")
+
+    @staticmethod
+    def has_snapshot(directory):
+        return Indexer.has_snapshot(ShardedIndexer._shard_directory(directory, 0))
+
+    def save(self, directory, keep=2):
+        manifests = self._scatter({
+            index: ('save', (self._shard_directory(directory, index),), {'keep': keep})
+            for index in range(self.n_shards)
+        })
+        return {
+            'shards': manifests,
+            'documents': sum(manifest['documents'] for manifest in manifests)
+        }
+
+    def load(self, directory):
+        try:
+            manifests = self._scatter({
+                index: ('load', (self._shard_directory(directory, index),), {})
+                for index in range(self.n_shards)
+            })
+        finally:
+            self.generation += 1
+        return {
+            'name': ', '.join(manifest['name'] for manifest in manifests),
+            'shards': manifests,
+            'documents': sum(manifest['documents'] for manifest in manifests)
+        }
+
+    def close(self):
+        for shard in self.shards:
+            if shard.process.is_alive():
+                shard.close()
@@ -0,0 +1,137 @@
+"""
+Spelling correction
+Symmetric-delete (SymSpell) index over the index vocabulary, correcting
+query terms the index has never seen to the closest known term
+"""
+import threading
+
+
+def edit_distance(a, b, limit):
+    """
+    Optimal string alignment distance between a and b (insertions,
+    deletions, substitutions and adjacent transpositions), or limit + 1
+    once it is known to exceed limit
+    """
+    # Shared prefixes and suffixes never add to the distance
+    start = 0
+    while start < len(a) and start < len(b) and a[start] == b[start]:
+        start += 1
+    end_a, end_b = len(a), len(b)
+    while end_a > start and end_b > start and a[end_a - 1] == b[end_b - 1]:
+        end_a -= 1
+        end_b -= 1
+    a, b = a[start:end_a], b[start:end_b]
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if not a or not b:
+        return max(len(a), len(b))
+
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1] if previous[-1] <= limit else limit + 1
+
+
+def _deletes(word, distance):
+    """word and every string obtained by deleting up to distance characters from it"""
+    results = {word}
+    frontier = {word}
+    for _ in range(distance):
+        frontier = {candidate[:i] + candidate[i + 1:] for candidate in frontier for i in range(len(candidate))}
+        results |= frontier
+    return results
+
+
+class SpellingIndex:
+    """
+    Symmetric-delete spelling index over a growing list of terms
+
+    Every term is stored under each string obtained by deleting up to
+    max_distance characters from its first prefix_length characters. Two
+    words within that edit distance share at least one such string, so a
+    lookup generates the deletes of the misspelling, collects the terms
+    stored under them and verifies only those: its cost depends on the
+    word length, not on the vocabulary size. Terms are identified by their
+    position in the term list, which only ever grows, so the index is
+    extended incrementally and shared by every snapshot of an index.
+    """
+
+    def __init__(self, max_distance=2, prefix_length=6):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        # delete -> term id, or list of term ids once several terms share it
+        self._deletes = {}
+        self._terms = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._terms)
+
+    def sync(self, terms, n_terms):
+        """Index terms[len(self):n_terms], the terms added since the last sync"""
+        if len(self._terms) >= n_terms:
+            return
+        with self._lock:
+            deletes = self._deletes
+            for term_id in range(len(self._terms), n_terms):
+                term = terms[term_id]
+                for key in _deletes(term[:self.prefix_length], self.max_distance):
+                    stored = deletes.get(key)
+                    if stored is None:
+                        deletes[key] = term_id
+                    elif type(stored) is int:
+                        deletes[key] = [stored, term_id]
+                    else:
+                        stored.append(term_id)
+                self._terms.append(term)
+
+    def max_distance_for(self, word):
+        """Edits allowed when correcting word: none for very short words, one for short ones"""
+        if len(word) < 3:
+            return 0
+        return 1 if len(word) <= 4 else self.max_distance
+
+    def candidates(self, word, n_terms):
+        """Yield (distance, term id) of the first n_terms terms within reach of word"""
+        limit = self.max_distance_for(word)
+        if not limit:
+            return
+        seen = set()
+        for key in _deletes(word[:self.prefix_length], limit):
+            stored = self._deletes.get(key)
+            if stored is None:
+                continue
+            for term_id in ((stored,) if type(stored) is int else stored):
+                if term_id >= n_terms or term_id in seen:
+                    continue
+                seen.add(term_id)
+                distance = edit_distance(word, self._terms[term_id], limit)
+                if distance <= limit:
+                    yield distance, term_id
+
+    def correct(self, word, n_terms, frequencies):
+        """
+        Return the id of the closest of the first n_terms terms to word
+        (ties go to the highest frequency), or None if none is in reach
+
+        Terms whose frequency is zero, such as terms of deleted documents,
+        are never suggested.
+        """
+        best = None
+        for distance, term_id in self.candidates(word, n_terms):
+            frequency = frequencies[term_id]
+            if frequency <= 0:
+                continue
+            rank = (distance, -frequency, self._terms[term_id])
+            if best is None or rank < best[0]:
+                best = (rank, term_id)
+        return best[1] if best is not None else None
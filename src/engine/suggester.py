@@ -0,0 +1,220 @@
+"""
+Query autocompletion
+Prefix completions over the local index vocabulary, document titles and
+previously searched queries, ranked by how often each occurs
+"""
+import bisect
+import heapq
+import threading
+from collections import Counter
+
+import numpy as np
+
+# Sorts after every character, so [prefix, prefix + _LAST) spans all keys with the prefix
+_LAST = '\U0010ffff'
+
+
+def normalize_query(text):
+    return ' '.join(text.lower().split())
+
+
+class PrefixIndex:
+    """
+    Sorted array of keys with a weight per key, answering top-k prefix lookups
+
+    The keys sharing a prefix form one contiguous run of the sorted array,
+    found with two binary searches. Short runs are ranked per lookup; the
+    best entries of long runs (short prefixes) are cached and kept current
+    as keys are added, which is exact because weights only ever grow.
+    """
+    # Runs up to this many keys are ranked on every lookup
+    SCAN_LIMIT = 256
+    # Entries cached per long run: the most completions a lookup returns
+    CACHED_TOP = 32
+
+    def __init__(self):
+        self._keys = []
+        self.weights = {}
+        self._top = {}
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _rank(self, key):
+        return -self.weights[key], key
+
+    def add(self, key, weight=1):
+        """Add weight to a key, inserting it if new"""
+        if key in self.weights:
+            self.weights[key] += weight
+        else:
+            self.weights[key] = weight
+            bisect.insort(self._keys, key)
+        for end in range(1, len(key) + 1):
+            top = self._top.get(key[:end])
+            if top is None:
+                continue
+            if key not in top:
+                if len(top) == self.CACHED_TOP and self._rank(key) > self._rank(top[-1]):
+                    continue
+                top.append(key)
+            top.sort(key=self._rank)
+            del top[self.CACHED_TOP:]
+
+    def update(self, weights):
+        """Add many {key: weight} at once"""
+        new = sum(1 for key in weights if key not in self.weights)
+        if new <= max(64, len(self._keys) // 16):
+            for key, weight in weights.items():
+                self.add(key, weight)
+            return
+        # Cheaper to re-sort than to insert one key at a time
+        for key, weight in weights.items():
+            self.weights[key] = self.weights.get(key, 0) + weight
+        self._keys = sorted(self.weights)
+        self._top = {}
+
+    def complete(self, prefix, limit=10):
+        """Keys starting with prefix, heaviest first (ties in key order)"""
+        start = bisect.bisect_left(self._keys, prefix)
+        end = bisect.bisect_left(self._keys, prefix + _LAST, start)
+        if end - start <= self.SCAN_LIMIT:
+            return heapq.nsmallest(limit, self._keys[start:end], key=self._rank)
+        top = self._top.get(prefix)
+        if top is None:
+            top = self._top[prefix] = heapq.nsmallest(self.CACHED_TOP, self._keys[start:end], key=self._rank)
+        return top[:limit]
+
+
+class Suggester:
+    """
+    Type-ahead completions for the search box
+
+    Indexed terms (weighted by the number of documents containing them),
+    document titles (by the number of documents sharing the title) and
+    queries users have searched (by how often) are kept in prefix indexes.
+    Terms and titles are folded in from the indexer's snapshots by a
+    background thread whenever its generation changes, reading only the
+    rows added since the last sync; lookups meanwhile serve what has been
+    synced so far.
+
+    A ShardedIndexer has no snapshot to read terms and titles from (they
+    live in the shard processes), so with one only searched queries are
+    suggested.
+    """
+    MAX_LIMIT = PrefixIndex.CACHED_TOP
+
+    def __init__(self, indexer):
+        self.indexer = indexer
+        # Single-word terms, and multi-word titles and queries
+        self._terms = PrefixIndex()
+        self._phrases = PrefixIndex()
+        # Display form of each phrase key (titles and queries keep their casing)
+        self._display = {}
+        self._queries = Counter()
+        self._lock = threading.Lock()
+        # What has been synced: the indexer generation, its document store
+        # and the rows read from it (sync() state, under _sync_lock)
+        self._sync_lock = threading.Lock()
+        self._syncing = False
+        self._generation = None
+        self._documents = None
+        self._rows = 0
+
+    def record_query(self, query):
+        """Count a searched query as a completion candidate"""
+        key = normalize_query(query)
+        if not key:
+            return
+        with self._lock:
+            self._queries[key] += 1
+            self._display.setdefault(key, ' '.join(query.split()))
+            self._phrases.add(key)
+
+    def suggest(self, prefix, limit=10):
+        """
+        Return up to limit completions of prefix, most frequent first
+
+        The last word of a multi-word prefix is also completed from the
+        vocabulary, keeping the words before it. Documents indexed since
+        the last sync are folded in in the background, not by this call.
+        """
+        key = normalize_query(prefix)
+        if not key:
+            return []
+        limit = min(limit, self.MAX_LIMIT)
+        self._schedule_sync()
+        with self._lock:
+            candidates = {}
+            for phrase in self._phrases.complete(key, limit):
+                candidates[phrase] = (self._phrases.weights[phrase], self._display.get(phrase, phrase))
+            head, _, last = key.rpartition(' ')
+            if last and len(prefix) == len(prefix.rstrip()):
+                for term in self._terms.complete(last, limit):
+                    completion = f"{head} {term}" if head else term
+                    weight = self._terms.weights[term]
+                    if completion not in candidates or candidates[completion][0] < weight:
+                        candidates[completion] = (weight, self._display.get(completion, completion))
+        ranked = sorted(candidates.items(), key=lambda item: (-item[1][0], item[0]))
+        return [display for _, (_, display) in ranked[:limit]]
+
+    def _schedule_sync(self):
+        snapshot = getattr(self.indexer, 'snapshot', None)
+        if snapshot is None or snapshot.generation == self._generation or self._syncing:
+            return  # sharded indexes only contribute their searched queries
+        self._syncing = True
+        threading.Thread(target=self._background_sync, name='suggester-sync', daemon=True).start()
+
+    def _background_sync(self):
+        try:
+            self.sync()
+        finally:
+            self._syncing = False
+
+    def sync(self):
+        """Fold in the terms and titles indexed since the last sync, blocking until done"""
+        with self._sync_lock:
+            snapshot = getattr(self.indexer, 'snapshot', None)
+            if snapshot is None or snapshot.generation == self._generation:
+                return
+            # Compaction or a snapshot load rewrites the rows: start over
+            reset = snapshot.documents is not self._documents
+            start = 0 if reset else self._rows
+
+            # Documents containing each term in any field, counted over the
+            # unique (document, term) pairs of the new rows
+            stride = max(snapshot.n_terms, 1)
+            pairs = []
+            for field in snapshot.fields.values():
+                terms, _, offsets = field.forward_rows(start)
+                pairs.append(np.repeat(np.arange(len(offsets) - 1, dtype=np.int64), np.diff(offsets)) * stride
+                             + terms)
+            term_ids, doc_freq = np.unique(np.unique(np.concatenate(pairs)) % stride, return_counts=True)
+            term_weights = {snapshot.terms[term_id]: count
+                            for term_id, count in zip(term_ids.tolist(), doc_freq.tolist())}
+
+            titles, display = Counter(), {}
+            for row in range(start, snapshot.n_docs):
+                title = snapshot.documents.text(row, 'title')
+                key = normalize_query(title or '')
+                if key:
+                    titles[key] += 1
+                    display.setdefault(key, ' '.join(title.split()))
+
+            if reset:
+                # Built aside, so lookups keep using the old indexes meanwhile
+                terms_index, phrases = PrefixIndex(), PrefixIndex()
+                terms_index.update(term_weights)
+                phrases.update(titles)
+                with self._lock:
+                    phrases.update(self._queries)
+                    display.update((key, self._display[key]) for key in self._queries)
+                    self._terms, self._phrases, self._display = terms_index, phrases, display
+            else:
+                with self._lock:
+                    self._terms.update(term_weights)
+                    self._phrases.update(titles)
+                    for key, text in display.items():
+                        self._display.setdefault(key, text)
+            self._documents, self._rows = snapshot.documents, snapshot.n_docs
+            self._generation = snapshot.generation
@@ -1,12 +1,15 @@
-from flask import Flask, jsonify, request, render_template # pyright: ignore[reportMissingImports]
-from engine.indexer import Indexer
+from flask import Flask, jsonify, request, render_template, redirect, Response, stream_with_context # pyright: ignore[reportMissingImports]
+from engine.document_store import DOCUMENT_FIELDS
+from engine.http_pool import HttpSessionPool
+from engine.indexer import Indexer, RowsRenumbered
+from engine.indexing_queue import IndexingQueue, QueueFull
 from engine.searcher import Searcher
-from engine.research_searcher import ResearchPaperSearcher
+from engine.suggester import Suggester
 from models.document import Document
+from utils.helpers import iter_json_records, lazy_singleton
 import uuid
+import time
 from datetime import datetime
-import requests
-from bs4 import BeautifulSoup
 import os
 from dotenv import load_dotenv # pyright: ignore[reportMissingImports]
 import json
@@ -47,10 +50,82 @@ app = Flask(__name__,
             static_folder='static',
             template_folder='templates')
 
-# Initialize the search engine components
-indexer = Indexer()
-searcher = Searcher(indexer)
-research_searcher = ResearchPaperSearcher()
+INDEX_SNAPSHOT_DIR = os.getenv('INDEX_SNAPSHOT_DIR')
+# Number of worker processes hosting the local index; 1 keeps it in-process
+INDEX_SHARDS = int(os.getenv('INDEX_SHARDS', '1'))
+# Local search results kept in the generation-aware LRU cache (0 disables it)
+SEARCH_CACHE_SIZE = int(os.getenv('SEARCH_CACHE_SIZE', '4096'))
+# Documents queued by POST /documents: most indexed per batch, and the
+# backlog beyond which new documents are refused with 503
+INDEX_QUEUE_BATCH_SIZE = int(os.getenv('INDEX_QUEUE_BATCH_SIZE', '1000'))
+INDEX_QUEUE_MAX_PENDING = int(os.getenv('INDEX_QUEUE_MAX_PENDING', '100000'))
+# Outbound API calls: idle keep-alive connections kept per upstream host,
+# retries of failed connections and 502/503/504s, and timeouts in seconds
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '10'))
+HTTP_RETRIES = int(os.getenv('HTTP_RETRIES', '2'))
+HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', '5'))
+HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', '15'))
+# Connections the asyncio research engine keeps open across all sources
+RESEARCH_MAX_CONNECTIONS = int(os.getenv('RESEARCH_MAX_CONNECTIONS', '100'))
+# Research results cache: entries kept in memory, the SQLite file shared by
+# worker processes (unset: memory only), and seconds past its TTL that an
+# entry is still served while it is refreshed. Per-source TTLs are set with
+# RESEARCH_CACHE_TTL_SCHOLAR, _RESEARCHGATE and _WIKIPEDIA
+RESEARCH_CACHE_SIZE = int(os.getenv('RESEARCH_CACHE_SIZE', '1024'))
+RESEARCH_CACHE_PATH = os.getenv('RESEARCH_CACHE_PATH')
+RESEARCH_CACHE_MAX_STALE = float(os.getenv('RESEARCH_CACHE_MAX_STALE', '86400'))
+
+# Search engine components are created on first use, so a cold start that
+# only serves static pages never pays for them
+@lazy_singleton
+def get_indexer():
+    if INDEX_SHARDS > 1:
+        from engine.sharded_indexer import ShardedIndexer
+        indexer = ShardedIndexer(INDEX_SHARDS)
+    else:
+        indexer = Indexer()
+    # Restore the local index from its on-disk snapshot, if one is configured
+    if INDEX_SNAPSHOT_DIR and indexer.has_snapshot(INDEX_SNAPSHOT_DIR):
+        snapshot = indexer.load(INDEX_SNAPSHOT_DIR)
+        print(f"Loaded index snapshot {snapshot['name']} ({snapshot['documents']} documents)")
+    return indexer
+
+@lazy_singleton
+def get_searcher():
+    return Searcher(get_indexer(), cache_size=SEARCH_CACHE_SIZE)
+
+@lazy_singleton
+def get_indexing_queue():
+    return IndexingQueue(get_indexer(), max_batch=INDEX_QUEUE_BATCH_SIZE, max_pending=INDEX_QUEUE_MAX_PENDING)
+
+@lazy_singleton
+def get_suggester():
+    return Suggester(get_indexer())
+
+@lazy_singleton
+def get_http_pool():
+    return HttpSessionPool(pool_size=HTTP_POOL_SIZE, retries=HTTP_RETRIES,
+                           connect_timeout=HTTP_CONNECT_TIMEOUT, read_timeout=HTTP_READ_TIMEOUT)
+
+@lazy_singleton
+def get_research_loop():
+    from engine.async_research import EventLoopThread
+    return EventLoopThread(name='research-loop')
+
+@lazy_singleton
+def get_research_searcher():
+    # Used only on the research loop, where its HTTP client lives
+    from engine.async_research import AsyncResearchSearcher
+    from engine.research_cache import DEFAULT_TTLS, ResearchCache
+    cache = None
+    if RESEARCH_CACHE_SIZE > 0 or RESEARCH_CACHE_PATH:
+        ttls = {source: float(os.getenv(f'RESEARCH_CACHE_TTL_{source.upper()}', ttl))
+                for source, ttl in DEFAULT_TTLS.items()}
+        cache = ResearchCache(maxsize=RESEARCH_CACHE_SIZE, path=RESEARCH_CACHE_PATH, ttls=ttls,
+                              max_stale=RESEARCH_CACHE_MAX_STALE)
+    return AsyncResearchSearcher(max_connections=RESEARCH_MAX_CONNECTIONS, retries=HTTP_RETRIES,
+                                 connect_timeout=HTTP_CONNECT_TIMEOUT, read_timeout=HTTP_READ_TIMEOUT,
+                                 cache=cache)
 
 @app.route('/')
 def index():
@@ -91,22 +166,25 @@ def search():
     """Universal search endpoint"""
     query = request.args.get('q', '')
     source = request.args.get('source', 'local')  # 'local', 'youtube', 'stackoverflow', 'github'
+    ranker = request.args.get('ranker', 'tfidf')  # 'tfidf', 'bm25', 'bm25f', 'dense', 'hybrid' (local only)
     
     if not query:
         return jsonify({"error": "Query parameter 'q' is required"}), 400
         
     if source == 'youtube':
-        return redirect(f'https://www.youtube.com/results?search_query={query}') # pyright: ignore[reportUndefinedVariable]
+        return redirect(f'https://www.youtube.com/results?search_query={query}')
     elif source == 'stackoverflow':
-        return redirect(f'https://stackoverflow.com/search?q={query}') # pyright: ignore[reportUndefinedVariable]
+        return redirect(f'https://stackoverflow.com/search?q={query}')
     elif source == 'github':
-        return redirect(f'https://github.com/search?q={query}') # pyright: ignore[reportUndefinedVariable]
+        return redirect(f'https://github.com/search?q={query}')
     
-    if not query:
-        return jsonify({"error": "Query parameter 'q' is required"}), 400
+    if ranker not in Searcher.RANKERS:
+        return jsonify({"error": f"Invalid ranker parameter, expected one of {', '.join(Searcher.RANKERS)}"}), 400
 
+    sources = [source]
     results = {
         "query": query,
+        "ranker": ranker,
         "local_results": [],
         "web_results": [],
         "youtube_results": [],
@@ -115,9 +193,18 @@ def search():
     }
 
     # Local search
-    if 'local' in sources: # type: ignore
-        local_results = searcher.search(query, top_k=5)
+    if 'local' in sources:
+        start_time = time.perf_counter()
+        # Query terms missing from the index are matched on their closest indexed term
+        local_results, corrections = get_searcher().search_with_corrections(query, top_k=5, ranker=ranker)
         results["local_results"] = local_results
+        results["local_search_ms"] = round((time.perf_counter() - start_time) * 1000, 3)
+        if local_results:
+            get_suggester().record_query(query)
+        if corrections:
+            results["corrections"] = corrections
+
+    http = get_http_pool()
 
     # YouTube search
     if 'youtube' in sources and APIConfig.YOUTUBE_API_KEY: # type: ignore
@@ -130,7 +217,7 @@ def search():
             'type': 'video'
         }
         try:
-            response = requests.get(youtube_url, params=params)
+            response = http.get(youtube_url, params=params)
             if response.status_code == 200:
                 results["youtube_results"] = response.json().get('items', [])
         except Exception as e:
@@ -148,7 +235,7 @@ def search():
             'sort': 'relevance'
         }
         try:
-            response = requests.get(stackoverflow_url, params=params)
+            response = http.get(stackoverflow_url, params=params)
             if response.status_code == 200:
                 results["stackoverflow_results"] = response.json().get('items', [])
         except Exception as e:
@@ -165,7 +252,7 @@ def search():
             'per_page': 5
         }
         try:
-            response = requests.get(github_url, headers=headers, params=params)
+            response = http.get(github_url, headers=headers, params=params)
             if response.status_code == 200:
                 results["github_results"] = response.json().get('items', [])
         except Exception as e:
@@ -173,9 +260,58 @@ def search():
 
     return jsonify(results)
 
+@app.route('/search/batch', methods=['POST'])
+def search_batch():
+    """Evaluate many local queries in one call"""
+    data = request.get_json(silent=True) or {}
+    queries = data.get('queries')
+    ranker = data.get('ranker', 'tfidf')
+    top_k = data.get('top_k', 5)
+
+    if not isinstance(queries, list) or not all(isinstance(query, str) for query in queries):
+        return jsonify({"error": "'queries' must be a list of strings"}), 400
+    if ranker not in Searcher.RANKERS:
+        return jsonify({"error": f"Invalid ranker parameter, expected one of {', '.join(Searcher.RANKERS)}"}), 400
+    if not isinstance(top_k, int) or isinstance(top_k, bool) or top_k < 1:
+        return jsonify({"error": "'top_k' must be a positive integer"}), 400
+
+    start_time = time.perf_counter()
+    batches = get_searcher().search_many(queries, top_k=top_k, ranker=ranker)
+    elapsed = time.perf_counter() - start_time
+    return jsonify({
+        "ranker": ranker,
+        "results": [{"query": query, "local_results": results} for query, results in zip(queries, batches)],
+        "total_queries": len(queries),
+        "local_search_ms": round(elapsed * 1000, 3)
+    })
+
+@app.route('/suggest', methods=['GET'])
+def suggest():
+    """Type-ahead completions of a partial query"""
+    query = request.args.get('q', '')
+    limit = request.args.get('limit', 10, type=int)
+
+    if not query.strip():
+        return jsonify({"error": "Query parameter 'q' is required"}), 400
+    if limit < 1:
+        return jsonify({"error": "'limit' must be a positive integer"}), 400
+
+    start_time = time.perf_counter()
+    suggestions = get_suggester().suggest(query, limit)
+    return jsonify({
+        "query": query,
+        "suggestions": suggestions,
+        "suggest_ms": round((time.perf_counter() - start_time) * 1000, 3)
+    })
+
+@app.route('/search/cache', methods=['GET'])
+def search_cache_stats():
+    """Local search result cache counters"""
+    return jsonify(get_searcher().cache_stats())
+
 @app.route('/documents', methods=['POST'])
 def add_document():
-    """Add a new document to the index"""
+    """Queue a new document for indexing; it becomes searchable once the queue reaches it"""
     data = request.json
     
     if not data or not data.get('title') or not data.get('content'):
@@ -189,13 +325,149 @@ def add_document():
         created_at=datetime.now()
     )
     
-    indexer.index_document(doc)
-    return jsonify(doc.to_dict()), 201
+    try:
+        queue_depth = get_indexing_queue().put(doc)
+    except QueueFull as e:
+        return jsonify({"error": str(e)}), 503, {'Retry-After': '1'}
+    return jsonify({"id": doc.id, "status": "queued", "queue_depth": queue_depth}), 202
+
+@app.route('/documents/bulk', methods=['POST'])
+def add_documents_bulk():
+    """Stream NDJSON (or a JSON array) of documents into the index in batches"""
+    try:
+        batch_size = int(request.args.get('batch_size', 1000))
+    except ValueError:
+        return jsonify({"error": "batch_size must be an integer"}), 400
+    if batch_size < 1:
+        return jsonify({"error": "batch_size must be >= 1"}), 400
+    indexer = get_indexer()
+    start_time = time.time()
+    indexed = 0
+    skipped = 0
+    batch = []
+
+    try:
+        for data in iter_json_records(request.stream):
+            if not isinstance(data, dict) or not data.get('title') or not data.get('content'):
+                skipped += 1
+                continue
+            batch.append(Document(
+                id=str(data.get('id') or uuid.uuid4()),
+                title=data['title'],
+                content=data['content'],
+                url=data.get('url'),
+                created_at=datetime.now()
+            ))
+            if len(batch) >= batch_size:
+                indexer.index_documents(batch)
+                indexed += len(batch)
+                batch = []
+    except ValueError as e:
+        # Batches already indexed stay indexed; the partial batch is dropped
+        return jsonify({"error": str(e), "indexed": indexed, "skipped": skipped}), 400
+
+    if batch:
+        indexer.index_documents(batch)
+        indexed += len(batch)
+
+    elapsed = time.time() - start_time
+    return jsonify({
+        "indexed": indexed,
+        "skipped": skipped,
+        "elapsed_seconds": round(elapsed, 3),
+        "documents_per_second": round(indexed / elapsed, 1) if elapsed > 0 else None
+    }), 201
 
 @app.route('/documents', methods=['GET'])
 def get_documents():
-    """Get all indexed documents"""
-    return jsonify(searcher.get_results())
+    """Stream a page of indexed documents as NDJSON"""
+    searcher = get_searcher()
+    # Cursors are "<row epoch>.<row>": rows are renumbered when the index is
+    # compacted, so a cursor from an earlier epoch no longer points anywhere
+    epoch, start = searcher.indexer.row_epoch(), 0
+    try:
+        if 'cursor' in request.args:
+            epoch, separator, start = request.args['cursor'].rpartition('.')
+            if not separator or not epoch:
+                raise ValueError
+            start = int(start)
+        limit = int(request.args.get('limit', 1000))
+    except ValueError:
+        return jsonify({"error": "cursor must be a cursor returned in X-Next-Cursor and limit an integer"}), 400
+    if start < 0 or limit < 1:
+        return jsonify({"error": "cursor must be >= 0 and limit >= 1"}), 400
+    if epoch != searcher.indexer.row_epoch():
+        return jsonify({"error": "cursor expired: the index was compacted or reloaded since, restart without a cursor"}), 410
+
+    fields = None
+    if request.args.get('fields'):
+        fields = [name.strip() for name in request.args['fields'].split(',') if name.strip()]
+        unknown = [name for name in fields if name not in DOCUMENT_FIELDS]
+        if unknown or not fields:
+            return jsonify({"error": f"Invalid fields parameter, expected a subset of {', '.join(DOCUMENT_FIELDS)}"}), 400
+
+    # Deleted documents are skipped, so a page may be short
+    rows = searcher.indexer.row_count()
+    stop = min(rows, start + limit)
+    headers = {'X-Total-Count': str(len(searcher.indexer))}
+    if stop < rows:
+        headers['X-Next-Cursor'] = f"{epoch}.{stop}"
+
+    # Documents are decoded and serialized a chunk at a time while the
+    # response is written, so memory does not grow with the page size
+    def generate():
+        try:
+            for document in searcher.iter_documents(start, stop - start, fields, epoch=epoch):
+                yield json.dumps(document, ensure_ascii=False) + '\n'
+        except RowsRenumbered:
+            # Compacted mid-page: the page ends early and its next cursor
+            # is rejected, rather than returning documents twice or never
+            return
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson', headers=headers)
+
+@app.route('/documents/<doc_id>', methods=['PUT'])
+def put_document(doc_id):
+    """Create or replace the document with the given id"""
+    data = request.json
+
+    if not data or not data.get('title') or not data.get('content'):
+        return jsonify({"error": "Title and content are required"}), 400
+
+    doc = Document(
+        id=doc_id,
+        title=data['title'],
+        content=data['content'],
+        url=data.get('url'),
+        created_at=datetime.now()
+    )
+
+    existed = get_indexer().update_document(doc)
+    return jsonify(doc.to_dict()), 200 if existed else 201
+
+@app.route('/documents/<doc_id>', methods=['DELETE'])
+def delete_document(doc_id):
+    """Remove a document from the index"""
+    if not get_indexer().delete_document(doc_id):
+        return jsonify({"error": f"Document not found: {doc_id}"}), 404
+    return '', 204
+
+@app.route('/index/status', methods=['GET'])
+def index_status():
+    """Indexed document count and the backlog of the background indexing queue"""
+    indexer = get_indexer()
+    return jsonify({
+        "documents": len(indexer),
+        "generation": indexer.generation,
+        "queue": get_indexing_queue().stats()
+    })
+
+@app.route('/index/snapshot', methods=['POST'])
+def save_index_snapshot():
+    """Persist the local index to INDEX_SNAPSHOT_DIR"""
+    if not INDEX_SNAPSHOT_DIR:
+        return jsonify({"error": "INDEX_SNAPSHOT_DIR is not configured"}), 400
+    return jsonify(get_indexer().save(INDEX_SNAPSHOT_DIR)), 201
 
 @app.route('/research/search', methods=['GET'])
 def research_search():
@@ -207,38 +479,53 @@ def research_search():
     if not query:
         return jsonify({"error": "Query parameter 'q' is required"}), 400
     
+    from engine.async_research import SOURCES, research_payload
+    if source != 'all' and source not in SOURCES:
+        return jsonify({"error": "Invalid source parameter"}), 400
+
     try:
-        if source == 'all':
-            results = research_searcher.search_all(query, max_results)
-            formatted = research_searcher.format_results_for_display(results)
-            return jsonify({
-                "query": query,
-                "total_results": len(formatted),
-                "results": formatted,
-                "results_by_source": {
-                    "scholar": len(results.get('scholar', [])),
-                    "researchgate": len(results.get('researchgate', [])),
-                    "wikipedia": len(results.get('wikipedia', []))
-                }
-            })
-        elif source == 'scholar':
-            results = research_searcher.search_google_scholar(query, max_results)
-        elif source == 'researchgate':
-            results = research_searcher.search_researchgate(query, max_results)
-        elif source == 'wikipedia':
-            results = research_searcher.search_wikipedia(query, max_results)
-        else:
-            return jsonify({"error": "Invalid source parameter"}), 400
-        
-        return jsonify({
-            "query": query,
-            "source": source,
-            "total_results": len(results),
-            "results": results
-        })
-        
+        # Sources and their fallbacks run as coroutines on the shared research
+        # loop; this request thread only waits for the combined result
+        payload = get_research_loop().run(research_payload(get_research_searcher(), query, source, max_results))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+    if payload["total_results"]:
+        get_suggester().record_query(query)
+    return jsonify(payload)
+
+@app.route('/research/cache', methods=['GET'])
+def research_cache_stats():
+    """Research results cache hit rates by source and tier, and entry ages"""
+    return jsonify(get_research_searcher().cache_stats())
+
+@app.route('/research/search/stream', methods=['GET'])
+def research_search_stream():
+    """Stream research results as NDJSON, one line per source as soon as it finishes"""
+    query = request.args.get('q', '')
+    try:
+        max_results = int(request.args.get('max', 10))
+    except ValueError:
+        return jsonify({"error": "'max' must be an integer"}), 400
+
+    if not query:
+        return jsonify({"error": "Query parameter 'q' is required"}), 400
+
+    from engine.async_research import research_events
+    events = get_research_loop().iterate(research_events(get_research_searcher(), query, max_results))
+
+    def generate():
+        try:
+            for event in events:
+                if event["type"] == 'done' and event["total_results"]:
+                    get_suggester().record_query(query)
+                yield json.dumps(event) + '\n'
+        finally:
+            # Stops the remaining sources if the client disconnects
+            events.close()
+
+    # Proxies must pass each line on as it is written
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson', headers=headers)
 
 if __name__ == '__main__':
     port = int(os.getenv('PORT', 5000))
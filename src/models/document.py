@@ -1,16 +1,40 @@
-from dataclasses import dataclass
+import uuid
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, Sequence
+
+import numpy as np
 
-@dataclass
 class Document:
-    title: str
-    content: str
-    id: str
-    url: Optional[str] = None
-    created_at: Optional[datetime] = None
-    embedding: Optional[List[float]] = None
-    
+    """
+    A document to index
+
+    Uses __slots__ rather than a per-instance __dict__; the index itself
+    keeps documents in a columnar DocumentStore and hands back views.
+    """
+    __slots__ = ('title', 'content', 'id', 'url', 'created_at', 'embedding')
+
+    def __init__(self, title: str, content: str, id: Optional[str] = None,
+                 url: Optional[str] = None, created_at: Optional[datetime] = None,
+                 embedding: Optional[Sequence[float]] = None):
+        self.title = title
+        self.content = content
+        self.id = id if id is not None else str(uuid.uuid4())
+        self.url = url
+        self.created_at = created_at
+        # Embeddings are stored as float32 vectors
+        self.embedding = np.asarray(embedding, dtype=np.float32) if embedding is not None else None
+
+    def __eq__(self, other):
+        if not isinstance(other, Document):
+            return NotImplemented
+        return (self.id, self.title, self.content, self.url, self.created_at) == \
+            (other.id, other.title, other.content, other.url, other.created_at)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Document(id={self.id!r}, title={self.title!r})"
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -18,4 +42,15 @@ class Document:
             'content': self.content,
             'url': self.url,
             'created_at': self.created_at.isoformat() if self.created_at else None
-        }
\ No newline at end of file
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        created_at = data.get('created_at')
+        return cls(
+            id=data['id'],
+            title=data['title'],
+            content=data['content'],
+            url=data.get('url'),
+            created_at=datetime.fromisoformat(created_at) if created_at else None
+        )
@@ -108,6 +108,8 @@ function initializeSearchFunctionality() {
         await performSearch(query);
     });
     
+    initializeTypeAhead(form, queryInput);
+    
     // Handle chip selection for visual feedback
     const chips = document.querySelectorAll('.chip');
     chips.forEach(chip => {
@@ -118,6 +120,104 @@ function initializeSearchFunctionality() {
     });
 }
 
+// Type-ahead suggestions from /suggest, shown under the search box
+function initializeTypeAhead(form, queryInput) {
+    const list = document.createElement('ul');
+    list.className = 'suggestions';
+    list.setAttribute('role', 'listbox');
+    list.hidden = true;
+    queryInput.parentElement.appendChild(list);
+    
+    let debounceTimer = null;
+    let controller = null;
+    let active = -1;
+    
+    const hide = () => {
+        list.hidden = true;
+        list.innerHTML = '';
+        active = -1;
+    };
+    
+    const choose = (suggestion) => {
+        queryInput.value = suggestion;
+        hide();
+        form.dispatchEvent(new Event('submit', { cancelable: true }));
+    };
+    
+    const highlight = (index) => {
+        const items = list.querySelectorAll('li');
+        if (!items.length) return;
+        active = (index + items.length) % items.length;
+        items.forEach((item, i) => item.classList.toggle('suggestion-active', i === active));
+    };
+    
+    const render = (suggestions) => {
+        if (!suggestions.length) {
+            hide();
+            return;
+        }
+        list.innerHTML = suggestions.map(suggestion =>
+            `<li role="option">${escapeHtml(suggestion)}</li>`).join('');
+        list.querySelectorAll('li').forEach((item, i) => {
+            // mousedown fires before the input loses focus
+            item.addEventListener('mousedown', (e) => {
+                e.preventDefault();
+                choose(suggestions[i]);
+            });
+        });
+        active = -1;
+        list.hidden = false;
+    };
+    
+    const fetchSuggestions = async (query) => {
+        // Only the latest keystroke's request matters
+        if (controller) controller.abort();
+        controller = new AbortController();
+        try {
+            const response = await fetch(`/suggest?q=${encodeURIComponent(query)}&limit=8`, {
+                signal: controller.signal
+            });
+            if (!response.ok) return;
+            const data = await response.json();
+            if (queryInput.value === query) render(data.suggestions || []);
+        } catch (error) {
+            if (error.name !== 'AbortError') console.error('Suggest error:', error);
+        }
+    };
+    
+    queryInput.addEventListener('input', () => {
+        clearTimeout(debounceTimer);
+        const query = queryInput.value;
+        if (!query.trim()) {
+            hide();
+            return;
+        }
+        debounceTimer = setTimeout(() => fetchSuggestions(query), 120);
+    });
+    
+    queryInput.addEventListener('keydown', (e) => {
+        if (list.hidden) return;
+        if (e.key === 'ArrowDown') {
+            e.preventDefault();
+            highlight(active + 1);
+        } else if (e.key === 'ArrowUp') {
+            e.preventDefault();
+            highlight(active - 1);
+        } else if (e.key === 'Enter' && active >= 0) {
+            e.preventDefault();
+            choose(list.querySelectorAll('li')[active].textContent);
+        } else if (e.key === 'Escape') {
+            hide();
+        }
+    });
+    
+    queryInput.addEventListener('blur', hide);
+    form.addEventListener('submit', () => {
+        clearTimeout(debounceTimer);
+        hide();
+    });
+}
+
 // Quick search function
 function quickSearch(query) {
     const input = document.getElementById('researchQuery');
@@ -152,6 +252,11 @@ async function performSearch(query) {
     loadingSpinner.scrollIntoView({ behavior: 'smooth', block: 'center' });
     
     try {
+        if (source === 'all') {
+            await streamAllSources(query, maxResults);
+            return;
+        }
+        
         const response = await fetch(`/research/search?q=${encodeURIComponent(query)}&source=${source}&max=${maxResults}`);
         
         if (!response.ok) {
@@ -188,6 +293,76 @@ async function performSearch(query) {
     }
 }
 
+// Search every source, rendering each source's cards as soon as it answers
+async function streamAllSources(query, maxResults) {
+    const loadingSpinner = document.getElementById('loadingSpinner');
+    const loadingText = loadingSpinner.querySelector('.loading-text');
+    const resultsSection = document.getElementById('resultsSection');
+    const resultsGrid = document.getElementById('resultsGrid');
+    const noResults = document.getElementById('noResults');
+    const resultsCount = document.getElementById('resultsCount');
+    const sourceNames = { scholar: 'Google Scholar', researchgate: 'ResearchGate', wikipedia: 'Wikipedia' };
+    const pending = new Set(Object.keys(sourceNames));
+    const defaultLoadingText = loadingText.textContent;
+    let total = 0;
+    
+    document.getElementById('searchedQuery').textContent = query;
+    resultsGrid.innerHTML = '';
+    noResults.style.display = 'none';
+    resultsCount.textContent = '0';
+    Object.keys(sourceNames).forEach(name => {
+        document.getElementById(`${name}Count`).textContent = '0';
+    });
+    
+    const handleEvent = (event) => {
+        if (event.type === 'source') {
+            pending.delete(event.source);
+            document.getElementById(`${event.source}Count`).textContent = event.total_results;
+            event.results.forEach((paper, index) => {
+                resultsGrid.appendChild(createPaperCard(paper, index));
+            });
+            if (!total && event.total_results) {
+                // First results: show them while the slower sources finish
+                resultsSection.style.display = 'block';
+                resultsSection.scrollIntoView({ behavior: 'smooth', block: 'start' });
+            }
+            total += event.total_results;
+            resultsCount.textContent = total;
+            loadingText.textContent = `Waiting for ${[...pending].map(name => sourceNames[name]).join(', ')}...`;
+        } else if (event.type === 'done') {
+            loadingSpinner.style.display = 'none';
+            loadingText.textContent = defaultLoadingText;
+            if (!event.total_results) {
+                showNoResults();
+                resultsSection.style.display = 'block';
+            }
+        }
+    };
+    
+    try {
+        const response = await fetch(`/research/search/stream?q=${encodeURIComponent(query)}&max=${maxResults}`);
+        if (!response.ok || !response.body) {
+            throw new Error('Search failed');
+        }
+        
+        // NDJSON: one event per line, handled as each line arrives
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            const lines = buffer.split('\n');
+            buffer = lines.pop();
+            lines.filter(line => line.trim()).forEach(line => handleEvent(JSON.parse(line)));
+        }
+        if (buffer.trim()) handleEvent(JSON.parse(buffer));
+    } finally {
+        loadingText.textContent = defaultLoadingText;
+    }
+}
+
 // Display all search results
 function displayAllResults(results, resultsBySource = {}) {
     const resultsGrid = document.getElementById('resultsGrid');
@@ -1,3 +1,9 @@
+import codecs
+import functools
+import json
+import threading
+
+
 def normalize_text(text):
     # Normalize the text by converting to lowercase and stripping whitespace
     return text.lower().strip()
@@ -6,4 +12,78 @@ def calculate_relevance(query, document):
     # A simple relevance scoring function based on keyword matching
     query_terms = set(normalize_text(query).split())
     document_terms = set(normalize_text(document.content).split())
-    return len(query_terms.intersection(document_terms)) / len(query_terms) if query_terms else 0
\ No newline at end of file
+    return len(query_terms.intersection(document_terms)) / len(query_terms) if query_terms else 0
+
+def iter_json_records(stream, chunk_size=64 * 1024):
+    """
+    Incrementally parse JSON records from a byte stream
+
+    Accepts NDJSON (one value per line) or a single top-level JSON array and
+    yields each value as soon as it has been read, so only the current chunk
+    and the record being decoded are held in memory.
+
+    Args:
+        stream: Binary file-like object (e.g. Flask's request.stream)
+        chunk_size: Number of bytes read per call
+
+    Raises:
+        ValueError: If the payload is not valid NDJSON or a JSON array
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''
+    in_array = None  # unknown until the first non-whitespace character
+    eof = False
+
+    while not eof:
+        chunk = stream.read(chunk_size)
+        eof = not chunk
+        buffer += utf8.decode(chunk or b'', final=eof)
+        pos = 0
+
+        while True:
+            # Skip whitespace and, inside an array, the separating commas
+            while pos < len(buffer) and (buffer[pos].isspace() or (in_array and buffer[pos] == ',')):
+                pos += 1
+            if pos == len(buffer):
+                break
+            if in_array is None:
+                in_array = buffer[pos] == '['
+                if in_array:
+                    pos += 1
+                continue
+            if in_array and buffer[pos] == ']':
+                return
+            try:
+                record, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as e:
+                if eof:
+                    raise ValueError(f"Invalid JSON record: {e.msg}") from e
+                break  # the record continues in the next chunk
+            if end == len(buffer) and not eof:
+                break  # a trailing scalar may still be growing; wait for more
+            yield record
+            pos = end
+
+        buffer = buffer[pos:]
+
+    if in_array:
+        raise ValueError("Unterminated JSON array")
+
+def lazy_singleton(factory):
+    """
+    Defer a zero-argument factory until its first call, then return the same
+    instance forever after. Safe to call from concurrent request threads.
+    """
+    lock = threading.Lock()
+    instance = []
+
+    @functools.wraps(factory)
+    def get():
+        if not instance:
+            with lock:
+                if not instance:
+                    instance.append(factory())
+        return instance[0]
+
+    return get
@@ -0,0 +1,267 @@
+import asyncio
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+import httpx
+from src.engine.async_research import AsyncResearchSearcher, EventLoopThread, research_events, research_payload
+from src.engine.research_cache import ResearchCache
+
+ARXIV_FEED = b"""<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+  <entry>
+    <id>http://arxiv.org/abs/1234.5678</id>
+    <published>2021-05-01T00:00:00Z</published>
+    <title>Graph Neural Networks</title>
+    <summary>A survey of message passing.</summary>
+    <author><name>Ada Lovelace</name></author>
+  </entry>
+</feed>"""
+
+WIKIPEDIA = {"query": {"pages": [
+    {"index": 2, "title": "Graph theory", "extract": "Study of graphs.", "fullurl": "https://w/Graph_theory"},
+    {"index": 1, "title": "Graph", "extract": "May refer to:", "fullurl": "https://w/Graph",
+     "pageprops": {"disambiguation": ""}},
+    {"index": 3, "title": "Graph database", "extract": "A database.", "fullurl": "https://w/Graph_database"}
+]}}
+
+CROSSREF = {"message": {"items": [
+    {"title": ["Deep Graph Learning"], "author": [{"given": "Alan", "family": "Turing"}],
+     "published-print": {"date-parts": [[2019, 1]]}, "is-referenced-by-count": 42, "URL": "https://doi.org/x"}
+]}}
+
+
+def blocked_scholar(query, max_results):
+    raise RuntimeError("Google Scholar blocked")
+
+
+class StandInUpstreams:
+    """Async httpx handler standing in for arXiv, CrossRef, Wikipedia and friends"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        # Per-host overrides of the response delay and status
+        self.delays = {}
+        self.statuses = {}
+        self.requests = []
+        self.completed = []
+
+    async def __call__(self, request):
+        self.requests.append(request.url.host)
+        await asyncio.sleep(self.delays.get(request.url.host, self.delay))
+        self.completed.append(request.url.host)
+        status = self.statuses.get(request.url.host, 200)
+        if status != 200:
+            return httpx.Response(status)
+        if request.url.host == 'export.arxiv.org':
+            return httpx.Response(200, content=ARXIV_FEED)
+        if request.url.host == 'en.wikipedia.org':
+            return httpx.Response(200, json=WIKIPEDIA)
+        if request.url.host == 'api.crossref.org':
+            return httpx.Response(200, json=CROSSREF)
+        if request.url.host == 'html.duckduckgo.com':
+            return httpx.Response(200, text='<a class="result__a" href="https://rg/paper">Graph Learning On Manifolds</a>')
+        return httpx.Response(200, json={"data": []})
+
+
+class TestAsyncResearchSearcher(unittest.TestCase):
+
+    def setUp(self):
+        self.upstreams = StandInUpstreams()
+        self.loop = EventLoopThread()
+        self.searcher = AsyncResearchSearcher(
+            retries=1, backoff_factor=0, scholar=blocked_scholar,
+            client=httpx.AsyncClient(transport=httpx.MockTransport(self.upstreams)))
+
+    def tearDown(self):
+        self.loop.run(self.searcher.aclose())
+        self.loop.close()
+
+    def test_search_all(self):
+        payload = self.loop.run(research_payload(self.searcher, "graph", 'all', 10))
+        self.assertEqual(payload["results_by_source"], {"scholar": 1, "researchgate": 1, "wikipedia": 2})
+        # Sorted by citations: the CrossRef fallback for Google Scholar first
+        self.assertEqual(payload["results"][0]["title"], "Deep Graph Learning")
+        wikipedia = [result["title"] for result in payload["results"] if result["source_type"] == 'wikipedia']
+        self.assertEqual(wikipedia, ["Graph theory", "Graph database"])
+
+    def test_fallbacks_and_retries(self):
+        self.upstreams.statuses['export.arxiv.org'] = 503
+        results = self.loop.run(self.searcher.search('researchgate', "graph", 5))
+        self.assertEqual([paper['url'] for paper in results], ["https://rg/paper"])
+        # arXiv retried once, then Semantic Scholar (no data), then DuckDuckGo
+        self.assertEqual(self.upstreams.requests,
+                         ['export.arxiv.org', 'export.arxiv.org', 'api.semanticscholar.org', 'html.duckduckgo.com'])
+
+        self.upstreams.statuses['en.wikipedia.org'] = 500
+        self.assertEqual(self.loop.run(self.searcher.search('wikipedia', "graph", 5)), [])
+        with self.assertRaises(ValueError):
+            self.loop.run(self.searcher.search('scopus', "graph", 5))
+
+    def test_results_stream_as_sources_finish(self):
+        self.upstreams.delays = {'api.crossref.org': 0.6, 'export.arxiv.org': 0.3}
+        start = time.perf_counter()
+        arrivals = []
+        for event in self.loop.iterate(research_events(self.searcher, "graph", 10)):
+            arrivals.append((event, time.perf_counter() - start))
+        self.assertEqual([event.get('source') for event, _ in arrivals], ['wikipedia', 'researchgate', 'scholar', None])
+        # Wikipedia is on screen long before the slowest source answers
+        self.assertLess(arrivals[0][1], 0.25)
+        self.assertGreaterEqual(arrivals[2][1], 0.6)
+        wikipedia, done = arrivals[0][0], arrivals[-1][0]
+        self.assertEqual([paper['source_type'] for paper in wikipedia['results']], ['wikipedia', 'wikipedia'])
+        self.assertEqual((done['type'], done['total_results']), ('done', 4))
+
+    def test_closing_a_stream_cancels_slower_sources(self):
+        self.upstreams.delays = {'api.crossref.org': 0.5, 'export.arxiv.org': 0.5}
+        events = self.loop.iterate(research_events(self.searcher, "graph", 10))
+        self.assertEqual(next(events)['source'], 'wikipedia')
+        events.close()
+        time.sleep(0.7)
+        self.assertEqual(self.upstreams.completed, ['en.wikipedia.org'])
+
+    def test_stale_results_are_served_while_refreshing(self):
+        self.searcher.cache = cache = ResearchCache(ttls={'wikipedia': 0.2}, max_stale=60)
+        first = self.loop.run(self.searcher.search('wikipedia', "graph", 5))
+        self.loop.run(self.searcher.search('wikipedia', "Graph ", 5))
+        self.assertEqual(self.upstreams.requests, ['en.wikipedia.org'])
+
+        time.sleep(0.25)
+        self.upstreams.delay = 0.2
+        start = time.perf_counter()
+        self.assertEqual(self.loop.run(self.searcher.search('wikipedia', "graph", 5)), first)
+        self.loop.run(self.searcher.search('wikipedia', "graph", 5))
+        # Served from cache at once; a single refresh runs in the background
+        self.assertLess(time.perf_counter() - start, 0.1)
+        self.assertEqual(self.searcher.cache_stats()['refreshing'], 1)
+        time.sleep(0.3)
+        self.assertEqual(self.upstreams.requests, ['en.wikipedia.org'] * 2)
+        self.assertTrue(cache.get('wikipedia', "graph", 5)[1])
+        stats = self.searcher.cache_stats()
+        self.assertEqual((stats['hits'], stats['stale_hits'], stats['misses'], stats['refreshes']), (2, 2, 1, 1))
+
+    def test_sqlite_lock_waits_stay_off_the_event_loop(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'research.sqlite3')
+        self.searcher.cache = cache = ResearchCache(path=path)
+        self.addCleanup(cache.close)
+        # Another worker process holding the write lock
+        other = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.addCleanup(other.close)
+        other.execute("BEGIN IMMEDIATE")
+
+        start = time.perf_counter()
+        results = self.loop.run(self.searcher.search('wikipedia', "graph", 5))
+        self.assertEqual(self.loop.run(self.searcher.search('wikipedia', "graph", 5)), results)
+        self.loop.run(asyncio.sleep(0.01))
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertEqual(other.execute("SELECT COUNT(*) FROM research_results").fetchone(), (0,))
+
+        # The write lands once the lock is released
+        other.execute("ROLLBACK")
+        time.sleep(0.3)
+        shared = ResearchCache(path=path)
+        self.addCleanup(shared.close)
+        self.assertEqual(shared.get('wikipedia', "graph", 5), (results, True))
+
+    def test_failed_searches_are_not_cached(self):
+        self.searcher.cache = ResearchCache()
+        self.upstreams.statuses['en.wikipedia.org'] = 500
+        self.assertEqual(self.loop.run(self.searcher.search('wikipedia', "graph", 5)), [])
+        del self.upstreams.statuses['en.wikipedia.org']
+        self.assertEqual(len(self.loop.run(self.searcher.search('wikipedia', "graph", 5))), 2)
+
+    def test_identical_concurrent_searches_share_upstream_calls(self):
+        self.upstreams.delay = 0.2
+        scrapes = []
+
+        def scholar(query, max_results):
+            scrapes.append(query)
+            raise RuntimeError("Google Scholar blocked")
+
+        self.searcher._scholar = scholar
+
+        async def classroom():
+            return await asyncio.gather(*[self.searcher.search_all("graph", 10) for _ in range(20)],
+                                        *[self.searcher.search('wikipedia', "Graph ", 10) for _ in range(5)],
+                                        self.searcher.search('wikipedia', "graph", 5))
+
+        *everything, wikipedia = self.loop.run(classroom())
+        self.assertEqual(len(scrapes), 1)
+        # One call per upstream, plus Wikipedia again for the smaller max
+        self.assertEqual(sorted(self.upstreams.requests),
+                         ['api.crossref.org', 'en.wikipedia.org', 'en.wikipedia.org', 'export.arxiv.org'])
+        self.assertEqual(everything[0]['wikipedia'], everything[-1])
+        self.assertEqual(everything[0]['wikipedia'], wikipedia)
+        # Each caller gets its own copies of the results
+        self.assertIsNot(everything[0]['wikipedia'][0], everything[1]['wikipedia'][0])
+        self.assertEqual(self.searcher.cache_stats(), {"enabled": False, "in_flight": 0, "coalesced": 62})
+
+    def test_queued_scholar_scrapes_fall_back_on_timeout(self):
+        released = threading.Event()
+        self.addCleanup(released.set)
+        scrapes = []
+
+        def scholar(query, max_results):
+            scrapes.append(query)
+            released.wait(5)
+            return []
+
+        self.searcher._scholar = scholar
+        self.searcher.scholar_workers = 1
+        self.searcher.SCHOLAR_TIMEOUT = 0.2
+
+        async def busy():
+            return await asyncio.gather(*[self.searcher.search('scholar', query, 10)
+                                          for query in ("graph", "trees", "forests")])
+
+        start = time.perf_counter()
+        results = self.loop.run(busy())
+        self.assertLess(time.perf_counter() - start, 1)
+        # Scrapes still queued for the one thread were dropped
+        self.assertEqual(scrapes, ["graph"])
+        self.assertEqual([[paper['title'] for paper in papers] for papers in results],
+                         [["Deep Graph Learning"]] * 3)
+
+    def test_shared_search_stops_when_every_caller_leaves(self):
+        self.upstreams.delay = 0.3
+
+        async def leave(*callers):
+            searches = [asyncio.ensure_future(self.searcher.search('wikipedia', "graph", 5)) for _ in range(3)]
+            await asyncio.sleep(0.1)
+            for caller in callers:
+                searches[caller].cancel()
+            return await asyncio.gather(*searches, return_exceptions=True)
+
+        results = self.loop.run(leave(0, 1))
+        self.assertIsInstance(results[0], asyncio.CancelledError)
+        self.assertEqual(len(results[2]), 2)
+        self.assertEqual(self.upstreams.completed, ['en.wikipedia.org'])
+
+        results = self.loop.run(leave(0, 1, 2))
+        time.sleep(0.4)
+        self.assertEqual(self.upstreams.completed, ['en.wikipedia.org'])
+        self.assertEqual(self.searcher.cache_stats()["in_flight"], 0)
+
+    def test_searches_in_flight_do_not_use_threads(self):
+        self.upstreams.delay = 0.2
+        threads = threading.active_count()
+
+        async def many():
+            return await asyncio.gather(*(self.searcher.search_all(f"query {i}", 5) for i in range(100)))
+
+        start = time.perf_counter()
+        results = self.loop.run(many())
+        self.assertEqual(len(results), 100)
+        self.assertTrue(all(result['wikipedia'] for result in results))
+        # 100 searches x 3 sources with 200 ms upstreams overlap on the loop;
+        # only the Google Scholar scrapes use (a bounded pool of) threads
+        self.assertLess(time.perf_counter() - start, 5)
+        self.assertLessEqual(threading.active_count() - threads, self.searcher.scholar_workers)
+
+
+if __name__ == '__main__':
+    unittest.main()
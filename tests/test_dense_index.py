@@ -0,0 +1,60 @@
+import unittest
+import numpy as np
+from scipy.sparse import random as sparse_random
+from sklearn.preprocessing import normalize
+from src.engine.dense_index import DenseIndex
+
+class TestDenseIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.matrix = normalize(sparse_random(600, 300, density=0.05, format='csr', random_state=1))
+        self.index = DenseIndex.fit(self.matrix, n_components=16, n_lists=12)
+
+    def test_vectors_are_contiguous_float32(self):
+        self.assertEqual(self.index.vectors.shape, (600, 16))
+        self.assertEqual(self.index.vectors.dtype, np.float32)
+        self.assertTrue(self.index.vectors.flags['C_CONTIGUOUS'])
+        self.assertEqual(self.index.list_offsets[-1], 600)
+
+    def test_full_probe_is_exact(self):
+        query = self.index.embed_query(self.matrix[7])
+        rows, scores = self.index.candidates(query, n_probe=12)
+        self.assertCountEqual(rows, range(600))
+        np.testing.assert_allclose(scores, self.index.vectors[rows] @ query, rtol=1e-5)
+        self.assertEqual(rows[np.argmax(scores)], 7)
+
+        rows, _ = self.index.candidates(query, n_probe=2)
+        self.assertLess(len(rows), 600)
+        self.assertIn(7, rows)
+
+    def test_added_rows_are_searchable_before_and_after_merge(self):
+        extra = normalize(sparse_random(5, 320, density=0.1, format='csr', random_state=2))
+        self.index = self.index.added(extra)
+        self.assertEqual((len(self.index), self.index.tail_rows), (605, 5))
+        query = self.index.embed_query(extra[3])
+        rows, scores = self.index.candidates(query, n_probe=1)
+        self.assertEqual(rows[np.argmax(scores)], 603)
+
+        self.index = self.index.merged()
+        self.assertEqual(self.index.tail_rows, 0)
+        rows, scores = self.index.candidates(query, n_probe=1)
+        self.assertEqual(rows[np.argmax(scores)], 603)
+
+    def test_appends_share_buffers_and_keep_lists_sorted(self):
+        first = self.index.added(normalize(sparse_random(5, 300, density=0.1, format='csr', random_state=2)))
+        second = first.added(normalize(sparse_random(7, 300, density=0.1, format='csr', random_state=3)))
+        # Appends after the first write into the same buffer; earlier indexes keep their rows
+        self.assertTrue(np.shares_memory(first.vectors, second.vectors))
+        self.assertEqual((len(first), len(second)), (605, 612))
+
+        merged = second.merged()
+        fresh = DenseIndex(merged.components, merged.vectors, merged.centroids, merged.assignments, merged.fitted_rows)
+        np.testing.assert_array_equal(merged.list_rows, fresh.list_rows)
+        np.testing.assert_array_equal(merged.list_offsets, fresh.list_offsets)
+        # Merging again after more rows extends the same lists
+        again = merged.added(self.matrix[:3]).merged()
+        fresh = DenseIndex(again.components, again.vectors, again.centroids, again.assignments, again.fitted_rows)
+        np.testing.assert_array_equal(again.list_rows, fresh.list_rows)
+
+if __name__ == '__main__':
+    unittest.main()
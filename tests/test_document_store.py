@@ -0,0 +1,80 @@
+import os
+import pickle
+import tempfile
+import unittest
+from datetime import datetime, timezone
+import numpy as np
+from src.engine.document_store import DocumentStore
+from src.models.document import Document
+
+class TestDocumentStore(unittest.TestCase):
+
+    def setUp(self):
+        self.store = DocumentStore()
+        self.documents = [
+            Document(title="Café notes", content="Ünïcode content", id="a",
+                     url="https://example.org/a", created_at=datetime(2024, 5, 17, 9, 30, 0, 123456)),
+            Document(title="Plain", content="", id="b", embedding=[0.5, -1.25, 3.0]),
+            Document(title="Aware", content="tz", id="c",
+                     created_at=datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc)),
+        ]
+        for document in self.documents:
+            self.store.append(document)
+
+    def test_round_trip(self):
+        self.assertEqual(len(self.store), 3)
+        for document, view in zip(self.documents, self.store):
+            self.assertEqual(view, document)
+            self.assertEqual(view.to_dict(), document.to_dict())
+        self.assertIsNone(self.store[1].url)
+        self.assertIsNone(self.store[1].created_at)
+        self.assertEqual(self.store[-1].id, "c")
+        with self.assertRaises(IndexError):
+            self.store[3]
+
+    def test_embeddings_are_float32(self):
+        self.assertEqual(self.documents[1].embedding.dtype, np.float32)
+        embedding = self.store[1].embedding
+        self.assertEqual(embedding.dtype, np.float32)
+        np.testing.assert_array_equal(embedding, [0.5, -1.25, 3.0])
+        self.assertIsNone(self.store[0].embedding)
+        # A view handed out earlier does not block further appends
+        self.store.append(Document(title="More", content="text", embedding=[1.0]))
+        np.testing.assert_array_equal(self.store[3].embedding, [1.0])
+
+    def test_views_pickle_without_the_store(self):
+        view = pickle.loads(pickle.dumps(self.store[1]))
+        self.assertEqual(view, self.documents[1])
+        self.assertEqual(len(view._store), 1)
+        np.testing.assert_array_equal(view.embedding, self.documents[1].embedding)
+
+    def test_restored_from_mapped_arrays(self):
+        with tempfile.TemporaryDirectory() as directory:
+            arrays = {}
+            for name, values in self.store.arrays().items():
+                np.save(os.path.join(directory, f"{name}.npy"), values)
+                arrays[name] = np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r')
+            restored = DocumentStore.from_arrays(arrays)
+            for document, view in zip(self.documents, restored):
+                self.assertEqual(view, document)
+            np.testing.assert_array_equal(restored[1].embedding, [0.5, -1.25, 3.0])
+
+            # Appended rows continue after the mapped ones, which stay read-only
+            extra = Document(title="Später", content="more", id="d", embedding=[2.0])
+            self.assertEqual(restored.append(extra), 3)
+            self.assertEqual([view.id for view in restored], ["a", "b", "c", "d"])
+            self.assertEqual(restored.ids(), ["a", "b", "c", "d"])
+            np.testing.assert_array_equal(restored[3].embedding, [2.0])
+            copied = restored.select([3, 0])
+            self.assertEqual(list(copied), [extra, self.documents[0]])
+            first_two = DocumentStore.from_arrays(restored.arrays(2))
+            self.assertEqual(list(first_two), self.documents[:2])
+
+    def test_document_defaults(self):
+        document = Document(title="Untitled", content="text")
+        self.assertTrue(document.id)
+        self.assertNotEqual(document.id, Document(title="Untitled", content="text").id)
+        self.assertFalse(hasattr(document, '__dict__'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,29 @@
+import io
+import json
+import unittest
+from src.utils.helpers import iter_json_records
+
+class TestIterJsonRecords(unittest.TestCase):
+
+    def test_ndjson(self):
+        records = [{"title": f"Doc {i}", "content": "é" * i} for i in range(50)]
+        payload = "\n".join(json.dumps(r, ensure_ascii=False) for r in records).encode('utf-8')
+        # A tiny chunk size splits records and multi-byte characters
+        self.assertEqual(list(iter_json_records(io.BytesIO(payload), chunk_size=7)), records)
+
+    def test_json_array(self):
+        records = [{"title": "A", "content": "a"}, {"title": "B", "content": "b"}, 3]
+        payload = json.dumps(records, indent=2).encode('utf-8')
+        self.assertEqual(list(iter_json_records(io.BytesIO(payload), chunk_size=5)), records)
+
+    def test_empty_payload(self):
+        self.assertEqual(list(iter_json_records(io.BytesIO(b"  \n"))), [])
+
+    def test_malformed_payload(self):
+        with self.assertRaises(ValueError):
+            list(iter_json_records(io.BytesIO(b'{"title": "A"}\n{"title'), chunk_size=4))
+        with self.assertRaises(ValueError):
+            list(iter_json_records(io.BytesIO(b'[{"title": "A"}')))
+
+if __name__ == '__main__':
+    unittest.main()
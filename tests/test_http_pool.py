@@ -0,0 +1,82 @@
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.engine.http_pool import HttpSessionPool
+
+
+class CountingHandler(BaseHTTPRequestHandler):
+    """Keep-alive handler answering 503 to the first `failures` requests"""
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.requests += 1
+            failing = self.server.failures > 0
+            self.server.failures -= failing
+        body = b'{"ok": true}'
+        self.send_response(503 if failing else 200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestHttpSessionPool(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), CountingHandler)
+        self.server.daemon_threads = True
+        self.server.lock = threading.Lock()
+        self.server.connections = self.server.requests = self.server.failures = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/search"
+        self.pool = HttpSessionPool(pool_size=4, retries=2, backoff_factor=0)
+
+    def tearDown(self):
+        self.pool.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_connections_are_reused(self):
+        for _ in range(20):
+            self.assertEqual(self.pool.get(self.url, params={'q': 'graph'}).json(), {"ok": True})
+        self.assertEqual((self.server.connections, self.server.requests), (1, 20))
+        stats = self.pool.stats()[f"http://127.0.0.1:{self.server.server_port}"]
+        self.assertEqual((stats['connections_opened'], stats['requests']), (1, 20))
+
+    def test_sessions_are_shared_per_host(self):
+        other = f"http://localhost:{self.server.server_port}/search"
+        self.assertIs(self.pool.session_for(self.url), self.pool.session_for(self.url + "?q=x"))
+        self.assertIsNot(self.pool.session_for(self.url), self.pool.session_for(other))
+
+    def test_concurrent_requests_share_the_pool(self):
+        def fetch():
+            for _ in range(10):
+                self.pool.get(self.url)
+
+        threads = [threading.Thread(target=fetch) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.server.requests, 40)
+        self.assertLessEqual(self.server.connections, 4)
+
+    def test_unavailable_responses_are_retried(self):
+        self.server.failures = 2
+        self.assertEqual(self.pool.get(self.url).status_code, 200)
+        self.assertEqual(self.server.requests, 3)
+        self.server.failures = 3
+        self.assertEqual(self.pool.get(self.url).status_code, 503)
+
+
+if __name__ == '__main__':
+    unittest.main()
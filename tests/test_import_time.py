@@ -0,0 +1,37 @@
+import os
+import re
+import subprocess
+import sys
+import unittest
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+
+# Cumulative import time allowed for the app module (serverless cold starts)
+IMPORT_TIME_BUDGET_MS = float(os.getenv('IMPORT_TIME_BUDGET_MS', 800))
+
+# Loaded on first use by the engines, never at import time
+HEAVY_MODULES = ['sklearn', 'scipy', 'nltk', 'scholarly', 'wikipedia',
+                 'fake_useragent', 'bs4', 'feedparser']
+
+class TestImportTime(unittest.TestCase):
+
+    def _import_main(self, code):
+        return subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                              cwd=SRC_DIR, capture_output=True, text=True, check=True)
+
+    def test_import_time_budget(self):
+        result = self._import_main("import main")
+        match = re.search(r"^import time:\s+\d+ \|\s+(\d+) \| main$", result.stderr, re.MULTILINE)
+        self.assertIsNotNone(match, result.stderr[-2000:])
+        elapsed_ms = int(match.group(1)) / 1000
+        self.assertLess(elapsed_ms, IMPORT_TIME_BUDGET_MS,
+                        f"Importing main took {elapsed_ms:.0f} ms (budget {IMPORT_TIME_BUDGET_MS:.0f} ms)")
+
+    def test_heavy_modules_are_not_imported(self):
+        result = self._import_main(
+            "import sys, main; print('LOADED:' + ','.join(m for m in %r if m in sys.modules))" % HEAVY_MODULES)
+        loaded = result.stdout.strip().splitlines()[-1]
+        self.assertEqual(loaded, 'LOADED:')
+
+if __name__ == '__main__':
+    unittest.main()
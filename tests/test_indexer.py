@@ -1,5 +1,11 @@
+import os
+import tempfile
+import threading
 import unittest
-from src.engine.indexer import Indexer
+from unittest import mock
+import numpy as np
+from src.engine.dense_index import DenseIndex
+from src.engine.indexer import FieldIndex, Indexer
 from src.models.document import Document
 
 class TestIndexer(unittest.TestCase):
@@ -25,5 +31,376 @@ class TestIndexer(unittest.TestCase):
         self.assertIn(doc1, indexed_docs)
         self.assertIn(doc2, indexed_docs)
 
+    def test_similarities_match_tfidf_cosine(self):
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.metrics.pairwise import cosine_similarity
+
+        contents = [
+            "Neural networks learn layered representations of data.",
+            "Search engines rank documents with inverted indexes.",
+            "Graph neural networks operate on graph structured data.",
+            "Quantum computing uses qubits instead of bits.",
+        ]
+        for i, content in enumerate(contents):
+            self.indexer.index_document(Document(title=f"Doc {i}", content=content, id=str(i)))
+
+        vectorizer = TfidfVectorizer()
+        matrix = vectorizer.fit_transform([self.indexer.preprocess_text(c) for c in contents])
+        query = "graph neural networks"
+        expected = cosine_similarity(
+            vectorizer.transform([self.indexer.preprocess_text(query)]), matrix).flatten()
+
+        results = self.indexer.get_similar_documents(query, top_k=2)
+        self.assertEqual([r['document'].id for r in results], ["2", "0"])
+        for result in results:
+            self.assertAlmostEqual(result['similarity'], expected[int(result['document'].id)])
+
+    def test_query_without_known_terms_returns_nothing(self):
+        self.indexer.index_document(Document(title="Doc", content="Inverted index", id="1"))
+        self.assertEqual(self.indexer.get_similar_documents("zebra"), [])
+
+    def test_rebuild_from_stored_terms(self):
+        for i, content in enumerate(["Cats chase mice", "Dogs chase cats", "Mice eat cheese"]):
+            self.indexer.index_document(Document(title=f"Doc {i}", content=content, id=str(i)))
+        before = self.indexer.get_similar_documents("cats chasing", top_k=3)
+        lemmatized = self.indexer.normalize_token.cache_info().misses
+
+        self.indexer.rebuild()
+
+        after = self.indexer.get_similar_documents("cats chasing", top_k=3)
+        self.assertEqual([(r['document'].id, r['similarity']) for r in after],
+                         [(r['document'].id, r['similarity']) for r in before])
+        # Neither the rebuild nor the repeated query lemmatized anything again
+        self.assertEqual(self.indexer.normalize_token.cache_info().misses, lemmatized)
+
+    def test_max_score_matches_dense_scoring(self):
+        words = ["alpha", "beta", "gamma", "delta", "epsilon", "zeta", "theta", "kappa"]
+        for i in range(200):
+            content = ' '.join(words[j % len(words)] for j in range(i % 7, i % 7 + 1 + i % 5))
+            self.indexer.index_document(Document(title=f"Doc {i}", content=content, id=str(i)))
+
+        for query in ["alpha zeta", "kappa", "beta gamma theta theta"]:
+            self.indexer.DENSE_QUERY_FRACTION = 0.0
+            dense = self.indexer.get_similar_documents(query, top_k=7)
+            self.indexer.DENSE_QUERY_FRACTION = float('inf')
+            pruned = self.indexer.get_similar_documents(query, top_k=7)
+            self.assertEqual([r['document'].id for r in pruned], [r['document'].id for r in dense])
+            for a, b in zip(pruned, dense):
+                self.assertAlmostEqual(a['similarity'], b['similarity'])
+
+    def test_bm25_rankers(self):
+        self.indexer.index_document(Document(title="Protein folding", content="Structure prediction methods", id="1"))
+        self.indexer.index_document(Document(title="Methods survey", content="Protein protein interaction data", id="2"))
+        self.indexer.index_document(Document(title="Climate", content="Ocean temperature records", id="3"))
+
+        bm25 = self.indexer.get_similar_documents("protein", top_k=3, ranker='bm25')
+        self.assertEqual([r['document'].id for r in bm25], ["2"])
+        # BM25F also sees the title field, where document 1 matches
+        bm25f = self.indexer.get_similar_documents("protein", top_k=3, ranker='bm25f')
+        self.assertEqual(sorted(r['document'].id for r in bm25f), ["1", "2"])
+        self.assertTrue(all(r['similarity'] > 0 for r in bm25f))
+
+        with self.assertRaises(ValueError):
+            self.indexer.get_similar_documents("protein", ranker='pagerank')
+
+    def test_bm25_idf_counts_content_only(self):
+        for i in range(20):
+            self.indexer.index_document(Document(title=f"Protein {i}", content=f"Unrelated text {i}", id=str(i)))
+        self.indexer.index_document(Document(title="Survey", content="Protein folding", id="content"))
+        snapshot = self.indexer.snapshot
+        term_id = snapshot.vocabulary['protein']
+        # One content document out of 21, although 21 documents mention it
+        idf = self.indexer._bm25_idf(snapshot, 'bm25', [term_id])[0]
+        self.assertAlmostEqual(idf, np.log(1 + 20.5 / 1.5))
+        self.assertAlmostEqual(self.indexer._bm25_idf(snapshot, 'bm25f', [term_id])[0], np.log(1 + 0.5 / 21.5))
+        results = self.indexer.get_similar_documents("protein", ranker='bm25')
+        batch, = self.indexer.get_similar_documents_many(["protein"], ranker='bm25')
+        self.assertEqual([r['document'].id for r in results], ["content"])
+        self.assertAlmostEqual(results[0]['similarity'], batch[0]['similarity'])
+        self.assertGreater(results[0]['similarity'], 2)
+
+    def test_batch_queries_match_single_queries(self):
+        words = ["alpha", "beta", "gamma", "delta", "epsilon", "zeta", "theta", "kappa"]
+        for i in range(120):
+            content = ' '.join(words[j % len(words)] for j in range(i % 7, i % 7 + 1 + i % 5))
+            self.indexer.index_document(Document(title=words[i % 8], content=content, id=str(i)))
+        # Compare dense queries against a fitted index rather than the TF-IDF fallback
+        self.indexer.build_dense_index()
+
+        queries = ["alpha zeta", "kappa", "beta gamma theta theta", "unknown", ""]
+        self.indexer.BATCH_QUERY_ROWS = 2
+        for ranker in Indexer.RANKERS:
+            batches = self.indexer.get_similar_documents_many(queries, top_k=6, ranker=ranker)
+            self.assertEqual(len(batches), len(queries))
+            for query, batch in zip(queries, batches):
+                single = self.indexer.get_similar_documents(query, top_k=6, ranker=ranker)
+                self.assertEqual([r['document'].id for r in batch], [r['document'].id for r in single])
+                for a, b in zip(batch, single):
+                    self.assertAlmostEqual(a['similarity'], b['similarity'])
+
+    def test_dense_ranker(self):
+        topics = ["neural network training gradient", "protein folding structure enzyme",
+                  "ocean climate temperature warming"]
+        for i in range(30):
+            self.indexer.index_document(Document(title=f"Doc {i}", content=topics[i % 3], id=str(i)))
+
+        # The first dense query starts the fit and is ranked by TF-IDF meanwhile
+        self.assertEqual(self.indexer.get_similar_documents("protein enzyme", top_k=5, ranker='dense'),
+                         self.indexer.get_similar_documents("protein enzyme", top_k=5, ranker='tfidf'))
+        self.indexer.build_dense_index()
+        results = self.indexer.get_similar_documents("protein enzyme", top_k=5, ranker='dense')
+        self.assertEqual(len(results), 5)
+        self.assertTrue(all(int(r['document'].id) % 3 == 1 for r in results))
+        self.assertEqual(self.indexer.get_similar_documents("unknownword", ranker='dense'), [])
+
+        # Documents added after fitting are folded in and searchable
+        self.indexer.index_document(Document(title="New", content="ocean warming temperature", id="new"))
+        self.indexer.build_dense_index()
+        results = self.indexer.get_similar_documents("ocean warming", top_k=40, ranker='dense')
+        self.assertIn("new", [r['document'].id for r in results])
+        self.assertEqual(len(self.indexer.dense_index()), 31)
+
+        with tempfile.TemporaryDirectory() as directory:
+            self.indexer.save(directory)
+            restored = Indexer()
+            restored.load(directory)
+            self.assertIsNotNone(restored._dense)
+            self.assertEqual(
+                [r['document'].id for r in restored.get_similar_documents("protein", top_k=3, ranker='dense')],
+                [r['document'].id for r in self.indexer.get_similar_documents("protein", top_k=3, ranker='dense')])
+
+    def test_dense_fold_in_across_merged_segments(self):
+        topics = ["neural network training gradient", "protein folding structure enzyme",
+                  "ocean climate temperature warming"]
+
+        def add(first, last):
+            self.indexer.index_documents([Document(title=f"Doc {i}", content=topics[i % 3] + f" word{i}", id=str(i))
+                                          for i in range(first, last)])
+
+        add(0, 40)
+        add(40, 42)
+        self.assertEqual(len(self.indexer.build_dense_index()), 42)
+        add(42, 45)
+        add(45, 46)
+        # Row 42 now falls inside a segment that is not the last one
+        self.assertEqual([segment.n_docs for segment in self.indexer.snapshot.fields['content'].segments],
+                         [40, 5, 1])
+        snapshot = self.indexer.snapshot
+        dense = self.indexer.build_dense_index(snapshot)
+        expected = DenseIndex._project(self.indexer._tfidf_rows(snapshot, 0)[42:], dense.components)
+        np.testing.assert_allclose(dense.vectors[42:], expected, atol=1e-6)
+
+    def test_dense_search_on_a_snapshot_older_than_the_fit(self):
+        topics = ["neural network training gradient", "protein folding structure enzyme",
+                  "ocean climate temperature warming"]
+        for i in range(30):
+            self.indexer.index_document(Document(title=f"Doc {i}", content=topics[i % 3], id=str(i)))
+        older = self.indexer.snapshot
+        self.indexer.index_document(Document(title="New", content="protein crystallography novelterm", id="new"))
+        dense = self.indexer.build_dense_index()
+        self.assertGreater(dense.components.shape[1], older.n_terms)
+
+        # A query that read its snapshot before the writes
+        results = self.indexer._dense_search(older, dense, [older.vocabulary['protein']], [1], 5)
+        self.assertEqual(len(results), 5)
+        self.assertTrue(all(int(r['document'].id) % 3 == 1 for r in results))
+
+    def test_update_and_delete(self):
+        self.indexer.COMPACTION_THRESHOLD = float('inf')
+        for i, content in enumerate(["Cats chase mice", "Dogs chase cats", "Mice eat cheese"]):
+            self.indexer.index_document(Document(title=f"Doc {i}", content=content, id=str(i)))
+
+        self.assertTrue(self.indexer.delete_document("1"))
+        self.assertFalse(self.indexer.delete_document("1"))
+        self.assertEqual(len(self.indexer), 2)
+        self.assertEqual(self.indexer.row_count(), 3)
+        self.assertNotIn("1", [doc.id for doc in self.indexer.get_index()])
+        for ranker in Indexer.RANKERS:
+            results = self.indexer.get_similar_documents("dogs chase cats", top_k=3, ranker=ranker)
+            self.assertNotIn("1", [r['document'].id for r in results])
+
+        self.assertTrue(self.indexer.update_document(Document(title="Doc 0", content="Birds sing", id="0")))
+        self.assertFalse(self.indexer.update_document(Document(title="Doc 1", content="Dogs bark", id="1")))
+        self.assertEqual(len(self.indexer), 3)
+        self.assertEqual([r['document'].id for r in self.indexer.get_similar_documents("cats")], [])
+        self.assertEqual([r['document'].id for r in self.indexer.get_similar_documents("birds")], ["0"])
+
+    def test_compaction_matches_fresh_index(self):
+        self.indexer.COMPACTION_THRESHOLD = float('inf')
+        words = ["alpha", "beta", "gamma", "delta", "epsilon", "zeta", "theta", "kappa"]
+        for i in range(200):
+            content = ' '.join(words[j % len(words)] for j in range(i % 7, i % 7 + 1 + i % 5))
+            self.indexer.index_document(Document(title=words[i % 8], content=content, id=str(i)))
+        self.indexer.build_dense_index()
+        for i in range(0, 200, 3):
+            self.indexer.delete_document(str(i))
+        for i in range(1, 40, 3):
+            self.indexer.update_document(Document(title="omega", content="alpha beta omega", id=str(i)))
+
+        queries = ["alpha zeta", "kappa", "beta gamma theta theta", "omega"]
+        # MaxScore pruning stays exact while deleted rows are still indexed
+        for query in queries:
+            self.indexer.DENSE_QUERY_FRACTION = 0.0
+            dense = self.indexer.get_similar_documents(query, top_k=7)
+            self.indexer.DENSE_QUERY_FRACTION = float('inf')
+            pruned = self.indexer.get_similar_documents(query, top_k=7)
+            self.assertEqual([r['document'].id for r in pruned], [r['document'].id for r in dense])
+
+        live = self.indexer.get_index()
+        removed = self.indexer.compact()
+        self.assertEqual(removed, 67 + 13)
+        self.assertEqual((len(self.indexer), self.indexer.row_count()), (len(live), len(live)))
+        self.assertEqual(self.indexer.get_index(), live)
+        self.assertEqual(len(self.indexer.build_dense_index()), len(live))
+
+        fresh = Indexer()
+        fresh.index_documents(live)
+        for ranker in ('tfidf', 'bm25', 'bm25f'):
+            for query in queries:
+                expected = fresh.get_similar_documents(query, top_k=7, ranker=ranker)
+                results = self.indexer.get_similar_documents(query, top_k=7, ranker=ranker)
+                self.assertEqual([r['document'].id for r in results], [r['document'].id for r in expected])
+                for a, b in zip(results, expected):
+                    self.assertAlmostEqual(a['similarity'], b['similarity'])
+
+    def test_background_compaction(self):
+        self.indexer.COMPACTION_THRESHOLD = 0.5
+        for i in range(10):
+            self.indexer.index_document(Document(title=f"Doc {i}", content=f"shared term{i}", id=str(i)))
+        for i in range(6):
+            self.indexer.delete_document(str(i))
+        for thread in threading.enumerate():
+            if thread.name == 'index-compaction':
+                thread.join()
+        self.assertEqual((self.indexer.row_count(), self.indexer.n_deleted), (4, 0))
+        self.assertEqual(sorted(r['document'].id for r in self.indexer.get_similar_documents("shared", top_k=10)),
+                         ["6", "7", "8", "9"])
+
+    def test_writes_during_compaction_are_replayed(self):
+        self.indexer.COMPACTION_THRESHOLD = float('inf')
+        for first, last in ((0, 16), (16, 19)):
+            self.indexer.index_documents([Document(title=f"Doc {i}", content=f"shared term{i}", id=str(i))
+                                          for i in range(first, last)])
+        self.indexer.delete_document("0")
+        compacted = FieldIndex.compacted
+        written = []
+
+        def write_meanwhile(field, live):
+            # Runs after compact() captured the snapshot, before it publishes
+            if not written:
+                written.append(True)
+                self.indexer.update_document(Document(title="Doc 5", content="replaced five", id="5"))
+                self.indexer.index_document(Document(title="New", content="newdoc arrives", id="new"))
+                # The captured rows now end inside a segment that is not the last
+                self.assertEqual([segment.n_docs for segment in field.segments], [16, 3])
+                self.assertEqual([segment.n_docs for segment in self.indexer.snapshot.fields['content'].segments],
+                                 [16, 4, 1])
+            return compacted(field, live)
+
+        with mock.patch.object(FieldIndex, 'compacted', write_meanwhile):
+            self.indexer.compact()
+        for query, expected in (("newdoc", ["new"]), ("replaced", ["5"]), ("term5", []), ("term7", ["7"])):
+            self.assertEqual([r['document'].id for r in self.indexer.get_similar_documents(query, top_k=5)],
+                             expected)
+
+    def test_published_snapshots_are_immutable(self):
+        self.indexer.COMPACTION_THRESHOLD = float('inf')
+        for i, content in enumerate(["Cats chase mice", "Dogs chase cats"]):
+            self.indexer.index_document(Document(title=f"Doc {i}", content=content, id=str(i)))
+        snapshot = self.indexer.snapshot
+        postings = [docs.tolist() for docs, _ in snapshot.fields['content'].posting_parts(snapshot.vocabulary['cat'])]
+
+        self.indexer.index_document(Document(title="Doc 2", content="Cats nap", id="2"))
+        self.indexer.delete_document("0")
+        self.assertEqual((snapshot.n_docs, snapshot.n_deleted), (2, 0))
+        self.assertFalse(snapshot.deleted_rows().any())
+        self.assertEqual([docs.tolist() for docs, _ in snapshot.fields['content'].posting_parts(
+            snapshot.vocabulary['cat'])], postings)
+        self.assertGreater(self.indexer.generation, snapshot.generation)
+
+    def test_small_writes_share_index_state(self):
+        self.indexer.COMPACTION_THRESHOLD = float('inf')
+        self.indexer.index_documents([Document(title=f"Doc {i}", content=f"shared term{i} word{i % 7}", id=str(i))
+                                      for i in range(500)])
+        before = self.indexer.snapshot
+        self.indexer.index_document(Document(title="Late", content="shared novel", id="late"))
+        after = self.indexer.snapshot
+        # The new segment only holds the new document's terms, and per-row
+        # buffers are extended in place
+        self.assertEqual(len(after.fields['content'].segments[-1].post_terms), 2)
+        self.assertIs(after.fields['content']._lengths, before.fields['content']._lengths)
+        self.assertIs(after.deleted_at, before.deleted_at)
+        self.assertEqual(after.doc_freq_any[after.vocabulary['shared']], 501)
+        self.assertEqual(before.doc_freq_any[before.vocabulary['shared']], 500)
+
+        self.indexer.delete_document("3")
+        self.assertIs(self.indexer.snapshot.deleted_at, after.deleted_at)
+        self.assertEqual(self.indexer.snapshot.deleted_rows().nonzero()[0].tolist(), [3])
+        self.assertFalse(after.deleted_rows().any())
+        self.assertEqual(len(self.indexer.fields['content']), 501)
+
+    def test_queries_run_during_writes(self):
+        errors = []
+        done = threading.Event()
+
+        def search():
+            while not done.is_set():
+                try:
+                    for ranker in ('tfidf', 'bm25f'):
+                        for result in self.indexer.get_similar_documents("alpha beta", top_k=5, ranker=ranker):
+                            result['document'].id
+                    self.indexer.get_similar_documents_many(["gamma", "alpha"], top_k=3)
+                except Exception as e:
+                    errors.append(e)
+                    return
+
+        readers = [threading.Thread(target=search) for _ in range(2)]
+        for reader in readers:
+            reader.start()
+        words = ["alpha", "beta", "gamma", "delta"]
+        for i in range(300):
+            self.indexer.index_document(Document(title=words[i % 4], content=f"{words[i % 3]} {words[i % 4]}",
+                                                 id=str(i)))
+            if i % 4 == 0:
+                self.indexer.delete_document(str(i // 2))
+        done.set()
+        for reader in readers:
+            reader.join()
+        self.assertEqual(errors, [])
+
+    def test_nltk_data_loads_lazily_and_offline(self):
+        indexer = Indexer()
+        self.assertIsNone(indexer._stop_words)
+        self.assertIsNone(indexer._lemmatizer)
+
+        environ = {k: v for k, v in os.environ.items() if k != 'NLTK_AUTO_DOWNLOAD'}
+        with mock.patch.dict(os.environ, environ, clear=True), \
+                mock.patch('nltk.data.find', side_effect=LookupError), \
+                mock.patch('nltk.download') as download:
+            # Missing corpora fall back to built-ins instead of downloading
+            self.assertEqual(indexer.tokenize("The cats"), ["cats"])
+            # The built-in list is NLTK's, which keeps content words like these
+            self.assertEqual(indexer.tokenize("a computer system"), ["computer", "system"])
+        download.assert_not_called()
+
+    def test_snapshot_round_trip(self):
+        for i, content in enumerate(["Cats chase mice", "Dogs chase cats", "Mice eat cheese"]):
+            self.indexer.index_document(Document(title=f"Doc {i}", content=content, id=str(i)))
+        expected = [(r['document'].id, r['similarity'])
+                    for r in self.indexer.get_similar_documents("cats chasing", top_k=3)]
+
+        with tempfile.TemporaryDirectory() as directory:
+            manifest = self.indexer.save(directory)
+            self.assertEqual(manifest['documents'], 3)
+
+            restored = Indexer()
+            restored.load(directory)
+            results = restored.get_similar_documents("cats chasing", top_k=3)
+            self.assertEqual([(r['document'].id, r['similarity']) for r in results], expected)
+
+            # The restored index keeps accepting documents on top of the snapshot
+            restored.index_document(Document(title="Doc 3", content="Cats nap", id="3"))
+            self.assertIn("3", [r['document'].id for r in restored.get_similar_documents("cats")])
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,66 @@
+import threading
+import time
+import unittest
+from src.engine.indexer import Indexer
+from src.engine.indexing_queue import IndexingQueue, QueueFull
+from src.models.document import Document
+
+
+class GatedIndexer(Indexer):
+    """Indexer whose batches wait for a gate, recording their sizes"""
+
+    def __init__(self):
+        super().__init__()
+        self.gate = threading.Event()
+        self.batch_sizes = []
+
+    def index_documents(self, documents):
+        self.gate.wait()
+        self.batch_sizes.append(len(documents))
+        super().index_documents(documents)
+
+
+class TestIndexingQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.indexer = GatedIndexer()
+        self.queue = IndexingQueue(self.indexer, max_batch=50, max_pending=200)
+
+    def tearDown(self):
+        self.indexer.gate.set()
+        self.queue.close()
+
+    def _put_held_document(self):
+        # The worker picks this document up and holds it until the gate opens
+        self.queue.put(Document(id="first", title="First", content="Graph search"))
+        while not self.queue.stats()['in_flight']:
+            time.sleep(0.001)
+
+    def test_documents_become_searchable_after_flush(self):
+        self.indexer.gate.set()
+        self.queue.put(Document(id="1", title="Queued", content="Protein folding dynamics"))
+        self.assertTrue(self.queue.flush(timeout=10))
+        self.assertEqual([r['document'].id for r in self.indexer.get_similar_documents("protein")], ["1"])
+        stats = self.queue.stats()
+        self.assertEqual((stats['queued'], stats['indexed'], stats['queue_depth']), (1, 1, 0))
+
+    def test_bursts_are_coalesced_into_batches(self):
+        self._put_held_document()
+        self.queue.put_many(Document(id=str(i), title=f"Doc {i}", content="Graph search") for i in range(120))
+        self.assertEqual(len(self.queue), 121)
+        self.indexer.gate.set()
+        self.assertTrue(self.queue.flush(timeout=10))
+        self.assertEqual(self.indexer.batch_sizes, [1, 50, 50, 20])
+        self.assertEqual(len(self.indexer), 121)
+
+    def test_backlog_is_bounded(self):
+        self._put_held_document()
+        self.queue.put_many(Document(id=str(i), title="Doc", content="Text") for i in range(200))
+        with self.assertRaises(QueueFull):
+            self.queue.put(Document(id="overflow", title="Doc", content="Text"))
+        self.assertFalse(self.queue.flush(timeout=0.05))
+        self.assertGreater(self.queue.stats()['oldest_pending_seconds'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
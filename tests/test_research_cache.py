@@ -0,0 +1,110 @@
+import os
+import tempfile
+import unittest
+from src.engine.research_cache import ResearchCache
+
+PAPERS = [{"title": "Graph Neural Networks", "authors": "Ada Lovelace", "citations": 12}]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestResearchCache(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = Clock()
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'research.sqlite3')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def cache(self, **kwargs):
+        cache = ResearchCache(clock=self.clock, ttls={'scholar': 100, 'wikipedia': 10}, max_stale=50, **kwargs)
+        self.addCleanup(cache.close)
+        return cache
+
+    def test_keyed_by_source_normalized_query_and_max(self):
+        cache = self.cache()
+        cache.put('scholar', "Graph  Neural networks", 10, PAPERS)
+        self.assertEqual(cache.get('scholar', " graph neural NETWORKS ", 10), (PAPERS, True))
+        self.assertIsNone(cache.get('scholar', "graph neural networks", 5))
+        self.assertIsNone(cache.get('wikipedia', "graph neural networks", 10))
+
+    def test_served_papers_are_copies(self):
+        cache = self.cache()
+        cache.put('scholar', "graph", 10, PAPERS)
+        papers, _ = cache.get('scholar', "graph", 10)
+        papers[0]['source_type'] = 'scholar'
+        self.assertNotIn('source_type', cache.get('scholar', "graph", 10)[0][0])
+
+    def test_fresh_then_stale_then_expired_per_source(self):
+        cache = self.cache()
+        cache.put('scholar', "graph", 10, PAPERS)
+        cache.put('wikipedia', "graph", 10, PAPERS)
+        self.clock.now += 20
+        self.assertTrue(cache.get('scholar', "graph", 10)[1])
+        self.assertFalse(cache.get('wikipedia', "graph", 10)[1])
+        self.clock.now += 50
+        self.assertIsNone(cache.get('wikipedia', "graph", 10))
+        self.assertTrue(cache.get('scholar', "graph", 10)[1])
+        self.clock.now += 60
+        self.assertFalse(cache.get('scholar', "graph", 10)[1])
+        self.clock.now += 30
+        self.assertIsNone(cache.get('scholar', "graph", 10))
+
+    def test_memory_tier_is_lru(self):
+        cache = self.cache(maxsize=2)
+        for query in ("a", "b", "c"):
+            cache.put('scholar', query, 10, PAPERS)
+        self.assertIsNone(cache.get('scholar', "a", 10))
+        self.assertEqual(cache.stats()['memory'], {'size': 2, 'maxsize': 2, 'hits': 0, 'evictions': 1})
+
+    def test_sqlite_tier_is_shared(self):
+        # Two caches on one file, as in two worker processes
+        first, second = self.cache(path=self.path), self.cache(path=self.path)
+        first.put('scholar', "graph", 10, PAPERS)
+        self.clock.now += 30
+        self.assertEqual(second.get('scholar', "graph", 10), (PAPERS, True))
+        second.get('scholar', "graph", 10)
+        stats = second.stats()
+        self.assertEqual((stats['disk']['hits'], stats['memory']['hits']), (1, 1))
+        # Served from the memory tier with its original timestamp
+        self.assertEqual(stats['sources']['scholar']['mean_hit_age'], 30)
+
+        # Evicted from memory, still on disk
+        small = self.cache(path=self.path, maxsize=0)
+        self.assertEqual(small.get('scholar', "graph", 10), (PAPERS, True))
+
+    def test_prune_drops_rows_too_old_to_serve(self):
+        cache = self.cache(path=self.path)
+        cache.PRUNE_INTERVAL = 2
+        cache.put('wikipedia', "old", 10, PAPERS)
+        self.clock.now += 61
+        cache.put('scholar', "new", 10, PAPERS)
+        self.assertEqual(cache.stats()['disk']['entries'], 1)
+
+    def test_stats(self):
+        cache = self.cache()
+        cache.put('scholar', "graph", 10, PAPERS)
+        self.clock.now += 120
+        cache.put('scholar', "trees", 10, PAPERS)
+        cache.get('scholar', "graph", 10)
+        cache.get('scholar', "trees", 10)
+        cache.get('scholar', "forests", 10)
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['stale_hits'], stats['misses'], stats['hit_rate']),
+                         (1, 1, 1, 0.6667))
+        self.assertEqual(stats['sources']['scholar']['entries'], 2)
+        self.assertEqual(stats['sources']['scholar']['oldest_entry_age'], 120)
+        self.assertEqual(stats['sources']['scholar']['mean_entry_age'], 60)
+        self.assertEqual(stats['sources']['scholar']['mean_hit_age'], 60)
+
+
+if __name__ == '__main__':
+    unittest.main()
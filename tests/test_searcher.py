@@ -1,6 +1,6 @@
 import unittest
 from src.engine.searcher import Searcher
-from src.engine.indexer import Indexer
+from src.engine.indexer import Indexer, RowsRenumbered
 from src.models.document import Document
 
 class TestSearcher(unittest.TestCase):
@@ -27,5 +27,84 @@ class TestSearcher(unittest.TestCase):
         results = self.searcher.get_results()
         self.assertEqual(len(results), 2)
 
+    def test_fuse_uses_reciprocal_ranks(self):
+        docs = [Document(title=f"Doc {i}", content="text", id=str(i)) for i in range(4)]
+        lexical = [{'document': docs[0], 'similarity': 9.0}, {'document': docs[1], 'similarity': 5.0}]
+        dense = [{'document': docs[1], 'similarity': 0.9}, {'document': docs[2], 'similarity': 0.8},
+                 {'document': docs[3], 'similarity': 0.1}]
+        fused = Searcher.fuse([lexical, dense], top_k=3)
+        # Doc 1 is ranked by both retrievers; doc 0 wins the tie with doc 2
+        self.assertEqual([r['document'].id for r in fused], ["1", "0", "2"])
+        self.assertAlmostEqual(fused[0]['similarity'], 1 / 62 + 1 / 61)
+
+    def test_hybrid_search(self):
+        self.indexer.index_document(Document(title="Third Document", content="Completely unrelated words here."))
+        results = self.searcher.search("content document", top_k=2, ranker='hybrid')
+        self.assertEqual(len(results), 2)
+        self.assertEqual(self.searcher.search_many(["content document"], top_k=2, ranker='hybrid'), [results])
+
+    def test_result_cache(self):
+        first = self.searcher.search("document content")
+        self.assertEqual(self.searcher.search("content  Document"), first)  # same tokens, any order
+        stats = self.searcher.cache_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+        # Indexing bumps the generation, so the cached entry is not served
+        self.indexer.index_document(Document(title="Third Document", content="More content here"))
+        self.assertEqual(len(self.searcher.search("document content")), 3)
+        stats = self.searcher.cache_stats()
+        self.assertEqual((stats['misses'], stats['invalidations']), (2, 1))
+
+        self.searcher.search_many(["document content", "first"])
+        self.assertEqual(self.searcher.cache_stats()['hits'], 2)
+
+    def test_corrections_are_cached_with_results(self):
+        calls = []
+        spelling_corrections = self.indexer.spelling_corrections
+        self.indexer.spelling_corrections = lambda query: calls.append(query) or spelling_corrections(query)
+        self.searcher.search_many(["documnet"])
+        for _ in range(2):
+            results, corrections = self.searcher.search_with_corrections("documnet")
+            self.assertEqual(corrections, {"documnet": "document"})
+            self.assertTrue(results)
+        self.assertEqual(calls, ["documnet"])
+        self.assertEqual(self.searcher.cache_stats()['hits'], 2)
+
+    def test_result_cache_evicts_least_recently_used(self):
+        searcher = Searcher(self.indexer, cache_size=2)
+        for query in ["first", "second", "first", "content"]:
+            searcher.search(query)
+        stats = searcher.cache_stats()
+        self.assertEqual((stats['size'], stats['evictions'], stats['hits']), (2, 1, 1))
+        searcher.search("first")  # survived: it was used more recently than "second"
+        self.assertEqual(searcher.cache_stats()['hits'], 2)
+
+    def test_iter_documents_pages_and_selects_fields(self):
+        for i in range(5):
+            self.indexer.index_document(Document(title=f"Extra {i}", content="text", id=f"extra-{i}"))
+        self.searcher.DOCUMENTS_CHUNK = 2
+        page = list(self.searcher.iter_documents(start=3, limit=3, fields=['id', 'title']))
+        self.assertEqual(page, [{'id': f"extra-{i}", 'title': f"Extra {i}"} for i in range(1, 4)])
+        self.assertEqual(len(list(self.searcher.iter_documents(start=5))), 2)
+        self.assertEqual(self.searcher.get_results()[0]['title'], "First Document")
+
+    def test_iter_documents_rejects_positions_from_before_compaction(self):
+        self.indexer.COMPACTION_THRESHOLD = float('inf')
+        for i in range(4):
+            self.indexer.index_document(Document(title=f"Extra {i}", content="text", id=f"extra-{i}"))
+        epoch = self.indexer.row_epoch()
+        page = [document['id'] for document in self.searcher.iter_documents(3, 2, ['id'], epoch=epoch)]
+        self.assertEqual(page, ["extra-1", "extra-2"])
+
+        self.indexer.delete_document("extra-0")
+        self.assertEqual(self.indexer.row_epoch(), epoch)  # deletes keep rows
+        self.indexer.compact()
+        self.assertNotEqual(self.indexer.row_epoch(), epoch)
+        with self.assertRaises(RowsRenumbered):
+            list(self.searcher.iter_documents(3, 2, ['id'], epoch=epoch))
+        page = [document['id'] for document in self.searcher.iter_documents(2, 2, ['id'],
+                                                                             epoch=self.indexer.row_epoch())]
+        self.assertEqual(page, ["extra-1", "extra-2"])
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
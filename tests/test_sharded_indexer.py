@@ -0,0 +1,109 @@
+import tempfile
+import unittest
+from src.engine.indexer import Indexer
+from src.engine.searcher import Searcher
+from src.engine.sharded_indexer import ShardedIndexer
+from src.models.document import Document
+
+TOPICS = ["neural network training", "protein folding structure", "graph search algorithm",
+          "quantum error correction", "climate model simulation"]
+
+
+class TestShardedIndexer(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.documents = [
+            Document(id=f"doc-{i}", title=f"{TOPICS[i % 5]} study {i}",
+                     content=f"{TOPICS[i % 5]} {TOPICS[(i * 3) % 5]} results {i}")
+            for i in range(60)
+        ]
+        cls.sharded = ShardedIndexer(3)
+        cls.sharded.index_documents(cls.documents)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.sharded.close()
+
+    def test_documents_are_partitioned_by_id(self):
+        self.assertEqual(len(self.sharded), len(self.documents))
+        self.assertCountEqual([doc.id for doc in self.sharded.get_index()],
+                              [doc.id for doc in self.documents])
+        self.assertEqual(self.sharded.shard_for("doc-7"), self.sharded.shard_for("doc-7"))
+
+    def test_document_pages_span_shards(self):
+        everything = self.sharded.document_dicts(0, len(self.documents), ['id'])
+        self.assertCountEqual([d['id'] for d in everything], [doc.id for doc in self.documents])
+        page = Searcher(self.sharded).iter_documents(start=15, limit=30, fields=['id'])
+        self.assertEqual(list(page), everything[15:45])
+
+    def test_merged_results_match_local_shards(self):
+        # Reference: the same partitions indexed in-process, merged by score
+        local = [Indexer() for _ in range(3)]
+        for doc in self.documents:
+            local[self.sharded.shard_for(doc.id)].index_document(doc)
+        # Fit the dense indexes up front rather than racing their background builds
+        for indexer in local:
+            indexer.build_dense_index()
+        self.sharded._broadcast('build_dense_index')
+        searcher = Searcher(self.sharded)
+        for ranker in Indexer.RANKERS:
+            for query in ["neural training", "quantum folding", "graph"]:
+                partials = [indexer.get_similar_documents(query, 7, ranker=ranker) for indexer in local]
+                expected = sorted((r for p in partials for r in p), key=lambda r: -r['similarity'])[:7]
+                results = searcher.search(query, top_k=7, ranker=ranker)
+                self.assertEqual([r['similarity_score'] for r in results],
+                                 [r['similarity'] for r in expected])
+                self.assertEqual(len(results), 7)
+
+    def test_search_many_matches_search(self):
+        searcher = Searcher(self.sharded)
+        queries = ["neural training", "quantum folding", "nothing here"]
+        batches = searcher.search_many(queries, top_k=4, ranker='bm25')
+        self.assertEqual(len(batches), len(queries))
+        for query, batch in zip(queries, batches):
+            single = searcher.search(query, top_k=4, ranker='bm25')
+            self.assertEqual([r['id'] for r in batch], [r['id'] for r in single])
+            for a, b in zip(batch, single):
+                self.assertAlmostEqual(a['similarity_score'], b['similarity_score'])
+
+    def test_merge_top_k(self):
+        partials = [[{'similarity': 0.9}, {'similarity': 0.2}],
+                    [{'similarity': 0.5}, {'similarity': 0.4}], []]
+        merged = Searcher.merge_top_k(partials, 3)
+        self.assertEqual([r['similarity'] for r in merged], [0.9, 0.5, 0.4])
+
+    def test_errors_propagate_from_shards(self):
+        with self.assertRaises(ValueError):
+            self.sharded.search_shards("graph", ranker="unknown")
+        with self.assertRaises(FileNotFoundError):
+            self.sharded.load(tempfile.mkdtemp())
+        # Shards stay usable after a failed call
+        self.assertEqual(len(self.sharded), len(self.documents))
+
+    def test_update_and_delete_route_to_owning_shard(self):
+        extra = Document(id="extra", title="solar wind", content="solar wind plasma")
+        self.assertFalse(self.sharded.update_document(extra))
+        self.assertEqual([r['id'] for r in Searcher(self.sharded).search("plasma")], ["extra"])
+        self.assertTrue(self.sharded.delete_document("extra"))
+        self.assertFalse(self.sharded.delete_document("extra"))
+        self.assertEqual(Searcher(self.sharded).search("plasma"), [])
+        self.assertEqual(len(self.sharded), len(self.documents))
+
+    def test_snapshot_round_trip(self):
+        directory = tempfile.mkdtemp()
+        self.assertFalse(ShardedIndexer.has_snapshot(directory))
+        self.sharded.save(directory)
+        self.assertTrue(ShardedIndexer.has_snapshot(directory))
+        restored = ShardedIndexer(3)
+        try:
+            manifest = restored.load(directory)
+            self.assertEqual(manifest['documents'], len(self.documents))
+            self.assertEqual(Searcher(restored).search("climate model"),
+                             Searcher(self.sharded).search("climate model"))
+        finally:
+            restored.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
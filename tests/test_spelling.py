@@ -0,0 +1,71 @@
+import unittest
+import numpy as np
+from src.engine.indexer import Indexer
+from src.engine.spelling import SpellingIndex, edit_distance
+from src.models.document import Document
+
+
+class TestSpellingIndex(unittest.TestCase):
+
+    def test_edit_distance(self):
+        self.assertEqual(edit_distance("network", "network", 2), 0)
+        self.assertEqual(edit_distance("netwrok", "network", 2), 1)
+        self.assertEqual(edit_distance("ntwrk", "network", 2), 2)
+        self.assertEqual(edit_distance("kitten", "sitting", 2), 3)
+        self.assertEqual(edit_distance("graph", "graphics", 2), 3)
+
+    def test_correct_prefers_closest_then_most_frequent(self):
+        terms = ["protein", "proteome", "protean", "graph"]
+        index = SpellingIndex()
+        index.sync(terms, len(terms))
+        frequencies = np.array([10, 50, 1, 5])
+        self.assertEqual(index.correct("protien", len(terms), frequencies), 0)
+        self.assertEqual(index.correct("proteone", len(terms), frequencies), 1)
+        self.assertIsNone(index.correct("quantum", len(terms), frequencies))
+        # Terms outside the first n_terms or without documents are skipped
+        self.assertEqual(index.correct("protien", 4, np.array([0, 50, 1, 5])), 2)
+        self.assertIsNone(index.correct("grap", 3, frequencies))
+
+    def test_sync_is_incremental(self):
+        terms = ["graph"]
+        index = SpellingIndex()
+        index.sync(terms, 1)
+        terms.append("quantum")
+        self.assertIsNone(index.correct("quantm", 2, np.ones(2)))
+        index.sync(terms, 2)
+        self.assertEqual(len(index), 2)
+        self.assertEqual(index.correct("quantm", 2, np.ones(2)), 1)
+
+
+class TestQuerySpellingCorrection(unittest.TestCase):
+
+    def setUp(self):
+        self.indexer = Indexer()
+        self.indexer.index_documents([
+            Document(id="1", title="Protein folding", content="Protein structure prediction"),
+            Document(id="2", title="Graph networks", content="Message passing on graphs")
+        ])
+
+    def test_misspelled_terms_are_corrected(self):
+        for ranker in Indexer.RANKERS:
+            results = self.indexer.get_similar_documents("protien folding", ranker=ranker)
+            self.assertEqual(results[0]['document'].id, "1", ranker)
+        self.assertEqual(self.indexer.spelling_corrections("protien strucutre graph"),
+                         {"protien": "protein", "strucutre": "structure"})
+        many = self.indexer.get_similar_documents_many(["mesage pasing"])
+        self.assertEqual(many[0][0]['document'].id, "2")
+
+    def test_correction_can_be_disabled(self):
+        indexer = Indexer(spelling_correction=False)
+        indexer.index_document(Document(id="1", title="Protein folding", content="Protein structure"))
+        self.assertEqual(indexer.get_similar_documents("protien"), [])
+        self.assertEqual(indexer.spelling_corrections("protien"), {})
+
+    def test_new_vocabulary_is_correctable(self):
+        self.assertEqual(self.indexer.get_similar_documents("quantom"), [])
+        self.indexer.index_document(Document(id="3", title="Quantum computing", content="Quantum error correction"))
+        self.assertEqual(self.indexer.get_similar_documents("quantom")[0]['document'].id, "3")
+
+
+if __name__ == '__main__':
+    unittest.main()
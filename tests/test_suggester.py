@@ -0,0 +1,90 @@
+import threading
+import unittest
+from src.engine.indexer import Indexer
+from src.engine.suggester import PrefixIndex, Suggester
+from src.models.document import Document
+
+
+class TestPrefixIndex(unittest.TestCase):
+
+    def test_complete_ranks_by_weight(self):
+        index = PrefixIndex()
+        index.update({"graph": 5, "grape": 2, "green": 9, "blue": 20})
+        index.add("grape", 4)
+        self.assertEqual(index.complete("gr"), ["green", "grape", "graph"])
+        self.assertEqual(index.complete("gra", 1), ["grape"])
+        self.assertEqual(index.complete("x"), [])
+
+    def test_cached_long_runs_follow_additions(self):
+        index = PrefixIndex()
+        index.update({f"term{i:04d}": 1 for i in range(PrefixIndex.SCAN_LIMIT * 2)})
+        self.assertEqual(index.complete("t", 2), ["term0000", "term0001"])
+        index.add("term0300", 5)
+        index.add("tiny", 3)
+        self.assertEqual(index.complete("t", 3), ["term0300", "tiny", "term0000"])
+
+
+class TestSuggester(unittest.TestCase):
+
+    def setUp(self):
+        self.indexer = Indexer()
+        self.suggester = Suggester(self.indexer)
+
+    def test_suggests_terms_and_titles(self):
+        self.indexer.index_documents([
+            Document(id="1", title="Graph Neural Networks", content="Graph convolution"),
+            Document(id="2", title="Graphics pipelines", content="Graph rendering")
+        ])
+        self.suggester.sync()
+        suggestions = self.suggester.suggest("gra")
+        self.assertEqual(suggestions[0], "graph")
+        self.assertIn("Graph Neural Networks", suggestions)
+        self.assertIn("graphic", suggestions)
+
+    def test_new_documents_are_picked_up(self):
+        self.indexer.index_document(Document(id="1", title="Protein folding", content="Protein structure"))
+        self.suggester.sync()
+        self.assertEqual(self.suggester.suggest("quant"), [])
+        self.indexer.index_document(Document(id="2", title="Quantum computing", content="Quantum error correction"))
+        self.suggester.sync()
+        self.assertEqual(self.suggester.suggest("quant")[0], "quantum")
+
+        self.indexer.delete_document("2")
+        self.indexer.compact()
+        self.suggester.sync()
+        self.assertEqual(self.suggester.suggest("quant"), [])
+
+    def test_term_weights_are_document_frequencies(self):
+        for i in range(6):
+            self.indexer.index_documents([
+                Document(id=f"{i}a", title=f"Batch {i}", content=f"shared tok1 word{i}"),
+                Document(id=f"{i}b", title="Shared title", content=f"shared other{i % 2}")
+            ])
+            if i % 2:
+                self.indexer.update_document(Document(id=f"{i}a", title="Updated", content="tok1 again"))
+            self.suggester.sync()
+        snapshot = self.indexer.snapshot
+        doc_freq = snapshot.doc_freq_any.dense(snapshot.n_terms)
+        self.assertEqual(self.suggester._terms.weights,
+                         {term: int(doc_freq[term_id]) for term_id, term in enumerate(snapshot.terms)})
+
+    def test_suggest_syncs_in_the_background(self):
+        self.indexer.index_document(Document(id="1", title="Quantum computing", content="Quantum error correction"))
+        self.suggester.suggest("quant")
+        for thread in threading.enumerate():
+            if thread.name == 'suggester-sync':
+                thread.join()
+        self.assertEqual(self.suggester.suggest("quant")[0], "quantum")
+
+    def test_recorded_queries_and_last_word_completion(self):
+        self.indexer.index_document(Document(id="1", title="Deep learning", content="Learning representations"))
+        self.suggester.sync()
+        for _ in range(3):
+            self.suggester.record_query("Deep  Reinforcement ")
+        self.assertEqual(self.suggester.suggest("deep re")[0], "Deep Reinforcement")
+        self.assertIn("deep representation", self.suggester.suggest("deep re"))
+        self.assertEqual(self.suggester.suggest("   "), [])
+
+
+if __name__ == '__main__':
+    unittest.main()